@@ -0,0 +1,200 @@
+import asyncio
+import importlib
+import io
+import logging
+import os
+import sys
+from contextlib import asynccontextmanager
+from http.client import parse_headers
+
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+import anyio
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from _upstream import close_clients
+
+# Single long-running app for persistent deployments:
+#   uvicorn _asgi:app --app-dir api --port 8000
+# Every route is served by the same handler class Vercel runs, so contracts
+# stay identical, while caches, upstream clients and tokens are shared by all
+# requests in the process. The handlers themselves stay synchronous and run
+# concurrently in a thread pool (ASGI_WORKER_THREADS); only the server side
+# (accepting requests, streaming NDJSON and SSE bodies) is async.
+ROUTES = {
+    "acceptance-rules",
+    "dynamieken",
+    "explain-rule",
+    "health",
+    "metrics",
+    "products",
+    "rubrieken",
+    "search",
+    "test-runs",
+}
+METHODS = ["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+ASGI_WORKER_THREADS = int(os.getenv("ASGI_WORKER_THREADS", "40"))
+
+# Set by the server per response; the handler's values would duplicate them.
+SKIPPED_HEADERS = {"server", "date", "connection", "transfer-encoding"}
+
+_handlers = {}
+logger = logging.getLogger(__name__)
+
+
+def load_handler(route):
+    # Route names are the api/ module names (/api/<route>[/...]).
+    if route not in ROUTES:
+        return None
+    handler_class = _handlers.get(route)
+    if handler_class is None:
+        handler_class = importlib.import_module(route).handler
+        _handlers[route] = handler_class
+    return handler_class
+
+
+# File-like wfile for a handler. The header block written by end_headers()
+# resolves `headers_ready`; body chunks are queued for the event loop.
+class _ResponseWriter(io.RawIOBase):
+    def __init__(self, loop):
+        self._loop = loop
+        self._header_buffer = b""
+        self.headers_ready = loop.create_future()
+        self.chunks = asyncio.Queue()
+
+    def writable(self):
+        return True
+
+    def _resolve(self, value):
+        if not self.headers_ready.done():
+            self.headers_ready.set_result(value)
+
+    def write(self, data):
+        data = bytes(data)
+        written = len(data)
+        if not self.headers_ready.done() and self._header_buffer is not None:
+            self._header_buffer += data
+            head, separator, rest = self._header_buffer.partition(b"\r\n\r\n")
+            if not separator:
+                return written
+            self._header_buffer = None
+            self._loop.call_soon_threadsafe(self._resolve, head)
+            data = rest
+        if data:
+            self._loop.call_soon_threadsafe(self.chunks.put_nowait, data)
+        return written
+
+    def finish(self):
+        self._loop.call_soon_threadsafe(self._resolve, None)
+        self._loop.call_soon_threadsafe(self.chunks.put_nowait, None)
+
+
+def _run_handler(handler_class, method, target, raw_headers, body, writer):
+    # Drives BaseHTTPRequestHandler without a socket: the same attributes the
+    # server would set in handle_one_request(), then the do_* method.
+    instance = handler_class.__new__(handler_class)
+    instance.client_address = ("asgi", 0)
+    instance.server = None
+    instance.command = method
+    instance.path = target
+    instance.request_version = "HTTP/1.1"
+    instance.requestline = f"{method} {target} HTTP/1.1"
+    instance.close_connection = True
+    instance.headers = parse_headers(io.BytesIO(raw_headers + b"\r\n"))
+    instance.rfile = io.BytesIO(body)
+    instance.wfile = writer
+    try:
+        do_method = getattr(instance, f"do_{method}", None)
+        if do_method is None:
+            instance.send_error(501, f"Unsupported method ({method!r})")
+        else:
+            do_method()
+        if getattr(instance, "_headers_buffer", None):
+            instance.flush_headers()
+    finally:
+        writer.finish()
+
+
+def _parse_head(head):
+    status_line, _, header_block = head.partition(b"\r\n")
+    status_code = int(status_line.split(b" ", 2)[1])
+    headers = {}
+    for line in header_block.decode("latin-1").split("\r\n"):
+        name, separator, value = line.partition(":")
+        if separator and name.strip().lower() not in SKIPPED_HEADERS:
+            headers[name.strip()] = value.strip()
+    return status_code, headers
+
+
+async def _drain(chunks):
+    while True:
+        chunk = await chunks.get()
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _log_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Handler failed after its response was abandoned", exc_info=task.exception())
+
+
+async def _stream(chunks, task):
+    # Ends with the handler thread, so an error raised after the first byte
+    # reaches the server (logged, connection aborted) instead of passing as a
+    # complete, truncated body. If the client goes away first, the thread
+    # still runs to completion and a failure is logged.
+    try:
+        async for chunk in _drain(chunks):
+            yield chunk
+        await task
+    finally:
+        if not task.done():
+            task.add_done_callback(_log_failure)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = ASGI_WORKER_THREADS
+    yield
+    close_clients()
+
+
+app = FastAPI(lifespan=lifespan, docs_url=None, redoc_url=None, openapi_url=None)
+
+
+@app.api_route("/api/{route}", methods=METHODS)
+@app.api_route("/api/{route}/{rest:path}", methods=METHODS)
+async def dispatch(request: Request, route: str, rest: str = ""):
+    handler_class = load_handler(route)
+    if handler_class is None:
+        return JSONResponse({"error": "Not found"}, status_code=404)
+
+    target = request.url.path
+    if request.url.query:
+        target = f"{target}?{request.url.query}"
+    raw_headers = b"".join(
+        name + b": " + value + b"\r\n" for name, value in request.headers.raw
+    )
+    body = await request.body()
+
+    writer = _ResponseWriter(asyncio.get_running_loop())
+    task = asyncio.ensure_future(
+        run_in_threadpool(_run_handler, handler_class, request.method, target, raw_headers, body, writer)
+    )
+    head = await writer.headers_ready
+    if head is None:
+        await task
+        return JSONResponse({"error": "Handler sent no response"}, status_code=500)
+
+    status_code, headers = _parse_head(head)
+    if task.done() or any(name.lower() == "content-length" for name in headers):
+        body = b"".join([chunk async for chunk in _drain(writer.chunks)])
+        await task
+        return Response(body, status_code=status_code, headers=headers)
+    # No length and still writing (NDJSON batches, SSE): stream chunks as produced.
+    return StreamingResponse(_stream(writer.chunks, task), status_code=status_code, headers=headers)
@@ -2,8 +2,15 @@ import base64
 import json
 import os
 
+from _timing import phase
+
 
 def is_authorized(headers):
+    with phase("auth"):
+        return _check_basic_auth(headers)
+
+
+def _check_basic_auth(headers):
     user = os.getenv("BASIC_AUTH_USER")
     password = os.getenv("BASIC_AUTH_PASS")
     if not user or not password:
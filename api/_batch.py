@@ -0,0 +1,138 @@
+import asyncio
+import os
+
+from _http import dumps, send_json
+from _kinetic import fetch_dynamiek_detail_async, fetch_rule_detail_async, record_detail
+from _lazy import lazy_import
+from _timing import phase
+from _tokens import get_bearer_token
+from _upstream import build_async_client, get_env_config
+
+httpx = lazy_import("httpx")
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "200"))
+
+DETAIL_FETCHERS = {
+    "acceptance-rules": fetch_rule_detail_async,
+    "dynamieken": fetch_dynamiek_detail_async,
+}
+
+
+def parse_ids(raw):
+    # Accepts "a,b,c" or a JSON list; keeps request order and drops duplicates.
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, list):
+        raise ValueError("regelIds must be a comma-separated string or a list")
+    ids = []
+    seen = set()
+    for item in raw:
+        value = str(item).strip()
+        if value and value not in seen:
+            seen.add(value)
+            ids.append(value)
+    if not ids:
+        raise ValueError("regelIds is required")
+    if len(ids) > BATCH_MAX_IDS:
+        raise ValueError(f"At most {BATCH_MAX_IDS} regelIds per request")
+    return ids
+
+
+async def _fetch_item(fetch_detail, client, semaphore, token, host, doc_id):
+    async with semaphore:
+        try:
+            data = await fetch_detail(client, token, host, doc_id)
+            return {"regelId": doc_id, "status": 200, "data": data}
+        except httpx.HTTPStatusError as exc:
+            return {
+                "regelId": doc_id,
+                "status": exc.response.status_code,
+                "error": "Upstream request failed",
+                "message": exc.response.text,
+            }
+        except Exception as exc:
+            return {"regelId": doc_id, "status": 500, "error": str(exc)}
+
+
+async def iter_details(env_key, kind, ids, concurrency=None):
+    # Yields one result per id as soon as its upstream call completes.
+    fetch_detail = DETAIL_FETCHERS[kind]
+    host = get_env_config(env_key)["host"]
+    token = get_bearer_token(env_key)
+    semaphore = asyncio.Semaphore(max(1, concurrency or BATCH_CONCURRENCY))
+    async with build_async_client() as client:
+        tasks = [
+            asyncio.ensure_future(
+                _fetch_item(fetch_detail, client, semaphore, token, host, doc_id)
+            )
+            for doc_id in ids
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result["status"] == 200:
+                    record_detail(env_key, kind, result["data"], doc_id=result["regelId"])
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def fetch_details(env_key, kind, ids, on_result=None):
+    # Sync entry point for BaseHTTPRequestHandler; on_result is called per
+    # completed item (used for streaming), the full list comes back in
+    # request order.
+    async def run():
+        results = {}
+        async for result in iter_details(env_key, kind, ids):
+            results[result["regelId"]] = result
+            if on_result is not None:
+                on_result(result)
+        return [results[doc_id] for doc_id in ids]
+
+    return asyncio.run(run())
+
+
+def batch_summary(results):
+    failed = sum(1 for result in results if result["status"] != 200)
+    return {"results": results, "count": len(results), "failed": failed}
+
+
+def wants_stream(headers, query_params):
+    if query_params.get("stream", ["0"])[0] == "1":
+        return True
+    return "application/x-ndjson" in (headers.get("Accept") or "")
+
+
+def send_batch(handler, env_key, kind, ids, stream=False):
+    # The token is resolved first so auth errors still get a normal response
+    # (and its time is not counted as upstream).
+    get_bearer_token(env_key)
+    if not stream:
+        with phase("upstream"):
+            results = fetch_details(env_key, kind, ids)
+        send_json(
+            handler,
+            batch_summary(results),
+            headers={"Cache-Control": "no-store", "Access-Control-Allow-Origin": "*"},
+        )
+        return
+
+    # NDJSON: one line per item in completion order, then a summary line.
+    # Without Content-Length the response ends when the connection closes.
+    handler.send_response(200)
+    handler.send_header("Content-Type", "application/x-ndjson")
+    handler.send_header("Cache-Control", "no-store")
+    handler.send_header("Access-Control-Allow-Origin", "*")
+    handler.send_header("Connection", "close")
+    handler.end_headers()
+    handler.close_connection = True
+
+    def write_line(payload):
+        handler.wfile.write(dumps(payload) + b"\n")
+        handler.wfile.flush()
+
+    results = fetch_details(env_key, kind, ids, on_result=write_line)
+    summary = batch_summary(results)
+    write_line({"done": True, "count": summary["count"], "failed": summary["failed"]})
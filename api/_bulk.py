@@ -0,0 +1,160 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _kinetic import (
+    create_rule,
+    delete_rule,
+    forget_record,
+    invalidate_rules,
+    record_detail,
+    rule_payload,
+    update_rule,
+)
+from _lazy import lazy_import
+from _tokens import get_bearer_token
+from _upstream import get_env_config
+
+httpx = lazy_import("httpx")
+
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))
+BULK_MAX_OPERATIONS = int(os.getenv("BULK_MAX_OPERATIONS", "500"))
+BULK_MAX_ATTEMPTS = int(os.getenv("BULK_MAX_ATTEMPTS", "3"))
+BULK_BACKOFF_SECONDS = float(os.getenv("BULK_BACKOFF_SECONDS", "0.5"))
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+OPERATIONS = ("create", "update", "delete")
+
+
+def validate_operations(raw_operations):
+    # Validates every operation up front; returns (operations, errors) and
+    # nothing is sent upstream when errors is non-empty.
+    if not isinstance(raw_operations, list) or not raw_operations:
+        raise ValueError("operations must be a non-empty list")
+    if len(raw_operations) > BULK_MAX_OPERATIONS:
+        raise ValueError(f"At most {BULK_MAX_OPERATIONS} operations per request")
+
+    operations = []
+    errors = []
+    resource_ids = set()
+    for index, raw in enumerate(raw_operations):
+        if not isinstance(raw, dict):
+            errors.append({"index": index, "error": "operation must be an object"})
+            continue
+        op = raw.get("op")
+        if op is None:
+            op = "update" if raw.get("RegelId") is not None else "create"
+        if op not in OPERATIONS:
+            errors.append({"index": index, "error": f"Unsupported op '{op}'"})
+            continue
+
+        if op == "delete":
+            regel_id = raw.get("RegelId")
+            if regel_id is None or str(regel_id).strip() == "":
+                errors.append({"index": index, "error": "RegelId is required"})
+                continue
+            operations.append({"index": index, "op": op, "regelId": regel_id, "payload": None})
+            continue
+
+        body = dict(raw)
+        if op == "create":
+            body.pop("RegelId", None)
+        elif body.get("RegelId") is None:
+            errors.append({"index": index, "error": "RegelId, Omschrijving, and Expressie are required"})
+            continue
+        try:
+            _, payload = rule_payload(body)
+        except ValueError as exc:
+            errors.append({"index": index, "error": str(exc)})
+            continue
+        # ResourceId makes create/update idempotent upstream, so it must be
+        # unique within the batch and is reused on every retry.
+        if payload["ResourceId"] in resource_ids:
+            errors.append({"index": index, "error": "Duplicate ResourceId"})
+            continue
+        resource_ids.add(payload["ResourceId"])
+        operations.append(
+            {"index": index, "op": op, "regelId": payload.get("RegelId"), "payload": payload}
+        )
+    return operations, errors
+
+
+def _is_retryable(exc):
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, httpx.TransportError)
+
+
+def _run_operation(env_key, host, operation):
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            token = get_bearer_token(env_key)
+            if operation["op"] == "create":
+                data = create_rule(token, host, operation["payload"])
+            elif operation["op"] == "update":
+                data = update_rule(token, host, operation["payload"])
+            else:
+                data = delete_rule(token, host, operation["regelId"])
+            return {"status": "ok", "attempts": attempts, "data": data}
+        except httpx.HTTPStatusError as exc:
+            # A retried delete that now 404s already succeeded on an earlier attempt.
+            if operation["op"] == "delete" and attempts > 1 and exc.response.status_code == 404:
+                return {"status": "ok", "attempts": attempts, "data": {"status": "deleted"}}
+            if attempts >= BULK_MAX_ATTEMPTS or not _is_retryable(exc):
+                return {
+                    "status": "failed",
+                    "attempts": attempts,
+                    "error": "Upstream request failed",
+                    "status_code": exc.response.status_code,
+                    "message": exc.response.text,
+                }
+        except Exception as exc:
+            if attempts >= BULK_MAX_ATTEMPTS or not _is_retryable(exc):
+                return {"status": "failed", "attempts": attempts, "error": str(exc)}
+        # Full jitter exponential backoff
+        time.sleep(random.uniform(0, BULK_BACKOFF_SECONDS * (2 ** (attempts - 1))))
+
+
+def _result(operation, outcome):
+    payload = operation["payload"] or {}
+    result = {
+        "index": operation["index"],
+        "op": operation["op"],
+        "regelId": operation["regelId"],
+        "resourceId": payload.get("ResourceId"),
+    }
+    result.update(outcome)
+    return result
+
+
+def run_bulk(env_key, operations, dry_run=False):
+    if dry_run:
+        results = [_result(operation, {"status": "validated"}) for operation in operations]
+        return {"dryRun": True, "results": results, "count": len(results), "succeeded": 0, "failed": 0}
+
+    host = get_env_config(env_key)["host"]
+    with ThreadPoolExecutor(max_workers=max(1, BULK_CONCURRENCY)) as pool:
+        outcomes = list(pool.map(lambda operation: _run_operation(env_key, host, operation), operations))
+
+    results = []
+    for operation, outcome in zip(operations, outcomes):
+        results.append(_result(operation, outcome))
+        if outcome["status"] != "ok" or operation["regelId"] is None:
+            continue
+        if operation["op"] == "update":
+            record_detail(env_key, "acceptance-rules", operation["payload"], doc_id=operation["regelId"])
+        else:
+            forget_record(env_key, "acceptance-rules", operation["regelId"])
+    invalidate_rules(env_key)
+
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    return {
+        "dryRun": False,
+        "results": results,
+        "count": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+    }
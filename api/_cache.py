@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from _metrics import CACHE_REQUESTS
+from _upstream import is_upstream_unavailable
+
+LIST_CACHE_TTL_SECONDS = float(os.getenv("LIST_CACHE_TTL_SECONDS", "60"))
+LIST_CACHE_STALE_SECONDS = float(os.getenv("LIST_CACHE_STALE_SECONDS", "300"))
+LIST_CACHE_MAX_ENTRIES = int(os.getenv("LIST_CACHE_MAX_ENTRIES", "32"))
+
+
+# Thread-safe LRU cache with TTL and stale-while-revalidate. Entries past
+# ttl but within stale_ttl are served stale while one background thread
+# reloads them. Invalidation bumps a per-key generation so a load that started
+# before a write never stores its outdated result. With fallback_on set, a
+# foreground load that fails with a matching error returns the last stored
+# value instead, however old, as long as no write invalidated it. With
+# error_ttl set, any other failed foreground load is remembered for that many
+# seconds: callers get the same error without calling the loader again.
+class TTLCache:
+    def __init__(self, maxsize=128, ttl=60.0, stale_ttl=0.0, name="cache", fallback_on=None, error_ttl=0.0):
+        self.name = name
+        self.fallback_on = fallback_on
+        self.error_ttl = error_ttl
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._loading = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def _store(self, key, value, generation):
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                return
+            now = time.monotonic()
+            self._errors.pop(key, None)
+            self._entries[key] = {
+                "value": value,
+                "stored_at": now,
+                "expires_at": now + self.ttl,
+                "stale_until": now + self.ttl + self.stale_ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _remember_error(self, key, exc):
+        if self.error_ttl <= 0:
+            return
+        with self._lock:
+            self._errors[key] = (exc, time.monotonic() + self.error_ttl)
+            while len(self._errors) > self.maxsize:
+                self._errors.pop(next(iter(self._errors)))
+
+    def _recent_error(self, key):
+        with self._lock:
+            failure = self._errors.get(key)
+            if failure is None:
+                return None
+            if time.monotonic() >= failure[1]:
+                del self._errors[key]
+                return None
+            return failure[0]
+
+    def _load_lock(self, key):
+        with self._lock:
+            lock = self._loading.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._loading[key] = lock
+            return lock
+
+    def _load(self, key, loader):
+        with self._lock:
+            generation = self._generations.get(key, 0)
+        value = loader()
+        self._store(key, value, generation)
+        return value
+
+    def _revalidate(self, key, loader):
+        lock = self._load_lock(key)
+        if not lock.acquire(blocking=False):
+            return
+        try:
+            self._load(key, loader)
+        except Exception:
+            # Keep serving the stale copy; the next miss retries in the foreground.
+            pass
+        finally:
+            lock.release()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry["expires_at"]:
+                return None
+            self._entries.move_to_end(key)
+            return entry["value"]
+
+    def peek(self, key):
+        # Last stored value even if expired, e.g. to reuse work when a reload
+        # finds nothing changed.
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry["value"]
+
+    def get_or_load(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            if now < entry["expires_at"]:
+                CACHE_REQUESTS.inc(self.name, "hit")
+                return entry["value"]
+            if now < entry["stale_until"]:
+                CACHE_REQUESTS.inc(self.name, "stale")
+                if not self._load_lock(key).locked():
+                    threading.Thread(
+                        target=self._revalidate, args=(key, loader), daemon=True
+                    ).start()
+                return entry["value"]
+
+        error = self._recent_error(key)
+        if error is not None:
+            CACHE_REQUESTS.inc(self.name, "error")
+            raise error
+        CACHE_REQUESTS.inc(self.name, "miss")
+        # Single loader per key; concurrent callers wait and reuse its result.
+        with self._load_lock(key):
+            value = self.get(key)
+            if value is not None:
+                return value
+            error = self._recent_error(key)
+            if error is not None:
+                raise error
+            try:
+                return self._load(key, loader)
+            except Exception as exc:
+                with self._lock:
+                    current = entry is not None and self._entries.get(key) is entry
+                if not current or self.fallback_on is None or not self.fallback_on(exc):
+                    self._remember_error(key, exc)
+                    raise
+                CACHE_REQUESTS.inc(self.name, "fallback")
+                return entry["value"]
+
+    def set(self, key, value):
+        with self._lock:
+            generation = self._generations.get(key, 0)
+        self._store(key, value, generation)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.pop(key, None)
+            self._errors.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.clear()
+            self._errors.clear()
+
+
+# Shared by every handler module loaded in the same process.
+# Keys are (env_key, endpoint), e.g. ("acceptance", "acceptance-rules").
+list_cache = TTLCache(
+    maxsize=LIST_CACHE_MAX_ENTRIES,
+    ttl=LIST_CACHE_TTL_SECONDS,
+    stale_ttl=LIST_CACHE_STALE_SECONDS,
+    name="list",
+    fallback_on=is_upstream_unavailable,
+)
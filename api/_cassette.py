@@ -0,0 +1,231 @@
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CASSETTE_PATH = os.getenv(
+    "UPSTREAM_CASSETTE_PATH", os.path.join(PROJECT_DIR, "cassettes", "upstream.jsonl.gz")
+)
+# Replay sleeps for the recorded upstream duration when enabled.
+REPLAY_LATENCY = os.getenv("UPSTREAM_CASSETTE_REPLAY_LATENCY", "0") == "1"
+
+REDACTED = "REDACTED"
+# Query/body keys and headers whose values never reach the cassette.
+SECRET_KEYS = ("secret", "token", "password", "apikey", "api_key", "authorization", "cookie")
+KEPT_RESPONSE_HEADERS = ("content-type",)
+
+
+def _is_secret(name):
+    name = str(name).lower().replace("-", "_")
+    return any(key in name for key in SECRET_KEYS) or name in ("client_id", "key")
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if _is_secret(key) else redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def _redact_body(content, content_type):
+    # JSON bodies are redacted field by field; anything else is kept as-is.
+    if not content or "json" not in (content_type or ""):
+        return content
+    try:
+        return json.dumps(redact(json.loads(content)), separators=(",", ":")).encode("utf-8")
+    except ValueError:
+        return content
+
+
+def request_key(method, url, content=b""):
+    # Method, URL and redacted query identify a request; bodies (PUTs, OpenAI
+    # prompts) are added as a hash so secrets in them never need storing.
+    parts = urlsplit(str(url))
+    query = sorted((key, REDACTED if _is_secret(key) else value) for key, value in parse_qsl(parts.query))
+    key = f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}"
+    if query:
+        key += "?" + urlencode(query)
+    if content:
+        key += " #" + hashlib.sha256(content).hexdigest()[:16]
+    return key
+
+
+def _without_host(key):
+    # "GET https://host/path?q" -> "GET /path?q"; lets a recording made against
+    # one host (e.g. the local stub) replay against another.
+    method, _, rest = key.partition(" ")
+    _, _, path = rest.partition("://")
+    return f"{method} /{path.partition('/')[2]}"
+
+
+class CassetteMiss(httpx.TransportError):
+    pass
+
+
+# Cassette file: gzip members of JSON lines. Response bodies are stored once
+# per content hash ({"body": sha, "data": base64}) and interactions refer to
+# them ({"key", "status", "headers", "body", "elapsed_ms"}), so repeated
+# list responses cost one line each.
+class Cassette:
+    def __init__(self, path=None):
+        self.path = path or CASSETTE_PATH
+        self._bodies = {}
+        self._interactions = {}
+        self._by_path = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def load(self):
+        with self._lock:
+            if self._loaded:
+                return self
+            self._loaded = True
+            if not os.path.exists(self.path):
+                return self
+            with gzip.open(self.path, "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if "data" in entry:
+                        self._bodies[entry["body"]] = base64.b64decode(entry["data"])
+                    else:
+                        self._add(entry)
+            return self
+
+    def _add(self, entry):
+        self._interactions.setdefault(entry["key"], []).append(entry)
+        self._by_path.setdefault(_without_host(entry["key"]), []).append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._interactions.values())
+
+    def record(self, method, url, request_content, response, elapsed_ms):
+        content_type = response.headers.get("content-type", "")
+        body = _redact_body(response.content, content_type)
+        body_hash = hashlib.sha256(body).hexdigest()
+        entry = {
+            "key": request_key(method, url, request_content),
+            "status": response.status_code,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() in KEPT_RESPONSE_HEADERS
+            },
+            "body": body_hash,
+            "elapsed_ms": round(elapsed_ms, 1),
+        }
+        lines = []
+        with self._lock:
+            if body_hash not in self._bodies:
+                self._bodies[body_hash] = body
+                lines.append({"body": body_hash, "data": base64.b64encode(body).decode("ascii")})
+            lines.append(entry)
+            self._add(entry)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as handle:
+                for line in lines:
+                    handle.write(json.dumps(line, separators=(",", ":")) + "\n")
+
+    def replay(self, method, url, request_content):
+        key = request_key(method, url, request_content)
+        with self._lock:
+            entries = self._interactions.get(key)
+            if not entries:
+                key = _without_host(key)
+                entries = self._by_path.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recorded upstream response for {key}")
+            # Recorded order, cycling, so repeated runs see the same sequence.
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            entry = entries[position % len(entries)]
+        if REPLAY_LATENCY:
+            time.sleep(entry["elapsed_ms"] / 1000)
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            content=self._bodies[entry["body"]],
+        )
+
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path=None):
+    path = path or CASSETTE_PATH
+    with _cassettes_lock:
+        cassette = _cassettes.get(path)
+        if cassette is None:
+            cassette = Cassette(path)
+            _cassettes[path] = cassette
+    return cassette.load()
+
+
+class RecordingTransport(httpx.BaseTransport):
+    def __init__(self, inner, cassette):
+        self._inner = inner
+        self._cassette = cassette
+
+    def handle_request(self, request):
+        started = time.perf_counter()
+        response = self._inner.handle_request(request)
+        response.read()
+        self._cassette.record(
+            request.method, request.url, request.content, response, (time.perf_counter() - started) * 1000
+        )
+        return response
+
+    def close(self):
+        self._inner.close()
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner, cassette):
+        self._inner = inner
+        self._cassette = cassette
+
+    async def handle_async_request(self, request):
+        started = time.perf_counter()
+        response = await self._inner.handle_async_request(request)
+        await response.aread()
+        self._cassette.record(
+            request.method, request.url, request.content, response, (time.perf_counter() - started) * 1000
+        )
+        return response
+
+    async def aclose(self):
+        await self._inner.aclose()
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    def __init__(self, cassette):
+        self._cassette = cassette
+
+    def handle_request(self, request):
+        return self._cassette.replay(request.method, request.url, request.read())
+
+    async def handle_async_request(self, request):
+        return self._cassette.replay(request.method, request.url, await request.aread())
+
+
+def build_transport(mode, asynchronous=False, **transport_options):
+    # mode is "record" or "replay"; transport_options go to the real transport.
+    cassette = get_cassette()
+    if mode == "replay":
+        return ReplayTransport(cassette)
+    if mode != "record":
+        raise ValueError(f"Unknown UPSTREAM_CASSETTE_MODE '{mode}'")
+    if asynchronous:
+        return AsyncRecordingTransport(httpx.AsyncHTTPTransport(**transport_options), cassette)
+    return RecordingTransport(httpx.HTTPTransport(**transport_options), cassette)
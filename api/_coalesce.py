@@ -0,0 +1,72 @@
+import copy
+import functools
+import threading
+
+from _limits import env_for_host
+from _metrics import UPSTREAM_COALESCED
+
+# In-flight deduplication for Kinetic reads: while one call for a given
+# (environment, GET, endpoint, arguments) is running, identical calls wait
+# for it instead of going upstream themselves. The first caller keeps the
+# result; every waiter gets its own deep copy, so callers can still modify
+# what they receive. Errors are shared the same way.
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        # Returns (result, shared); shared is True when another caller ran func.
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = func()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+
+flights = SingleFlight()
+
+
+def coalesced(func):
+    # Decorator for the sync fetch_* functions in _kinetic.py; goes above
+    # @limited so waiting callers hold no limiter slot. The token is left out
+    # of the key: callers in the same environment share its access.
+    host_index = getattr(func, "__wrapped__", func).__code__.co_varnames.index("host")
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        host = kwargs["host"] if "host" in kwargs else args[host_index]
+        rest = args[host_index + 1 :]
+        options = tuple(sorted((name, value) for name, value in kwargs.items() if name != "token"))
+        key = (env_for_host(host), "GET", func.__name__, host, rest, options)
+        result, shared = flights.do(key, lambda: func(*args, **kwargs))
+        if not shared:
+            return result
+        UPSTREAM_COALESCED.inc(func.__name__)
+        return copy.deepcopy(result)
+
+    return wrapper
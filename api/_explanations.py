@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from _lazy import lazy_import
+from _metrics import CACHE_REQUESTS
+
+sqlite3 = lazy_import("sqlite3")
+
+# Cache for explain-rule answers, keyed by everything that shapes them: the
+# normalized expression, the resolved rubriek labels, the model and the
+# prompt version. Two tiers: an in-process LRU in front of a SQLite file
+# that survives restarts (and is shared by processes on the same disk).
+# Both tiers expire entries after the TTL; the file keeps at most
+# EXPLANATION_CACHE_MAX_ENTRIES, dropping the oldest first.
+EXPLANATION_CACHE_TTL_SECONDS = float(os.getenv("EXPLANATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+EXPLANATION_CACHE_MEMORY_ENTRIES = int(os.getenv("EXPLANATION_CACHE_MEMORY_ENTRIES", "256"))
+EXPLANATION_CACHE_MAX_ENTRIES = int(os.getenv("EXPLANATION_CACHE_MAX_ENTRIES", "5000"))
+# Empty disables the SQLite tier
+EXPLANATION_CACHE_PATH = os.getenv(
+    "EXPLANATION_CACHE_PATH", os.path.join(tempfile.gettempdir(), "acceptatiebeheer-explanations.sqlite3")
+)
+
+_QUOTED = re.compile(r"('[^']*'|\"[^\"]*\")")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_expression(expression):
+    # Collapse whitespace outside string literals; quoted values stay as is.
+    parts = _QUOTED.split((expression or "").strip())
+    return "".join(part if index % 2 else _WHITESPACE.sub(" ", part) for index, part in enumerate(parts))
+
+
+def explanation_key(expression, rubriek_labels, model, prompt_version):
+    material = json.dumps(
+        [prompt_version, model, normalize_expression(expression), rubriek_labels or []],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    def __init__(
+        self,
+        path=EXPLANATION_CACHE_PATH,
+        ttl=EXPLANATION_CACHE_TTL_SECONDS,
+        memory_entries=EXPLANATION_CACHE_MEMORY_ENTRIES,
+        max_entries=EXPLANATION_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_failed = False
+
+    def _connection(self):
+        # Caller holds the lock. Opened on first use; a file that cannot be
+        # opened disables the disk tier instead of failing requests.
+        if self._db is None and self.path and not self._db_failed:
+            try:
+                db = sqlite3.connect(self.path, timeout=1.0, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS explanations "
+                    "(key TEXT PRIMARY KEY, text TEXT NOT NULL, stored_at REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS explanations_stored_at ON explanations (stored_at)")
+                db.commit()
+                self._db = db
+            except (sqlite3.Error, OSError):
+                self._db_failed = True
+        return self._db
+
+    def _remember(self, key, text, stored_at):
+        # Caller holds the lock.
+        self._memory[key] = (text, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                CACHE_REQUESTS.inc("explanations", "hit")
+                return entry[0]
+            self._memory.pop(key, None)
+            db = self._connection()
+            row = None
+            if db is not None:
+                try:
+                    row = db.execute(
+                        "SELECT text, stored_at FROM explanations WHERE key = ? AND stored_at > ?",
+                        (key, now - self.ttl),
+                    ).fetchone()
+                except sqlite3.Error:
+                    row = None
+            if row is None:
+                CACHE_REQUESTS.inc("explanations", "miss")
+                return None
+            self._remember(key, row[0], row[1])
+        CACHE_REQUESTS.inc("explanations", "disk")
+        return row[0]
+
+    def set(self, key, text):
+        if not text:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, text, now)
+            db = self._connection()
+            if db is None:
+                return
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO explanations (key, text, stored_at) VALUES (?, ?, ?)",
+                    (key, text, now),
+                )
+                db.execute("DELETE FROM explanations WHERE stored_at <= ?", (now - self.ttl,))
+                db.execute(
+                    "DELETE FROM explanations WHERE key IN ("
+                    "SELECT key FROM explanations ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                db.commit()
+            except sqlite3.Error:
+                db.rollback()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM explanations")
+                db.commit()
+
+
+explanation_cache = ExplanationCache()
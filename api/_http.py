@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import _timing
+from _metrics import CACHE_REQUESTS
+
+try:
+    import orjson
+except ImportError:  # optional, json.dumps is the fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is used when brotli is missing
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ENCODED_CACHE_MAX_ENTRIES = 32
+
+# cache_key -> {"source", "raw", "etag", "bodies": {encoding: (body, content_encoding)}}
+# Entries are reused only while the cached payload object is the same one,
+# so a list cache refresh automatically invalidates its encoded bodies.
+_encoded = OrderedDict()
+_encoded_lock = threading.Lock()
+
+
+def dumps(payload):
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(payload).encode("utf-8")
+
+
+def negotiate_encoding(accept_encoding):
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        pieces = part.strip().split(";")
+        name = pieces[0].strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return "identity"
+
+
+def _compress(raw, encoding):
+    if encoding == "br":
+        return brotli.compress(raw, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(raw, compresslevel=GZIP_LEVEL)
+    return raw
+
+
+def _entry(cache_key, source):
+    if cache_key is None:
+        return {"raw": None, "etag": None, "bodies": {}}
+    with _encoded_lock:
+        entry = _encoded.get(cache_key)
+        if entry is not None and entry["source"] is source:
+            _encoded.move_to_end(cache_key)
+            CACHE_REQUESTS.inc("encoded", "hit")
+            return entry
+        CACHE_REQUESTS.inc("encoded", "miss")
+        entry = {"source": source, "raw": None, "etag": None, "bodies": {}}
+        _encoded[cache_key] = entry
+        while len(_encoded) > ENCODED_CACHE_MAX_ENTRIES:
+            _encoded.popitem(last=False)
+        return entry
+
+
+def _serialize(entry, payload):
+    if entry["raw"] is None:
+        raw = dumps(payload)
+        entry["etag"] = hashlib.sha256(raw).hexdigest()[:32]
+        entry["raw"] = raw
+    return entry["raw"]
+
+
+def _content_encoding(raw, encoding):
+    if encoding != "identity" and len(raw) >= MIN_COMPRESS_BYTES:
+        return encoding
+    return None
+
+
+def _body(entry, encoding):
+    result = entry["bodies"].get(encoding)
+    if result is None:
+        raw = entry["raw"]
+        content_encoding = _content_encoding(raw, encoding)
+        body = _compress(raw, content_encoding) if content_encoding else raw
+        result = (body, content_encoding)
+        entry["bodies"][encoding] = result
+    return result
+
+
+def encode_json(payload, encoding="identity", cache_key=None, source=None):
+    # Returns (body, content_encoding, etag); content_encoding is None for identity.
+    entry = _entry(cache_key, payload if source is None else source)
+    _serialize(entry, payload)
+    body, content_encoding = _body(entry, encoding)
+    return body, content_encoding, entry["etag"]
+
+
+def prime_json(cache_key, payload, source=None):
+    # Serializes and hashes a freshly loaded payload so the first request
+    # after a refresh only has to compare ETags.
+    encode_json(payload, "identity", cache_key, source)
+
+
+def entity_tag(etag, content_encoding):
+    # Strong ETags differ per content coding; the hash part is shared.
+    if content_encoding:
+        return f'"{etag}-{content_encoding}"'
+    return f'"{etag}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"').split("-", 1)[0] == etag:
+            return True
+    return False
+
+
+def send_json(
+    handler,
+    payload,
+    status_code=200,
+    headers=None,
+    cache_key=None,
+    source=None,
+    conditional=False,
+):
+    timer = _timing.current()
+    if timer is not None and timer.debug and isinstance(payload, dict):
+        # ?debug=timing: phases so far (before serialization) in the body;
+        # such responses bypass the encoded cache and conditional GETs.
+        payload = {**payload, "serverTiming": timer.breakdown()}
+        cache_key = source = None
+        conditional = False
+    serializing = _timing.begin("serialize")
+    encoding = negotiate_encoding(handler.headers.get("Accept-Encoding"))
+    entry = _entry(cache_key, payload if source is None else source)
+    raw = _serialize(entry, payload)
+    headers = dict(headers or {})
+    if conditional:
+        # Conditional responses may be stored but must be revalidated.
+        headers["Cache-Control"] = "private, no-cache"
+        headers["ETag"] = entity_tag(entry["etag"], _content_encoding(raw, encoding))
+        if status_code == 200 and etag_matches(handler.headers.get("If-None-Match"), entry["etag"]):
+            _timing.end(serializing)
+            handler.send_response(304)
+            handler.send_header("Vary", "Accept-Encoding")
+            for name, value in headers.items():
+                handler.send_header(name, value)
+            handler.end_headers()
+            return
+
+    body, content_encoding = _body(entry, encoding)
+    _timing.end(serializing)
+    handler.send_response(status_code)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Content-Length", str(len(body)))
+    if content_encoding:
+        handler.send_header("Content-Encoding", content_encoding)
+    handler.send_header("Vary", "Accept-Encoding")
+    for name, value in headers.items():
+        handler.send_header(name, value)
+    handler.end_headers()
+    handler.wfile.write(body)
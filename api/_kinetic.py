@@ -0,0 +1,408 @@
+from _cache import list_cache
+from _coalesce import coalesced
+from _http import prime_json
+from _lazy import lazy_import
+from _limits import limited
+from _rubrieken import get_rubriek_index
+from _search import collect_text, get_index, record_id
+from _timing import phase
+from _tokens import get_bearer_token
+from _upstream import get_client, get_env_config
+
+uuid = lazy_import("uuid")
+
+# Kinetic resources shared by the handler modules. List loaders read through
+# the shared list cache; mutators are paired with an invalidate_* helper.
+# Every call goes through the per-environment read/write limiter (_limits.py);
+# identical concurrent reads are coalesced into one call (_coalesce.py).
+
+
+def _decode(response):
+    with phase("normalize"):
+        return response.json()
+
+
+@coalesced
+@limited("read")
+def fetch_rules(token, host):
+    client = get_client(host)
+    response = client.get(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/acceptatieregels",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            # Required tenant/company headers for DIAS API
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    data = _decode(response)
+
+    if isinstance(data, list):
+        rules = data
+    elif isinstance(data, dict) and "data" in data:
+        rules = data["data"]
+    elif isinstance(data, dict) and "rules" in data:
+        rules = data["rules"]
+    else:
+        rules = [data] if data else []
+
+    return {"rules": rules, "count": len(rules)}
+
+
+@coalesced
+@limited("read")
+def fetch_rule_detail(token, host, regel_id):
+    client = get_client(host)
+    response = client.get(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/acceptatieregels/{regel_id}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    return _decode(response)
+
+
+@limited("read")
+async def fetch_rule_detail_async(client, token, host, regel_id):
+    response = await client.get(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/acceptatieregels/{regel_id}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    return _decode(response)
+
+
+@limited("write")
+def delete_rule(token, host, regel_id):
+    client = get_client(host)
+    response = client.delete(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/acceptatieregels/{regel_id}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    if response.content:
+        return _decode(response)
+    return {"status": "deleted"}
+
+
+@limited("write")
+def create_rule(token, host, payload):
+    client = get_client(host)
+    response = client.put(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/acceptatieregels/invoeren",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        json=payload,
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    if response.content:
+        return _decode(response)
+    return {"status": "created"}
+
+
+@limited("write")
+def update_rule(token, host, payload):
+    client = get_client(host)
+    response = client.put(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/acceptatieregels/wijzigen",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        json=payload,
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    if response.content:
+        return _decode(response)
+    return {"status": "updated"}
+
+
+def rule_payload(body):
+    # PUT semantics: a RegelId means update, otherwise create.
+    afd_code = body.get("AfdBrancheCodeId")
+    omschrijving = body.get("Omschrijving")
+    expressie = body.get("Expressie")
+    regel_id = body.get("RegelId")
+    resource_id = body.get("ResourceId") or str(uuid.uuid4())
+
+    if regel_id is not None:
+        if expressie is None or omschrijving is None:
+            raise ValueError("RegelId, Omschrijving, and Expressie are required")
+        return "update", {
+            "RegelId": regel_id,
+            "Omschrijving": omschrijving,
+            "Expressie": expressie,
+            "ResourceId": resource_id,
+        }
+    if afd_code is None or omschrijving is None or expressie is None:
+        raise ValueError("AfdBrancheCodeId, Omschrijving, and Expressie are required")
+    return "create", {
+        "AfdBrancheCodeId": afd_code,
+        "Omschrijving": omschrijving,
+        "Expressie": expressie,
+        "ResourceId": resource_id,
+    }
+
+
+def load_rules(env_key):
+    def loader():
+        config = get_env_config(env_key)
+        data = fetch_rules(get_bearer_token(env_key), config["host"])
+        prime_json((env_key, "acceptance-rules"), data)
+        return data
+
+    return list_cache.get_or_load((env_key, "acceptance-rules"), loader)
+
+
+def invalidate_rules(env_key, regel_id=None):
+    list_cache.invalidate((env_key, "acceptance-rules"))
+    if regel_id is not None:
+        forget_record(env_key, "acceptance-rules", regel_id)
+
+
+@coalesced
+@limited("read")
+def fetch_dynamieken(token, host):
+    client = get_client(host)
+    response = client.get(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/dynamiekregels",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    data = _decode(response)
+
+    if isinstance(data, list):
+        rules = data
+    elif isinstance(data, dict) and "data" in data:
+        rules = data["data"]
+    elif isinstance(data, dict) and "rules" in data:
+        rules = data["rules"]
+    else:
+        rules = [data] if data else []
+
+    return {"rules": rules, "count": len(rules)}
+
+
+@coalesced
+@limited("read")
+def fetch_dynamiek_detail(token, host, regel_id):
+    client = get_client(host)
+    response = client.get(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/dynamiekregels/{regel_id}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    return _decode(response)
+
+
+@limited("read")
+async def fetch_dynamiek_detail_async(client, token, host, regel_id):
+    response = await client.get(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/dynamiekregels/{regel_id}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    return _decode(response)
+
+
+@limited("write")
+def create_dynamiek(token, host, payload):
+    client = get_client(host)
+    response = client.put(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/dynamiekregels/invoeren",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        json=payload,
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    if response.content:
+        return _decode(response)
+    return {"status": "created"}
+
+
+@limited("write")
+def update_dynamiek(token, host, payload):
+    client = get_client(host)
+    response = client.put(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/dynamiekregels/wijzigen",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        json=payload,
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    if response.content:
+        return _decode(response)
+    return {"status": "updated"}
+
+
+@limited("write")
+def delete_dynamiek(token, host, regel_id):
+    client = get_client(host)
+    response = client.delete(
+        f"{host}/beheer/api/v1/administratie/assurantie/regels/dynamiekregels/{regel_id}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+        },
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    if response.content:
+        return _decode(response)
+    return {"status": "deleted"}
+
+
+def load_dynamieken(env_key):
+    def loader():
+        config = get_env_config(env_key)
+        data = fetch_dynamieken(get_bearer_token(env_key), config["host"])
+        prime_json((env_key, "dynamieken"), data)
+        return data
+
+    return list_cache.get_or_load((env_key, "dynamieken"), loader)
+
+
+def invalidate_dynamieken(env_key, regel_id=None):
+    list_cache.invalidate((env_key, "dynamieken"))
+    if regel_id is not None:
+        forget_record(env_key, "dynamieken", regel_id)
+
+
+def record_detail(env_key, kind, record, doc_id=None, signature=None):
+    # Feed a full detail record into the search and rubriek usage indexes.
+    doc_id = doc_id if doc_id is not None else record_id(record)
+    if doc_id is None:
+        return
+    with phase("normalize"):
+        get_index(env_key).upsert(kind, record, source="detail", doc_id=doc_id)
+        expressions = collect_text(record).get("expressie") or []
+        get_rubriek_index(env_key).update(kind, doc_id, expressions, signature)
+
+
+def forget_record(env_key, kind, doc_id):
+    get_index(env_key).remove(kind, doc_id)
+    get_rubriek_index(env_key).remove(kind, doc_id)
+
+
+@coalesced
+@limited("read")
+def fetch_products(token, host):
+    client = get_client(host)
+    response = client.get(
+        f"{host}/contract/api/v1/contracten/verzekeringen/productdefinities",
+        params={
+            "AlleenLopendProduct": "<false>",
+            "IsBeschikbaarVoorAgent": "<true>",
+            "IsBeschikbaarVoorKlant": "<true>",
+            "IsBeschikbaarVoorMedewerker": "<true>",
+        },
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+            "MedewerkerId": "1",
+            "KantoorId": "1",
+        },
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    data = _decode(response)
+
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and "data" in data:
+        return data["data"]
+    if isinstance(data, dict) and "items" in data:
+        return data["items"]
+    return [data] if data else []
+
+
+@coalesced
+@limited("read")
+def fetch_product_detail(token, host, product_id):
+    client = get_client(host)
+    response = client.get(
+        f"{host}/contract/api/v1/contracten/verzekeringen/productdefinities/{product_id}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Tenant-CustomerId": "30439",
+            "BedrijfId": "1",
+            "MedewerkerId": "1",
+            "KantoorId": "1",
+        },
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    return _decode(response)
+
+
+def load_products(env_key):
+    def loader():
+        config = get_env_config(env_key)
+        data = fetch_products(get_bearer_token(env_key), config["host"])
+        prime_json((env_key, "products"), {"products": data, "count": len(data)}, source=data)
+        return data
+
+    return list_cache.get_or_load((env_key, "products"), loader)
@@ -0,0 +1,33 @@
+import importlib
+import threading
+
+
+# Module stand-in that imports the real module on first attribute access.
+# Keeps heavy dependencies (httpx, asyncio, ...) off the cold-start path of
+# functions that may never need them; `except httpx.HTTPStatusError` only
+# touches the attribute when an exception is actually being matched.
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+                module = self._module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,186 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+from _lazy import lazy_import
+from _metrics import METRICS_ENABLED, UPSTREAM_QUEUE_WAIT, UPSTREAM_QUEUED
+from _upstream import ACCEPTANCE_KINETIC_HOST, DEFAULT_KINETIC_HOST
+
+asyncio = lazy_import("asyncio")
+
+# Admission control for Kinetic calls, per environment and per class (read,
+# write): at most KINETIC_<CLASS>_CONCURRENCY calls in flight and a token
+# bucket of KINETIC_<CLASS>_RATE calls per second (bursts up to
+# KINETIC_<CLASS>_BURST; rate 0 means unlimited). A *_ACCEPTANCE variant of
+# each setting overrides it for the acceptance environment. Waiting callers
+# are admitted first come, first served, whether they are threads or tasks.
+DEFAULT_LIMITS = {
+    "read": {"CONCURRENCY": "8", "RATE": "50", "BURST": "50"},
+    "write": {"CONCURRENCY": "4", "RATE": "10", "BURST": "10"},
+}
+# How often waiting async callers re-check; threads are woken on release.
+POLL_SECONDS = 0.005
+
+
+def _setting(env_name, kind, name):
+    key = f"KINETIC_{kind.upper()}_{name}"
+    value = os.getenv(key, DEFAULT_LIMITS[kind][name])
+    if env_name == "acceptance":
+        value = os.getenv(f"{key}_ACCEPTANCE", value)
+    return float(value)
+
+
+def env_for_host(host):
+    # Both environments share one limiter when they point at the same host.
+    host = (host or "").rstrip("/")
+    if host == ACCEPTANCE_KINETIC_HOST.rstrip("/") and host != DEFAULT_KINETIC_HOST.rstrip("/"):
+        return "acceptance"
+    return "production"
+
+
+class Limiter:
+    def __init__(self, env_name, kind, concurrency, rate, burst):
+        self.env_name = env_name
+        self.kind = kind
+        self.concurrency = max(1, int(concurrency))
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.active = 0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def _admit(self, ticket):
+        # Caller holds the lock. Returns 0 once admitted, otherwise the seconds
+        # until the next token is due, or None while earlier callers or a full
+        # set of slots are in the way.
+        if self._queue[0] is not ticket or self.active >= self.concurrency:
+            return None
+        if self.rate > 0:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self._queue.popleft()
+        self.active += 1
+        # The next caller in line may be admissible as well.
+        self._cond.notify_all()
+        return 0
+
+    def _enqueue(self):
+        ticket = object()
+        with self._cond:
+            self._queue.append(ticket)
+        if METRICS_ENABLED:
+            UPSTREAM_QUEUED.inc(self.env_name, self.kind)
+        return ticket, time.monotonic()
+
+    def _admitted(self, started):
+        if METRICS_ENABLED:
+            UPSTREAM_QUEUED.dec(self.env_name, self.kind)
+            UPSTREAM_QUEUE_WAIT.observe(time.monotonic() - started, self.env_name, self.kind)
+
+    def _abandon(self, ticket):
+        with self._cond:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+        if METRICS_ENABLED:
+            UPSTREAM_QUEUED.dec(self.env_name, self.kind)
+
+    def acquire(self):
+        ticket, started = self._enqueue()
+        try:
+            with self._cond:
+                wait = self._admit(ticket)
+                while wait != 0:
+                    self._cond.wait(wait)
+                    wait = self._admit(ticket)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        self._admitted(started)
+
+    async def acquire_async(self):
+        ticket, started = self._enqueue()
+        try:
+            while True:
+                with self._cond:
+                    wait = self._admit(ticket)
+                if wait == 0:
+                    break
+                await asyncio.sleep(POLL_SECONDS if wait is None else wait)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        self._admitted(started)
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(host, kind):
+    env_name = env_for_host(host)
+    key = (env_name, kind)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = Limiter(
+                    env_name,
+                    kind,
+                    _setting(env_name, kind, "CONCURRENCY"),
+                    _setting(env_name, kind, "RATE"),
+                    _setting(env_name, kind, "BURST"),
+                )
+                _limiters[key] = limiter
+    return limiter
+
+
+def limited(kind):
+    # Decorator for the Kinetic call functions in _kinetic.py; the limiter is
+    # picked from their `host` argument. Works for sync and async functions.
+    def decorate(func):
+        host_index = func.__code__.co_varnames.index("host")
+
+        def limiter_for(args, kwargs):
+            host = kwargs["host"] if "host" in kwargs else args[host_index]
+            return get_limiter(host, kind)
+
+        if func.__code__.co_flags & 0x80:  # CO_COROUTINE
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                limiter = limiter_for(args, kwargs)
+                await limiter.acquire_async()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    limiter.release()
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            limiter = limiter_for(args, kwargs)
+            limiter.acquire()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                limiter.release()
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,295 @@
+import functools
+import os
+import threading
+from bisect import bisect_left
+
+import _profiling
+import _timing
+
+# Process-local metrics in Prometheus text format, served by /api/metrics.
+# Updates are a dict lookup and an add under a per-metric lock, cheap enough
+# for the hot path; METRICS_ENABLED=0 makes every update a no-op.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+UPSTREAM_ACTIONS = ("invoeren", "wijzigen")
+QUEUE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RUN_DURATION_BUCKETS = (30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0, 3600.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=(), register=True):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        # Unregistered metrics are built and rendered by their caller (for
+        # example per scrape), so METRICS_ENABLED does not apply to them.
+        self._snapshot = not register
+        if register:
+            with _registry_lock:
+                _registry.append(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(value) for value in labels)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        if not (METRICS_ENABLED or self._snapshot):
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        if not (METRICS_ENABLED or self._snapshot):
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        if not (METRICS_ENABLED or self._snapshot):
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, *labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS, register=True):
+        super().__init__(name, help_text, labelnames, register)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        if not (METRICS_ENABLED or self._snapshot):
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                state = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._values[key] = state
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, (list(state[0]), state[1], state[2])) for labels, state in self._values.items())
+        bounds = self.buckets + (float("inf"),)
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, labels, le), cumulative
+            base = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum", base, total
+            yield f"{self.name}_count", base, count
+
+
+def render(extra=()):
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in list(metrics) + list(extra):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Shared metrics; label values stay low-cardinality (route and endpoint
+# names, never ids).
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "API requests by route, method and status.", ("route", "method", "status")
+)
+HTTP_DURATION = Histogram(
+    "http_request_duration_seconds", "API request latency by route and method.", ("route", "method")
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "API requests currently being handled.", ("route",))
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests_total",
+    "Upstream (Kinetic, OpenAI) calls by endpoint, method and status; status is 'error' for transport failures.",
+    ("endpoint", "method", "status"),
+)
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "Upstream call latency until the response body is read, by endpoint and method.",
+    ("endpoint", "method"),
+)
+UPSTREAM_IN_FLIGHT = Gauge("upstream_requests_in_flight", "Upstream calls currently open.", ("endpoint",))
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Upstream GETs retried after a failure, by endpoint.", ("endpoint",))
+UPSTREAM_HEDGES = Counter(
+    "upstream_hedges_total",
+    "Hedged upstream reads by endpoint and which request answered first (primary, hedge).",
+    ("endpoint", "winner"),
+)
+UPSTREAM_COALESCED = Counter(
+    "upstream_coalesced_total", "Kinetic reads served by an identical call already in flight, by function.", ("function",)
+)
+UPSTREAM_QUEUE_WAIT = Histogram(
+    "upstream_queue_wait_seconds",
+    "Time Kinetic calls waited for the concurrency limiter and rate shaper, by environment and class (read, write).",
+    ("env", "kind"),
+    buckets=QUEUE_WAIT_BUCKETS,
+)
+UPSTREAM_QUEUED = Gauge(
+    "upstream_queued_requests", "Kinetic calls waiting for the limiter, by environment and class.", ("env", "kind")
+)
+CIRCUIT_STATE = Gauge(
+    "upstream_circuit_state", "Circuit breaker state per upstream host (0 closed, 1 open, 2 half-open).", ("host",)
+)
+CIRCUIT_REJECTIONS = Counter(
+    "upstream_circuit_rejections_total", "Upstream calls failed fast by an open circuit, by host.", ("host",)
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit, stale, miss, fallback; disk for second-tier hits).",
+    ("cache", "result"),
+)
+TOKEN_REFRESHES = Counter(
+    "token_refreshes_total",
+    "Kinetic bearer token requests by environment, trigger (blocking, background) and result.",
+    ("env", "trigger", "result"),
+)
+TEST_RUNS_STARTED = Counter("test_runs_started_total", "Test runs started by suite.", ("suite",))
+
+
+def instrument(route):
+    # Class decorator for the BaseHTTPRequestHandler entry points: times every
+    # do_<METHOD>, records the status passed to send_response, adds the
+    # request's Server-Timing header (see _timing.py) to every response and
+    # runs ?profile= requests under the profiler (see _profiling.py).
+    def decorate(handler_class):
+        for method in ("GET", "POST", "PUT", "DELETE", "OPTIONS"):
+            func = handler_class.__dict__.get(f"do_{method}")
+            if func is not None:
+                setattr(handler_class, f"do_{method}", _timed(func, route, method))
+        send_response = handler_class.send_response
+        end_headers = handler_class.end_headers
+
+        def send_response_recorded(self, code, message=None):
+            self._metrics_status = code
+            send_response(self, code, message)
+
+        def end_headers_timed(self):
+            timer = _timing.current()
+            if timer is not None:
+                self.send_header("Server-Timing", timer.header())
+                self.send_header("Timing-Allow-Origin", "*")
+            end_headers(self)
+
+        handler_class.send_response = send_response_recorded
+        handler_class.end_headers = end_headers_timed
+        return handler_class
+
+    return decorate
+
+
+def _timed(func, route, method):
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        self._metrics_status = None
+        timer = _timing.start(debug=_timing.wants_debug(getattr(self, "path", "")))
+        if METRICS_ENABLED:
+            HTTP_IN_FLIGHT.inc(route)
+        try:
+            mode = _profiling.requested_mode(self)
+            if mode is not None:
+                return _profiling.run_profiled(self, lambda handler: func(handler, *args, **kwargs), mode)
+            return func(self, *args, **kwargs)
+        except Exception:
+            self._metrics_status = self._metrics_status or 500
+            raise
+        finally:
+            _timing.stop()
+            if METRICS_ENABLED:
+                HTTP_DURATION.observe(timer.elapsed(), route, method)
+                HTTP_REQUESTS.inc(route, method, self._metrics_status or 0)
+                HTTP_IN_FLIGHT.dec(route)
+
+    return wrapper
+
+
+def upstream_endpoint(path):
+    # ".../acceptatieregels" -> "acceptatieregels", ".../acceptatieregels/123"
+    # -> "acceptatieregels.detail", ".../acceptatieregels/invoeren" ->
+    # "acceptatieregels.invoeren", "/v1/responses" -> "responses".
+    segments = [segment for segment in path.split("/") if segment]
+    if not segments:
+        return "/"
+    last = segments[-1]
+    if len(segments) == 1:
+        return last
+    if last in UPSTREAM_ACTIONS:
+        return f"{segments[-2]}.{last}"
+    if last.isdigit() or (len(last) >= 8 and any(char.isdigit() for char in last)):
+        return f"{segments[-2]}.detail"
+    return last
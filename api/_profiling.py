@@ -0,0 +1,128 @@
+import io
+import os
+import sys
+import threading
+import time
+
+from _auth import is_authorized
+
+# On-demand request profiling, safe to leave deployed: a request is only
+# profiled when PROFILE_TOKEN is set, the request passes Basic Auth and sends
+# the same value in X-Profile-Token. Otherwise ?profile= is ignored.
+#   ?profile=collapsed  sampled stacks, one "frame;frame;frame count" line each
+#                       (flamegraph.pl / speedscope input)
+#   ?profile=pstats     cProfile dump, load with pstats.Stats(path)
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "1")) / 1000
+MODES = ("collapsed", "pstats")
+
+
+def requested_mode(handler):
+    # Cheap check first; this runs on every request.
+    path = getattr(handler, "path", "") or ""
+    if not PROFILE_TOKEN or "profile=" not in path:
+        return None
+    mode = None
+    for pair in path.partition("?")[2].split("&"):
+        key, _, value = pair.partition("=")
+        if key == "profile" and value in MODES:
+            mode = value
+    if mode is None:
+        return None
+    import hmac
+
+    supplied = handler.headers.get("X-Profile-Token") or ""
+    if not hmac.compare_digest(supplied.encode(), PROFILE_TOKEN.encode()):
+        return None
+    if not is_authorized(handler.headers):
+        return None
+    return mode
+
+
+def _frame_name(code):
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+class StackSampler:
+    # Samples one thread's Python stack every `interval` seconds from a
+    # helper thread (sys._current_frames), so the profiled code runs at
+    # nearly full speed. Threads the request starts itself are not sampled.
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = max(interval, 0.0001)
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        lines = [f"{stack} {count}" for stack, count in sorted(self.counts.items())]
+        return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+
+
+def run_profiled(handler, func, mode):
+    # Runs func(handler) with its response captured, then answers with the
+    # profile instead. X-Profiled-Status carries the status it would have sent.
+    wfile = handler.wfile
+    handler.wfile = io.BytesIO()
+    started = time.perf_counter()
+    if mode == "pstats":
+        import cProfile
+        import marshal
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            func(handler)
+        finally:
+            profiler.disable()
+            handler.wfile = wfile
+        profiler.create_stats()
+        body = marshal.dumps(profiler.stats)
+        content_type = "application/octet-stream"
+        samples = None
+    else:
+        sampler = StackSampler(threading.get_ident()).start()
+        try:
+            func(handler)
+        finally:
+            sampler.stop()
+            handler.wfile = wfile
+        body = sampler.collapsed()
+        content_type = "text/plain; charset=utf-8"
+        samples = sampler.samples
+
+    status = getattr(handler, "_metrics_status", None)
+    handler.close_connection = True
+    handler.send_response(200)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.send_header("Cache-Control", "no-store")
+    handler.send_header("X-Profiled-Status", str(status or 0))
+    handler.send_header("X-Profile-Duration-Ms", f"{(time.perf_counter() - started) * 1000:.1f}")
+    if samples is not None:
+        handler.send_header("X-Profile-Samples", str(samples))
+    handler.end_headers()
+    handler.wfile.write(body)
@@ -0,0 +1,346 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+
+import _timing
+from _lazy import lazy_import
+from _metrics import (
+    CIRCUIT_REJECTIONS,
+    CIRCUIT_STATE,
+    UPSTREAM_HEDGES,
+    UPSTREAM_RETRIES,
+    upstream_endpoint,
+)
+from _upstream import CIRCUIT_OPEN_HEADER
+
+asyncio = lazy_import("asyncio")
+futures = lazy_import("concurrent.futures")
+
+# Resilience for every upstream call, as a transport wrapper around the
+# observed transport (see _upstream.py), so each attempt is measured:
+# - GETs are retried with full-jitter exponential backoff on transport errors
+#   and retryable statuses, within a time budget
+# - one circuit breaker per upstream host (the production and acceptance
+#   Kinetic hosts, OpenAI) fails fast with a synthetic 503 while open; the
+#   list cache then serves its last copy (see _cache.py)
+# - detail GETs can be hedged: a duplicate is sent once the first call is
+#   slower than that endpoint's recent p95, and the first response wins
+RETRY_ATTEMPTS = int(os.getenv("UPSTREAM_RETRY_ATTEMPTS", "3"))
+RETRY_BACKOFF_SECONDS = float(os.getenv("UPSTREAM_RETRY_BACKOFF_SECONDS", "0.2"))
+RETRY_BUDGET_SECONDS = float(os.getenv("UPSTREAM_RETRY_BUDGET_SECONDS", "10"))
+BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("UPSTREAM_BREAKER_RESET_SECONDS", "30"))
+HEDGE_ENABLED = os.getenv("UPSTREAM_HEDGE", "0") == "1"
+HEDGE_MIN_SAMPLES = int(os.getenv("UPSTREAM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("UPSTREAM_HEDGE_MIN_DELAY_MS", "20")) / 1000
+HEDGE_WORKERS = int(os.getenv("UPSTREAM_HEDGE_WORKERS", "16"))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+LATENCY_WINDOW = 200
+STATE_VALUES = {"closed": 0, "open": 1, "half-open": 2}
+
+
+def _is_failure(status_code):
+    # Statuses that say the upstream is unhealthy, not that the request was wrong.
+    return status_code == 429 or status_code >= 500
+
+
+class CircuitBreaker:
+    # closed -> open after `failures` consecutive failures; open -> half-open
+    # after `reset_seconds`, when a single probe request decides whether it
+    # closes again or reopens.
+    def __init__(self, name, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.threshold = failures
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        self.state = state
+        CIRCUIT_STATE.set(self.name, value=STATE_VALUES[state])
+
+    def allow(self):
+        if self.threshold <= 0:
+            return True
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    return False
+                self._set_state("half-open")
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, success):
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            self._probing = False
+            if success:
+                self.failures = 0
+                if self.state != "closed":
+                    self._set_state("closed")
+                return
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                self._set_state("open")
+
+    def abandon(self):
+        # The attempt ended without an answer (cancelled, or an error that is
+        # not the upstream's): it says nothing about health, so a half-open
+        # breaker lets the next call probe instead.
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            self._probing = False
+
+    def retry_after(self):
+        return max(self.reset_seconds - (time.monotonic() - self.opened_at), 0.0)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host):
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(
+                host, CircuitBreaker(host, BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+            )
+    return breaker
+
+
+class LatencyTracker:
+    # Recent time-to-response per endpoint, for the hedging threshold.
+    def __init__(self):
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds):
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=LATENCY_WINDOW)
+            samples.append(seconds)
+
+    def p95(self, endpoint):
+        with self._lock:
+            samples = list(self._samples.get(endpoint) or ())
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        samples.sort()
+        return samples[int(0.95 * (len(samples) - 1))]
+
+
+latencies = LatencyTracker()
+
+
+def _hedge_delay(request, endpoint):
+    if not HEDGE_ENABLED or request.method != "GET" or not endpoint.endswith(".detail"):
+        return None
+    p95 = latencies.p95(endpoint)
+    return None if p95 is None else max(p95, HEDGE_MIN_DELAY_SECONDS)
+
+
+def _backoff(attempt, attempts, started):
+    # Delay before the next attempt, or None when out of attempts or budget.
+    if attempt >= attempts:
+        return None
+    delay = random.uniform(0, RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)))
+    if time.monotonic() - started + delay >= RETRY_BUDGET_SECONDS:
+        return None
+    return delay
+
+
+def _circuit_open(request, breaker):
+    CIRCUIT_REJECTIONS.inc(breaker.name)
+    return httpx.Response(
+        503,
+        headers={CIRCUIT_OPEN_HEADER: "open", "Retry-After": str(int(breaker.retry_after()) + 1)},
+        json={"error": f"Circuit open for {breaker.name}; failing fast"},
+        request=request,
+    )
+
+
+class _Attempts:
+    # Shared retry/breaker bookkeeping of the sync and async transports.
+    def __init__(self, request):
+        self.request = request
+        self.endpoint = upstream_endpoint(request.url.path)
+        self.breaker = get_breaker(request.url.host)
+        self.attempts = RETRY_ATTEMPTS if request.method in IDEMPOTENT_METHODS else 1
+        self.started = time.monotonic()
+        self.attempt = 0
+
+    def next_delay_after_error(self):
+        self.breaker.record(False)
+        return _backoff(self.attempt, self.attempts, self.started)
+
+    def next_delay_after(self, response):
+        failed = _is_failure(response.status_code)
+        self.breaker.record(not failed)
+        if response.status_code not in RETRYABLE_STATUS_CODES:
+            return None
+        return _backoff(self.attempt, self.attempts, self.started)
+
+
+class ResilientTransport(httpx.BaseTransport):
+    def __init__(self, inner):
+        self._inner = inner
+
+    def _send(self, request, endpoint):
+        started = time.monotonic()
+        response = self._inner.handle_request(request)
+        latencies.record(endpoint, time.monotonic() - started)
+        return response
+
+    def _hedged(self, request, endpoint, delay):
+        pool = _hedge_pool()
+        primary = pool.submit(self._send, request, endpoint)
+        try:
+            return primary.result(timeout=delay)
+        except futures.TimeoutError:
+            pass
+        hedge = pool.submit(self._send, request, endpoint)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                UPSTREAM_HEDGES.inc(endpoint, "hedge" if future is hedge else "primary")
+                for other in pending:
+                    other.add_done_callback(_close_loser)
+                return future.result()
+        raise error
+
+    def handle_request(self, request):
+        state = _Attempts(request)
+        while True:
+            state.attempt += 1
+            if not state.breaker.allow():
+                return _circuit_open(request, state.breaker)
+            delay = _hedge_delay(request, state.endpoint)
+            try:
+                if delay is None:
+                    response = self._send(request, state.endpoint)
+                else:
+                    # Attempts run on pool threads; time them as one phase here.
+                    with _timing.phase("upstream"):
+                        response = self._hedged(request, state.endpoint, delay)
+            except httpx.TransportError:
+                wait = state.next_delay_after_error()
+                if wait is None:
+                    raise
+            except BaseException:
+                state.breaker.abandon()
+                raise
+            else:
+                wait = state.next_delay_after(response)
+                if wait is None:
+                    return response
+                response.close()
+            UPSTREAM_RETRIES.inc(state.endpoint)
+            time.sleep(wait)
+
+    def close(self):
+        self._inner.close()
+
+
+class AsyncResilientTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner):
+        self._inner = inner
+
+    async def _send(self, request, endpoint):
+        started = time.monotonic()
+        response = await self._inner.handle_async_request(request)
+        latencies.record(endpoint, time.monotonic() - started)
+        return response
+
+    async def _hedged(self, request, endpoint, delay):
+        primary = asyncio.ensure_future(self._send(request, endpoint))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        hedge = asyncio.ensure_future(self._send(request, endpoint))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = error or task.exception()
+                    continue
+                UPSTREAM_HEDGES.inc(endpoint, "hedge" if task is hedge else "primary")
+                for other in pending:
+                    other.cancel()
+                return task.result()
+        raise error
+
+    async def handle_async_request(self, request):
+        state = _Attempts(request)
+        while True:
+            state.attempt += 1
+            if not state.breaker.allow():
+                return _circuit_open(request, state.breaker)
+            delay = _hedge_delay(request, state.endpoint)
+            try:
+                if delay is None:
+                    response = await self._send(request, state.endpoint)
+                else:
+                    response = await self._hedged(request, state.endpoint, delay)
+            except httpx.TransportError:
+                wait = state.next_delay_after_error()
+                if wait is None:
+                    raise
+            except BaseException:
+                state.breaker.abandon()
+                raise
+            else:
+                wait = state.next_delay_after(response)
+                if wait is None:
+                    return response
+                await response.aclose()
+            UPSTREAM_RETRIES.inc(state.endpoint)
+            await asyncio.sleep(wait)
+
+    async def aclose(self):
+        await self._inner.aclose()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _hedge_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = futures.ThreadPoolExecutor(
+                    max_workers=HEDGE_WORKERS, thread_name_prefix="upstream-hedge"
+                )
+    return _pool
+
+
+def _close_loser(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
@@ -0,0 +1,108 @@
+import re
+import threading
+import time
+
+RUBRIEK_PATTERN = re.compile(r"[A-Za-z]{1,10}_[A-Za-z0-9]+")
+
+
+def extract_rubriek_codes(expression):
+    seen = set()
+    ordered = []
+    for match in RUBRIEK_PATTERN.finditer(expression or ""):
+        code = match.group(0)
+        if code in seen:
+            continue
+        seen.add(code)
+        ordered.append(code)
+    return ordered
+
+
+# Reverse index rubriek code -> documents ((kind, id)) whose expressions use it.
+# Codes are matched case-insensitively.
+class RubriekIndex:
+    def __init__(self):
+        self._by_code = {}
+        self._by_doc = {}
+        self._signatures = {}
+        self._lock = threading.Lock()
+        self.status = {
+            "state": "empty",
+            "indexed": 0,
+            "total": 0,
+            "errors": 0,
+            "started_at": None,
+            "finished_at": None,
+        }
+
+    def __len__(self):
+        return len(self._by_doc)
+
+    def signature(self, kind, doc_id):
+        return self._signatures.get((kind, str(doc_id)))
+
+    def update(self, kind, doc_id, expressions, signature=None):
+        key = (kind, str(doc_id))
+        codes = set()
+        for expression in expressions:
+            codes.update(code.upper() for code in extract_rubriek_codes(expression))
+        with self._lock:
+            old_codes = self._by_doc.get(key, set())
+            for code in old_codes - codes:
+                docs = self._by_code.get(code)
+                if docs is not None:
+                    docs.discard(key)
+                    if not docs:
+                        del self._by_code[code]
+            for code in codes - old_codes:
+                self._by_code.setdefault(code, set()).add(key)
+            self._by_doc[key] = codes
+            self._signatures[key] = signature
+
+    def remove(self, kind, doc_id):
+        key = (kind, str(doc_id))
+        with self._lock:
+            self._signatures.pop(key, None)
+            for code in self._by_doc.pop(key, set()):
+                docs = self._by_code.get(code)
+                if docs is not None:
+                    docs.discard(key)
+                    if not docs:
+                        del self._by_code[code]
+
+    def doc_keys(self, kind):
+        with self._lock:
+            return [key for key in self._by_doc if key[0] == kind]
+
+    def lookup(self, code):
+        with self._lock:
+            docs = sorted(self._by_code.get((code or "").upper(), ()))
+        usage = {}
+        for kind, doc_id in docs:
+            usage.setdefault(kind, []).append(doc_id)
+        return usage
+
+    def codes(self):
+        with self._lock:
+            return sorted(
+                ({"code": code, "count": len(docs)} for code, docs in self._by_code.items()),
+                key=lambda item: (-item["count"], item["code"]),
+            )
+
+    def set_status(self, **updates):
+        with self._lock:
+            self.status.update(updates)
+            if updates.get("state") == "ready":
+                self.status["finished_at"] = time.time()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_rubriek_index(env_key):
+    with _indexes_lock:
+        index = _indexes.get(env_key)
+        if index is None:
+            index = RubriekIndex()
+            _indexes[env_key] = index
+        return index
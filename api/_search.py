@@ -0,0 +1,218 @@
+import bisect
+import heapq
+import re
+import threading
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+SEARCH_FIELDS = ("omschrijving", "expressie")
+ID_FIELDS = ("RegelId", "Regelid", "regelid", "regelId", "RegelID", "id")
+
+
+def tokenize(text):
+    # Whole words plus their underscore parts, so "PDA_123" is found by
+    # "pda_123", "pda" and "123".
+    tokens = set()
+    for match in TOKEN_PATTERN.finditer((text or "").lower()):
+        word = match.group(0)
+        tokens.add(word)
+        if "_" in word:
+            tokens.update(part for part in word.split("_") if part)
+    return tokens
+
+
+def collect_text(node, found=None):
+    # Omschrijving/Expressie can sit at any depth (e.g. dynamiek Rekenregels).
+    if found is None:
+        found = {}
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if isinstance(value, str) and str(key).lower() in SEARCH_FIELDS:
+                found.setdefault(str(key).lower(), []).append(value)
+            elif isinstance(value, (dict, list)):
+                collect_text(value, found)
+    elif isinstance(node, list):
+        for item in node:
+            collect_text(item, found)
+    return found
+
+
+def record_id(record):
+    if not isinstance(record, dict):
+        return None
+    for key in ID_FIELDS:
+        value = record.get(key)
+        if value is not None and value != "":
+            return str(value)
+    return None
+
+
+def flatten_records(items):
+    for item in items or []:
+        if not item:
+            continue
+        if isinstance(item, list):
+            yield from flatten_records(item)
+        elif isinstance(item, dict) and isinstance(item.get("Data"), list):
+            yield from flatten_records(item["Data"])
+        elif isinstance(item, dict):
+            yield item
+
+
+class SearchIndex:
+    def __init__(self):
+        self._postings = {}
+        self._docs = {}
+        self._sorted_tokens = []
+        self._tokens_dirty = False
+        self._synced_sources = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _index_doc(self, key, doc):
+        text = " ".join(" ".join(parts) for parts in doc["sources"].values())
+        tokens = tokenize(text)
+        old_tokens = doc.get("tokens", set())
+        for token in old_tokens - tokens:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[token]
+                    self._tokens_dirty = True
+        for token in tokens - old_tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                self._postings[token] = {key}
+                self._tokens_dirty = True
+            else:
+                postings.add(key)
+        doc["tokens"] = tokens
+
+    def upsert(self, kind, record, source="list", doc_id=None):
+        doc_id = str(doc_id) if doc_id is not None else record_id(record)
+        if doc_id is None:
+            return False
+        key = (kind, doc_id)
+        found = collect_text(record)
+        texts = tuple(found.get(field) and "\n".join(found[field]) or "" for field in SEARCH_FIELDS)
+        with self._lock:
+            doc = self._docs.get(key)
+            if doc is None:
+                doc = {"kind": kind, "id": doc_id, "sources": {}, "fields": {}}
+                self._docs[key] = doc
+            if doc["sources"].get(source) == texts:
+                return False
+            doc["sources"][source] = texts
+            omschrijving = record.get("Omschrijving") or record.get("omschrijving")
+            if isinstance(omschrijving, str):
+                doc["fields"]["omschrijving"] = omschrijving
+            self._index_doc(key, doc)
+            return True
+
+    def remove(self, kind, doc_id):
+        key = (kind, str(doc_id))
+        with self._lock:
+            doc = self._docs.pop(key, None)
+            if doc is None:
+                return
+            for token in doc["tokens"]:
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.discard(key)
+                    if not postings:
+                        del self._postings[token]
+                        self._tokens_dirty = True
+
+    def sync_list(self, kind, records):
+        # Lists come from the shared list cache; the same object means nothing
+        # changed since the last sync, so only new snapshots are diffed.
+        with self._lock:
+            if self._synced_sources.get(kind) is records:
+                return 0
+            seen = set()
+            changed = 0
+            for record in flatten_records(records):
+                doc_id = record_id(record)
+                if doc_id is None:
+                    continue
+                seen.add(doc_id)
+                if self.upsert(kind, record, source="list"):
+                    changed += 1
+            for key in [key for key in self._docs if key[0] == kind and key[1] not in seen]:
+                self.remove(*key)
+                changed += 1
+            self._synced_sources[kind] = records
+            return changed
+
+    def _matching_tokens(self, term):
+        if self._tokens_dirty:
+            self._sorted_tokens = sorted(self._postings)
+            self._tokens_dirty = False
+        tokens = self._sorted_tokens
+        index = bisect.bisect_left(tokens, term)
+        matches = []
+        while index < len(tokens) and tokens[index].startswith(term):
+            matches.append(tokens[index])
+            index += 1
+        return matches
+
+    def search(self, query, kinds=None, limit=50):
+        terms = [match.group(0) for match in TOKEN_PATTERN.finditer((query or "").lower())]
+        if not terms:
+            return {"results": [], "total": 0}
+        with self._lock:
+            candidates = None
+            exact_sets = []
+            for term in terms:
+                matched = set().union(
+                    *(self._postings[token] for token in self._matching_tokens(term))
+                )
+                candidates = matched if candidates is None else candidates & matched
+                exact_sets.append(self._postings.get(term, ()))
+                if not candidates:
+                    break
+            candidates = candidates or set()
+            if kinds:
+                candidates = {key for key in candidates if key[0] in kinds}
+
+            # Exact token hits outrank prefix hits: score = terms + exact hits.
+            exact_hits = {}
+            for exact in exact_sets:
+                for key in candidates.intersection(exact):
+                    exact_hits[key] = exact_hits.get(key, 0) + 1
+            tiers = {0: candidates.difference(exact_hits)}
+            for key, hits in exact_hits.items():
+                tiers.setdefault(hits, []).append(key)
+
+            results = []
+            for hits in sorted(tiers, reverse=True):
+                remaining = limit - len(results)
+                if remaining <= 0:
+                    break
+                for key in heapq.nsmallest(remaining, tiers[hits]):
+                    doc = self._docs[key]
+                    results.append(
+                        {
+                            "kind": doc["kind"],
+                            "id": doc["id"],
+                            "omschrijving": doc["fields"].get("omschrijving", ""),
+                            "score": len(terms) + hits,
+                        }
+                    )
+            return {"results": results, "total": len(candidates)}
+
+
+# One index per Kinetic environment
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(env_key):
+    with _indexes_lock:
+        index = _indexes.get(env_key)
+        if index is None:
+            index = SearchIndex()
+            _indexes[env_key] = index
+        return index
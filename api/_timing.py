@@ -0,0 +1,90 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-request phase timer behind the Server-Timing header. The handler
+# wrapper (see _metrics.instrument) starts one timer per request on the
+# handler thread; shared code marks its phases with `with phase(...)`.
+# Phases do not nest: time spent in an inner phase counts towards the
+# outermost one (the token request is "token", not "upstream").
+PHASES = ("auth", "token", "upstream", "normalize", "serialize")
+
+_local = threading.local()
+
+
+class RequestTimer:
+    def __init__(self, debug=False):
+        self.debug = debug
+        self.started = time.perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.active = None
+
+    def begin(self, name):
+        # Returns a handle for end(), or None when another phase is active.
+        if self.active is not None:
+            return None
+        self.active = name
+        return name, time.perf_counter()
+
+    def end(self, handle):
+        if handle is None:
+            return
+        name, started = handle
+        self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - started
+        if self.active == name:
+            self.active = None
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def breakdown(self):
+        # Milliseconds per phase plus the total so far.
+        result = {name: round(seconds * 1000, 2) for name, seconds in self.durations.items()}
+        result["total"] = round(self.elapsed() * 1000, 2)
+        return result
+
+    def header(self):
+        return ", ".join(f"{name};dur={value}" for name, value in self.breakdown().items())
+
+
+def start(debug=False):
+    timer = RequestTimer(debug)
+    _local.timer = timer
+    return timer
+
+
+def stop():
+    _local.timer = None
+
+
+def current():
+    return getattr(_local, "timer", None)
+
+
+def begin(name):
+    timer = current()
+    if timer is None:
+        return None
+    handle = timer.begin(name)
+    return None if handle is None else (timer, handle)
+
+
+def end(handle):
+    if handle is not None:
+        timer, inner = handle
+        timer.end(inner)
+
+
+@contextmanager
+def phase(name):
+    handle = begin(name)
+    try:
+        yield
+    finally:
+        end(handle)
+
+
+def wants_debug(path):
+    # ?debug=timing adds the breakdown to JSON response bodies.
+    query = (path or "").partition("?")[2]
+    return "debug=timing" in query.split("&")
@@ -0,0 +1,237 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from _metrics import CACHE_REQUESTS, TOKEN_REFRESHES
+from _timing import phase
+from _upstream import get_client, get_env_config
+
+# Tokens are reused until 5 minutes before expiry and refreshed in the
+# background once they enter the refresh-ahead window.
+EXPIRY_MARGIN_SECONDS = 300
+REFRESH_AHEAD_SECONDS = int(os.getenv("TOKEN_REFRESH_AHEAD_SECONDS", "600"))
+TOKEN_REQUEST_TIMEOUT_SECONDS = 30.0
+# A live refresh holds the lock file for at most the token request; httpx
+# applies the timeout per phase (connect, write, read), so only a lock well
+# past it belongs to a process that died. Waiters outlast the stale
+# threshold so they can take over such a lock.
+LOCK_STALE_SECONDS = TOKEN_REQUEST_TIMEOUT_SECONDS + 30
+LOCK_WAIT_SECONDS = LOCK_STALE_SECONDS + 5
+
+# Cache bearer token between requests to reduce token calls
+token_cache = {
+    "production": {"token": None, "expires_at": None, "refresh_at": None},
+    "acceptance": {"token": None, "expires_at": None, "refresh_at": None},
+}
+
+_env_locks = {
+    "production": threading.Lock(),
+    "acceptance": threading.Lock(),
+}
+_refresh_timers = {}
+
+
+def _env_key(env_key):
+    return "acceptance" if env_key == "acceptance" else "production"
+
+
+def token_store_dir():
+    configured = os.getenv("TOKEN_CACHE_DIR")
+    root = configured or os.path.join(tempfile.gettempdir(), "acceptatiebeheer-tokens")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def _store_path(env_key):
+    return os.path.join(token_store_dir(), f"{env_key}.json")
+
+
+def _lock_path(env_key):
+    return os.path.join(token_store_dir(), f"{env_key}.lock")
+
+
+def _is_usable(entry, now=None):
+    if not entry or not entry.get("token") or not entry.get("expires_at"):
+        return False
+    return (now or time.time()) < entry["expires_at"]
+
+
+def _needs_refresh(entry, now=None):
+    refresh_at = entry.get("refresh_at") or entry["expires_at"] - REFRESH_AHEAD_SECONDS
+    return (now or time.time()) >= refresh_at
+
+
+def _read_store(env_key):
+    try:
+        with open(_store_path(env_key), "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+    except Exception:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return {
+        "token": data.get("token"),
+        "expires_at": data.get("expires_at"),
+        "refresh_at": data.get("refresh_at"),
+    }
+
+
+def _write_store(env_key, entry):
+    path = _store_path(env_key)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(entry, handle)
+    os.replace(tmp, path)
+
+
+def _acquire_file_lock(env_key, wait_seconds):
+    # O_EXCL lock file works on every platform and across worker processes.
+    path = _lock_path(env_key)
+    deadline = time.time() + wait_seconds
+    while True:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > LOCK_STALE_SECONDS:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+
+
+def _release_file_lock(env_key):
+    try:
+        os.remove(_lock_path(env_key))
+    except FileNotFoundError:
+        pass
+
+
+def _request_token(env_key):
+    config = get_env_config(env_key)
+    if not config["client_id"] or not config["client_secret"]:
+        raise RuntimeError(
+            f"KINETIC_CLIENT_ID or KINETIC_CLIENT_SECRET is not set for {env_key}"
+        )
+
+    client = get_client(config["host"])
+    response = client.post(
+        f"{config['host']}/token",
+        params={
+            "client_id": config["client_id"],
+            "client_secret": config["client_secret"],
+        },
+        timeout=TOKEN_REQUEST_TIMEOUT_SECONDS,
+    )
+    response.raise_for_status()
+
+    data = response.json()
+    token = data.get("access_token")
+    expires_in = data.get("expires_in", 3600)
+
+    if not token:
+        raise RuntimeError("Bearer token missing from token response")
+
+    # Refresh 5 minutes before expiry, and in the background well before that
+    lifetime = max(expires_in - EXPIRY_MARGIN_SECONDS, 60)
+    issued_at = time.time()
+    return {
+        "token": token,
+        "expires_at": issued_at + lifetime,
+        "refresh_at": issued_at + lifetime - min(REFRESH_AHEAD_SECONDS, lifetime / 2),
+    }
+
+
+def _refresh(env_key, force=False):
+    # Caller holds the in-process lock for env_key; the file lock makes the
+    # refresh single-flight across processes as well.
+    if not _acquire_file_lock(env_key, LOCK_WAIT_SECONDS):
+        stored = _read_store(env_key)
+        if _is_usable(stored):
+            return stored
+        raise RuntimeError(f"Timed out waiting for token refresh for {env_key}")
+    try:
+        stored = _read_store(env_key)
+        if _is_usable(stored) and not (force and _needs_refresh(stored)):
+            return stored
+        trigger = "background" if force else "blocking"
+        try:
+            entry = _request_token(env_key)
+        except Exception:
+            TOKEN_REFRESHES.inc(env_key, trigger, "error")
+            raise
+        TOKEN_REFRESHES.inc(env_key, trigger, "ok")
+        _write_store(env_key, entry)
+        return entry
+    finally:
+        _release_file_lock(env_key)
+
+
+def _remember(env_key, entry):
+    cache = token_cache[env_key]
+    cache["token"] = entry["token"]
+    cache["expires_at"] = entry["expires_at"]
+    cache["refresh_at"] = entry.get("refresh_at")
+    _schedule_refresh(env_key, entry)
+
+
+def _schedule_refresh(env_key, entry):
+    timer = _refresh_timers.get(env_key)
+    if timer is not None:
+        timer.cancel()
+    refresh_at = entry.get("refresh_at") or entry["expires_at"] - REFRESH_AHEAD_SECONDS
+    delay = max(refresh_at - time.time(), 1)
+    timer = threading.Timer(delay, _background_refresh, args=(env_key,))
+    timer.daemon = True
+    _refresh_timers[env_key] = timer
+    timer.start()
+
+
+def _background_refresh(env_key):
+    lock = _env_locks[env_key]
+    if not lock.acquire(blocking=False):
+        # Another thread is already refreshing this environment.
+        return
+    try:
+        _remember(env_key, _refresh(env_key, force=True))
+    except Exception:
+        # The request path falls back to a blocking refresh on expiry.
+        pass
+    finally:
+        lock.release()
+
+
+def get_bearer_token(env_key="production"):
+    with phase("token"):
+        return _bearer_token(_env_key(env_key))
+
+
+def _bearer_token(env_key):
+    cache = token_cache[env_key]
+    now = time.time()
+    if _is_usable(cache, now):
+        CACHE_REQUESTS.inc("token", "hit")
+        if _needs_refresh(cache, now) and not _env_locks[env_key].locked():
+            threading.Thread(target=_background_refresh, args=(env_key,), daemon=True).start()
+        return cache["token"]
+
+    CACHE_REQUESTS.inc("token", "miss")
+    with _env_locks[env_key]:
+        # Only one thread per environment refreshes; the rest reuse its result.
+        if _is_usable(cache):
+            return cache["token"]
+        stored = _read_store(env_key)
+        if not _is_usable(stored):
+            stored = _refresh(env_key)
+        _remember(env_key, stored)
+        return stored["token"]
+
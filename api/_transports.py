@@ -0,0 +1,108 @@
+import time
+
+import httpx
+
+import _timing
+from _metrics import (
+    METRICS_ENABLED,
+    UPSTREAM_DURATION,
+    UPSTREAM_IN_FLIGHT,
+    UPSTREAM_REQUESTS,
+    upstream_endpoint,
+)
+
+# Transport wrappers for the shared upstream clients (see _upstream.py). The
+# timer stops when the response body is closed, so latency includes reading
+# the (large) list payloads, not just the response headers. The same span is
+# the request's "upstream" Server-Timing phase.
+
+
+class _Observation:
+    def __init__(self, request):
+        self.endpoint = upstream_endpoint(request.url.path)
+        self.method = request.method
+        self.started = time.perf_counter()
+        self.done = False
+        self.phase = _timing.begin("upstream")
+        if METRICS_ENABLED:
+            UPSTREAM_IN_FLIGHT.inc(self.endpoint)
+
+    def finish(self, status):
+        if self.done:
+            return
+        self.done = True
+        _timing.end(self.phase)
+        if METRICS_ENABLED:
+            UPSTREAM_DURATION.observe(time.perf_counter() - self.started, self.endpoint, self.method)
+            UPSTREAM_REQUESTS.inc(self.endpoint, self.method, status)
+            UPSTREAM_IN_FLIGHT.dec(self.endpoint)
+
+
+class _ObservedStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    def __init__(self, stream, observation, status):
+        self._stream = stream
+        self._observation = observation
+        self._status = status
+
+    def __iter__(self):
+        yield from self._stream
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._observation.finish(self._status)
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._observation.finish(self._status)
+
+
+def _observe_body(response, observation):
+    if isinstance(response.stream, httpx.ByteStream):
+        # In-memory body (cassette replay, mocks): already complete.
+        observation.finish(response.status_code)
+    else:
+        response.stream = _ObservedStream(response.stream, observation, response.status_code)
+
+
+class ObservedTransport(httpx.BaseTransport):
+    def __init__(self, inner):
+        self._inner = inner
+
+    def handle_request(self, request):
+        observation = _Observation(request)
+        try:
+            response = self._inner.handle_request(request)
+        except Exception:
+            observation.finish("error")
+            raise
+        _observe_body(response, observation)
+        return response
+
+    def close(self):
+        self._inner.close()
+
+
+class AsyncObservedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner):
+        self._inner = inner
+
+    async def handle_async_request(self, request):
+        observation = _Observation(request)
+        try:
+            response = await self._inner.handle_async_request(request)
+        except Exception:
+            observation.finish("error")
+            raise
+        _observe_body(response, observation)
+        return response
+
+    async def aclose(self):
+        await self._inner.aclose()
@@ -0,0 +1,121 @@
+import importlib.util
+import os
+import threading
+
+from _lazy import lazy_import
+
+httpx = lazy_import("httpx")
+_cassette = lazy_import("_cassette")
+_resilience = lazy_import("_resilience")
+_transports = lazy_import("_transports")
+
+# Pool settings for the shared upstream clients (Kinetic, OpenAI)
+MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+HTTP2_ENABLED = os.getenv("UPSTREAM_HTTP2", "0") == "1"
+# "record" captures upstream traffic to a cassette, "replay" serves it offline
+CASSETTE_MODE = os.getenv("UPSTREAM_CASSETTE_MODE", "").strip().lower()
+# Set on the 503 the resilience layer returns while a host's circuit is open
+CIRCUIT_OPEN_HEADER = "X-Circuit-Open"
+
+DEFAULT_KINETIC_HOST = os.getenv("KINETIC_HOST", "https://kinetic.private-insurance.eu")
+DEFAULT_CLIENT_ID = os.getenv("KINETIC_CLIENT_ID")
+DEFAULT_CLIENT_SECRET = os.getenv("KINETIC_CLIENT_SECRET")
+ACCEPTANCE_KINETIC_HOST = os.getenv("KINETIC_HOST_ACCEPTANCE", DEFAULT_KINETIC_HOST)
+ACCEPTANCE_CLIENT_ID = os.getenv("KINETIC_CLIENT_ID_ACCEPTANCE", DEFAULT_CLIENT_ID)
+ACCEPTANCE_CLIENT_SECRET = os.getenv("KINETIC_CLIENT_SECRET_ACCEPTANCE", DEFAULT_CLIENT_SECRET)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_env_config(env_key):
+    if env_key == "acceptance":
+        return {
+            "host": ACCEPTANCE_KINETIC_HOST,
+            "client_id": ACCEPTANCE_CLIENT_ID,
+            "client_secret": ACCEPTANCE_CLIENT_SECRET,
+        }
+    return {
+        "host": DEFAULT_KINETIC_HOST,
+        "client_id": DEFAULT_CLIENT_ID,
+        "client_secret": DEFAULT_CLIENT_SECRET,
+    }
+
+
+def http2_available():
+    # httpx only speaks HTTP/2 when the optional h2 package is installed
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def _pool_limits():
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def _transport(asynchronous):
+    # Cassette (record/replay) or real pooled transport, wrapped for metrics
+    # and Server-Timing, then for retries, circuit breaking and hedging.
+    options = {"http2": http2_available(), "limits": _pool_limits()}
+    if CASSETTE_MODE:
+        transport = _cassette.build_transport(CASSETTE_MODE, asynchronous, **options)
+    elif asynchronous:
+        transport = httpx.AsyncHTTPTransport(**options)
+    else:
+        transport = httpx.HTTPTransport(**options)
+    if asynchronous:
+        return _resilience.AsyncResilientTransport(_transports.AsyncObservedTransport(transport))
+    return _resilience.ResilientTransport(_transports.ObservedTransport(transport))
+
+
+def is_circuit_open(exc):
+    response = getattr(exc, "response", None)
+    return response is not None and response.headers.get(CIRCUIT_OPEN_HEADER) == "open"
+
+
+def is_upstream_unavailable(exc):
+    # Failures worth answering from a stale cache copy: no connection, an open
+    # circuit or an upstream 5xx/429. Client errors (4xx) are passed through.
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        status_code = exc.response.status_code
+        return status_code == 429 or status_code >= 500
+    return False
+
+
+def _build_client():
+    return httpx.Client(transport=_transport(False))
+
+
+def build_async_client():
+    # Async clients are bound to the event loop that uses them, so callers
+    # create one per loop (e.g. per batch) and close it with `async with`.
+    return httpx.AsyncClient(transport=_transport(True))
+
+
+def get_client(base_url):
+    # One keep-alive client per upstream host, so production and acceptance
+    # each get their own connection pool that survives between requests.
+    key = (base_url or "").rstrip("/")
+    client = _clients.get(key)
+    if client is not None and not client.is_closed:
+        return client
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None or client.is_closed:
+            client = _build_client()
+            _clients[key] = client
+        return client
+
+
+def close_clients():
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
@@ -1,10 +1,7 @@
 from http.server import BaseHTTPRequestHandler
-from datetime import datetime, timedelta
-import httpx
 import json
 import os
 import sys
-import uuid
 from urllib.parse import parse_qs, urlparse
 
 current_dir = os.path.dirname(__file__)
@@ -12,183 +9,177 @@ if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 from _auth import is_authorized, send_unauthorized
-
-# Cache bearer token between requests to reduce token calls
-token_cache = {
-    "production": {"token": None, "expires_at": None},
-    "acceptance": {"token": None, "expires_at": None},
+from _http import send_json
+from _kinetic import (
+    create_rule,
+    delete_rule,
+    fetch_rule_detail,
+    invalidate_rules,
+    load_rules,
+    record_detail,
+    rule_payload,
+    update_rule,
+)
+from _lazy import lazy_import
+from _metrics import instrument
+from _timing import phase
+from _tokens import get_bearer_token
+from _upstream import get_env_config
+
+httpx = lazy_import("httpx")
+# Only batch and bulk requests need these (asyncio, thread pools).
+_batch = lazy_import("_batch")
+_bulk = lazy_import("_bulk")
+
+
+# Field name -> upstream spellings, in lookup order
+RULE_FIELDS = {
+    "regelId": ("regelId", "RegelId", "id"),
+    "externNummer": ("externNummer", "ExternNummer"),
+    "omschrijving": ("omschrijving", "Omschrijving"),
+    "AfdBrancheCodeId": ("AfdBrancheCodeId", "afdBrancheCodeId"),
 }
-
-DEFAULT_KINETIC_HOST = os.getenv("KINETIC_HOST", "https://kinetic.private-insurance.eu")
-DEFAULT_CLIENT_ID = os.getenv("KINETIC_CLIENT_ID")
-DEFAULT_CLIENT_SECRET = os.getenv("KINETIC_CLIENT_SECRET")
-ACCEPTANCE_KINETIC_HOST = os.getenv("KINETIC_HOST_ACCEPTANCE", DEFAULT_KINETIC_HOST)
-ACCEPTANCE_CLIENT_ID = os.getenv("KINETIC_CLIENT_ID_ACCEPTANCE", DEFAULT_CLIENT_ID)
-ACCEPTANCE_CLIENT_SECRET = os.getenv("KINETIC_CLIENT_SECRET_ACCEPTANCE", DEFAULT_CLIENT_SECRET)
-
-
-def get_env_config(env_key):
-    if env_key == "acceptance":
-        return {
-            "host": ACCEPTANCE_KINETIC_HOST,
-            "client_id": ACCEPTANCE_CLIENT_ID,
-            "client_secret": ACCEPTANCE_CLIENT_SECRET,
-        }
+TEXT_FIELDS = ("regelId", "externNummer", "omschrijving")
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 500
+
+# env_key -> normalized copy of the cached upstream list it was built from
+_normalized_rules = {}
+
+
+def _flatten_rules(items):
+    for item in items:
+        if not item:
+            continue
+        if isinstance(item, list):
+            yield from _flatten_rules(item)
+        elif isinstance(item, dict) and isinstance(item.get("Data"), list):
+            yield from _flatten_rules(item["Data"])
+        elif isinstance(item, dict):
+            yield item
+
+
+def _first_value(item, keys):
+    for key in keys:
+        value = item.get(key)
+        if value is not None:
+            return value
+    return ""
+
+
+def _sort_key(value):
+    text = str(value)
+    if text.isdigit():
+        return (0, int(text), "")
+    return (1, 0, text.lower())
+
+
+def normalize_rules(rules):
+    # Same shape the frontend table uses, plus lower-cased copies for matching.
+    rows = []
+    search_keys = []
+    for item in _flatten_rules(rules if isinstance(rules, list) else [rules]):
+        row = {field: _first_value(item, keys) for field, keys in RULE_FIELDS.items()}
+        rows.append(row)
+        search_keys.append({field: str(row[field]).lower() for field in RULE_FIELDS})
+    return {"rows": rows, "search_keys": search_keys, "orders": {}}
+
+
+def get_normalized_rules(env_key):
+    source = load_rules(env_key)
+    cached = _normalized_rules.get(env_key)
+    if cached is None or cached["source"] is not source:
+        with phase("normalize"):
+            cached = normalize_rules(source.get("rules") or [])
+        cached["source"] = source
+        _normalized_rules[env_key] = cached
+    return cached
+
+
+def _sorted_order(normalized, field):
+    order = normalized["orders"].get(field)
+    if order is None:
+        rows = normalized["rows"]
+        order = sorted(range(len(rows)), key=lambda index: _sort_key(rows[index][field]))
+        normalized["orders"][field] = order
+    return order
+
+
+def _parse_int(raw, default, minimum, maximum):
+    try:
+        return max(minimum, min(maximum, int(raw)))
+    except Exception:
+        return default
+
+
+def is_list_query(query_params):
+    return "page" in query_params or "pageSize" in query_params
+
+
+def query_rules(normalized, query_params):
+    page = _parse_int(query_params.get("page", ["1"])[0], 1, 1, 1_000_000)
+    page_size = _parse_int(
+        query_params.get("pageSize", [str(DEFAULT_PAGE_SIZE)])[0],
+        DEFAULT_PAGE_SIZE,
+        1,
+        MAX_PAGE_SIZE,
+    )
+    term = (query_params.get("q", [""])[0] or "").strip().lower()
+    filters = []
+    for field in TEXT_FIELDS:
+        value = (query_params.get(field, [""])[0] or "").strip().lower()
+        if value:
+            filters.append((field, value, False))
+    afd_code = (query_params.get("AfdBrancheCodeId", [""])[0] or "").strip().lower()
+    if afd_code:
+        filters.append(("AfdBrancheCodeId", afd_code, True))
+
+    sort_raw = (query_params.get("sort", [""])[0] or "").strip()
+    descending = sort_raw.startswith("-")
+    sort_field = sort_raw.lstrip("-+")
+    if sort_field not in RULE_FIELDS:
+        sort_field = None
+
+    rows = normalized["rows"]
+    search_keys = normalized["search_keys"]
+    if sort_field:
+        order = _sorted_order(normalized, sort_field)
+        if descending:
+            order = reversed(order)
+    else:
+        order = range(len(rows))
+
+    matches = []
+    for index in order:
+        keys = search_keys[index]
+        if term and not any(term in keys[field] for field in TEXT_FIELDS):
+            continue
+        if any(
+            (keys[field] != value) if exact else (value not in keys[field])
+            for field, value, exact in filters
+        ):
+            continue
+        matches.append(index)
+
+    total = len(matches)
+    total_pages = max(1, -(-total // page_size))
+    start = (page - 1) * page_size
+    page_rows = [rows[index] for index in matches[start : start + page_size]]
     return {
-        "host": DEFAULT_KINETIC_HOST,
-        "client_id": DEFAULT_CLIENT_ID,
-        "client_secret": DEFAULT_CLIENT_SECRET,
+        "rules": page_rows,
+        "count": len(page_rows),
+        "total": total,
+        "page": page,
+        "pageSize": page_size,
+        "totalPages": total_pages,
     }
 
 
-def get_bearer_token(env_key="production"):
-    # Reuse token if it is still valid
-    cache = token_cache.get(env_key, token_cache["production"])
-    if cache["token"] and cache["expires_at"]:
-        if datetime.now() < cache["expires_at"]:
-            return cache["token"]
-
-    config = get_env_config(env_key)
-    if not config["client_id"] or not config["client_secret"]:
-        raise RuntimeError(
-            f"KINETIC_CLIENT_ID or KINETIC_CLIENT_SECRET is not set for {env_key}"
-        )
-
-    with httpx.Client() as client:
-        response = client.post(
-            f"{config['host']}/token",
-            params={
-                "client_id": config["client_id"],
-                "client_secret": config["client_secret"],
-            },
-            timeout=30.0,
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        token = data.get("access_token")
-        expires_in = data.get("expires_in", 3600)
-
-        if not token:
-            raise RuntimeError("Bearer token missing from token response")
-
-        # Refresh 5 minutes before expiry
-        cache["token"] = token
-        cache["expires_at"] = datetime.now() + timedelta(
-            seconds=max(expires_in - 300, 60)
-        )
-        return token
-
-
-def fetch_rules(token, host):
-    with httpx.Client() as client:
-        response = client.get(
-            f"{host}/beheer/api/v1/administratie/assurantie/regels/acceptatieregels",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-                # Required tenant/company headers for DIAS API
-                "Tenant-CustomerId": "30439",
-                "BedrijfId": "1",
-            },
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        if isinstance(data, list):
-            rules = data
-        elif isinstance(data, dict) and "data" in data:
-            rules = data["data"]
-        elif isinstance(data, dict) and "rules" in data:
-            rules = data["rules"]
-        else:
-            rules = [data] if data else []
-
-        return {"rules": rules, "count": len(rules)}
-
-
-def fetch_rule_detail(token, host, regel_id):
-    with httpx.Client() as client:
-        response = client.get(
-            f"{host}/beheer/api/v1/administratie/assurantie/regels/acceptatieregels/{regel_id}",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-                "Tenant-CustomerId": "30439",
-                "BedrijfId": "1",
-            },
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        return response.json()
-
-
-def delete_rule(token, host, regel_id):
-    with httpx.Client() as client:
-        response = client.delete(
-            f"{host}/beheer/api/v1/administratie/assurantie/regels/acceptatieregels/{regel_id}",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-                "Tenant-CustomerId": "30439",
-                "BedrijfId": "1",
-            },
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        if response.content:
-            return response.json()
-        return {"status": "deleted"}
-
-
-def create_rule(token, host, payload):
-    with httpx.Client() as client:
-        response = client.put(
-            f"{host}/beheer/api/v1/administratie/assurantie/regels/acceptatieregels/invoeren",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-                "Tenant-CustomerId": "30439",
-                "BedrijfId": "1",
-            },
-            json=payload,
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        if response.content:
-            return response.json()
-        return {"status": "created"}
-
-
-def update_rule(token, host, payload):
-    with httpx.Client() as client:
-        response = client.put(
-            f"{host}/beheer/api/v1/administratie/assurantie/regels/acceptatieregels/wijzigen",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-                "Tenant-CustomerId": "30439",
-                "BedrijfId": "1",
-            },
-            json=payload,
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        if response.content:
-            return response.json()
-        return {"status": "updated"}
-
-
+@instrument("acceptance-rules")
 class handler(BaseHTTPRequestHandler):
-    def _send_json(self, payload, status_code=200):
-        body = json.dumps(payload).encode()
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Content-Length", str(len(body)))
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(body)
+    def _send_json(self, payload, status_code=200, cache_key=None, source=None, conditional=False):
+        headers = {"Access-Control-Allow-Origin": "*"}
+        send_json(self, payload, status_code, headers, cache_key, source, conditional)
 
     def do_GET(self):
         try:
@@ -200,8 +191,26 @@ class handler(BaseHTTPRequestHandler):
             query_params = parse_qs(parsed.query or "")
             env_param = query_params.get("env", ["production"])[0]
             env_key = "acceptance" if env_param == "acceptance" else "production"
-            config = get_env_config(env_key)
-            token = get_bearer_token(env_key)
+
+            # /api/acceptance-rules?regelIds=a,b,c fetches several details concurrently.
+            if "regelIds" in query_params:
+                try:
+                    ids = _batch.parse_ids(",".join(query_params["regelIds"]))
+                except ValueError as exc:
+                    self._send_json({"error": str(exc)}, status_code=400)
+                    return
+                _batch.send_batch(self, env_key, "acceptance-rules", ids, _batch.wants_stream(self.headers, query_params))
+                return
+
+            # page/pageSize switch to the server-side list query; regelId is then a filter.
+            if is_list_query(query_params):
+                normalized = get_normalized_rules(env_key)
+                with phase("normalize"):
+                    data = query_rules(normalized, query_params)
+                # Encoded pages are reused until the underlying rules list refreshes.
+                cache_key = (env_key, "acceptance-rules", parsed.query)
+                self._send_json(data, 200, cache_key=cache_key, source=normalized, conditional=True)
+                return
 
             # Prefer /api/acceptance-rules?regelId=<id>, but keep /api/acceptance-rules/<id> as fallback.
             regel_id = None
@@ -210,11 +219,59 @@ class handler(BaseHTTPRequestHandler):
                 regel_id = parts[2] if len(parts) >= 3 and parts[2] else None
 
             if regel_id:
+                config = get_env_config(env_key)
+                token = get_bearer_token(env_key)
                 data = fetch_rule_detail(token, config["host"], regel_id)
+                record_detail(env_key, "acceptance-rules", data, doc_id=regel_id)
+                self._send_json(data, status_code=200, conditional=True)
             else:
-                data = fetch_rules(token, config["host"])
+                data = load_rules(env_key)
+                self._send_json(data, 200, cache_key=(env_key, "acceptance-rules"), conditional=True)
+        except httpx.HTTPStatusError as exc:
+            detail = {
+                "error": "Upstream request failed",
+                "status_code": exc.response.status_code,
+                "message": exc.response.text,
+            }
+            self._send_json(detail, status_code=exc.response.status_code)
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
 
-            self._send_json(data, status_code=200)
+    def do_POST(self):
+        try:
+            if not is_authorized(self.headers):
+                send_unauthorized(self)
+                return
+            parsed = urlparse(self.path)
+            query_params = parse_qs(parsed.query or "")
+            env_param = query_params.get("env", ["production"])[0]
+            env_key = "acceptance" if env_param == "acceptance" else "production"
+
+            content_length = int(self.headers.get("Content-Length", 0))
+            raw_body = self.rfile.read(content_length).decode() if content_length else ""
+            body = json.loads(raw_body) if raw_body else {}
+
+            # POST { "operations": [...], "dryRun": false } runs a bulk mutation.
+            if "operations" in body:
+                try:
+                    operations, errors = _bulk.validate_operations(body.get("operations"))
+                except ValueError as exc:
+                    self._send_json({"error": str(exc)}, status_code=400)
+                    return
+                if errors:
+                    self._send_json({"error": "Validation failed", "errors": errors}, status_code=400)
+                    return
+                dry_run = bool(body.get("dryRun")) or query_params.get("dryRun", ["0"])[0] == "1"
+                self._send_json(_bulk.run_bulk(env_key, operations, dry_run=dry_run), status_code=200)
+                return
+
+            # POST { "regelIds": [...] } is the body variant of ?regelIds=
+            try:
+                ids = _batch.parse_ids(body.get("regelIds"))
+            except ValueError as exc:
+                self._send_json({"error": str(exc)}, status_code=400)
+                return
+            _batch.send_batch(self, env_key, "acceptance-rules", ids, _batch.wants_stream(self.headers, query_params))
         except httpx.HTTPStatusError as exc:
             detail = {
                 "error": "Upstream request failed",
@@ -222,6 +279,8 @@ class handler(BaseHTTPRequestHandler):
                 "message": exc.response.text,
             }
             self._send_json(detail, status_code=exc.response.status_code)
+        except json.JSONDecodeError:
+            self._send_json({"error": "Invalid JSON body"}, status_code=400)
         except Exception as exc:
             self._send_json({"error": str(exc)}, status_code=500)
 
@@ -247,6 +306,7 @@ class handler(BaseHTTPRequestHandler):
                 return
 
             data = delete_rule(token, config["host"], regel_id)
+            invalidate_rules(env_key, regel_id)
             self._send_json(data, status_code=200)
         except httpx.HTTPStatusError as exc:
             detail = {
@@ -274,34 +334,20 @@ class handler(BaseHTTPRequestHandler):
             raw_body = self.rfile.read(content_length).decode() if content_length else ""
             body = json.loads(raw_body) if raw_body else {}
 
-            afd_code = body.get("AfdBrancheCodeId")
-            omschrijving = body.get("Omschrijving")
-            expressie = body.get("Expressie")
-            regel_id = body.get("RegelId")
-            resource_id = body.get("ResourceId") or str(uuid.uuid4())
+            try:
+                operation, payload = rule_payload(body)
+            except ValueError as exc:
+                self._send_json({"error": str(exc)}, status_code=400)
+                return
 
-            if regel_id is not None:
-                if expressie is None or omschrijving is None:
-                    self._send_json({"error": "RegelId, Omschrijving, and Expressie are required"}, status_code=400)
-                    return
-                payload = {
-                    "RegelId": regel_id,
-                    "Omschrijving": omschrijving,
-                    "Expressie": expressie,
-                    "ResourceId": resource_id,
-                }
+            if operation == "update":
+                regel_id = payload["RegelId"]
                 data = update_rule(token, config["host"], payload)
+                invalidate_rules(env_key, regel_id)
+                record_detail(env_key, "acceptance-rules", payload, doc_id=regel_id)
             else:
-                if afd_code is None or omschrijving is None or expressie is None:
-                    self._send_json({"error": "AfdBrancheCodeId, Omschrijving, and Expressie are required"}, status_code=400)
-                    return
-                payload = {
-                    "AfdBrancheCodeId": afd_code,
-                    "Omschrijving": omschrijving,
-                    "Expressie": expressie,
-                    "ResourceId": resource_id,
-                }
                 data = create_rule(token, config["host"], payload)
+                invalidate_rules(env_key)
             self._send_json(data, status_code=200)
         except httpx.HTTPStatusError as exc:
             detail = {
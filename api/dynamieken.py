@@ -1,6 +1,4 @@
 from http.server import BaseHTTPRequestHandler
-from datetime import datetime, timedelta
-import httpx
 import json
 import os
 import sys
@@ -11,184 +9,32 @@ if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 from _auth import is_authorized, send_unauthorized
-
-# Cache bearer token between requests to reduce token calls
-token_cache = {
-    "production": {"token": None, "expires_at": None},
-    "acceptance": {"token": None, "expires_at": None},
-}
-
-DEFAULT_KINETIC_HOST = os.getenv("KINETIC_HOST", "https://kinetic.private-insurance.eu")
-DEFAULT_CLIENT_ID = os.getenv("KINETIC_CLIENT_ID")
-DEFAULT_CLIENT_SECRET = os.getenv("KINETIC_CLIENT_SECRET")
-ACCEPTANCE_KINETIC_HOST = os.getenv("KINETIC_HOST_ACCEPTANCE", DEFAULT_KINETIC_HOST)
-ACCEPTANCE_CLIENT_ID = os.getenv("KINETIC_CLIENT_ID_ACCEPTANCE", DEFAULT_CLIENT_ID)
-ACCEPTANCE_CLIENT_SECRET = os.getenv("KINETIC_CLIENT_SECRET_ACCEPTANCE", DEFAULT_CLIENT_SECRET)
-
-
-def get_env_config(env_key):
-    if env_key == "acceptance":
-        return {
-            "host": ACCEPTANCE_KINETIC_HOST,
-            "client_id": ACCEPTANCE_CLIENT_ID,
-            "client_secret": ACCEPTANCE_CLIENT_SECRET,
-        }
-    return {
-        "host": DEFAULT_KINETIC_HOST,
-        "client_id": DEFAULT_CLIENT_ID,
-        "client_secret": DEFAULT_CLIENT_SECRET,
-    }
-
-
-def get_bearer_token(env_key="production"):
-    # Reuse token if it is still valid
-    cache = token_cache.get(env_key, token_cache["production"])
-    if cache["token"] and cache["expires_at"]:
-        if datetime.now() < cache["expires_at"]:
-            return cache["token"]
-
-    config = get_env_config(env_key)
-    if not config["client_id"] or not config["client_secret"]:
-        raise RuntimeError(
-            f"KINETIC_CLIENT_ID or KINETIC_CLIENT_SECRET is not set for {env_key}"
-        )
-
-    with httpx.Client() as client:
-        response = client.post(
-            f"{config['host']}/token",
-            params={
-                "client_id": config["client_id"],
-                "client_secret": config["client_secret"],
-            },
-            timeout=30.0,
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        token = data.get("access_token")
-        expires_in = data.get("expires_in", 3600)
-
-        if not token:
-            raise RuntimeError("Bearer token missing from token response")
-
-        # Refresh 5 minutes before expiry
-        cache["token"] = token
-        cache["expires_at"] = datetime.now() + timedelta(
-            seconds=max(expires_in - 300, 60)
-        )
-        return token
-
-
-def fetch_dynamieken(token, host):
-    with httpx.Client() as client:
-        response = client.get(
-            f"{host}/beheer/api/v1/administratie/assurantie/regels/dynamiekregels",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-                "Tenant-CustomerId": "30439",
-                "BedrijfId": "1",
-            },
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        if isinstance(data, list):
-            rules = data
-        elif isinstance(data, dict) and "data" in data:
-            rules = data["data"]
-        elif isinstance(data, dict) and "rules" in data:
-            rules = data["rules"]
-        else:
-            rules = [data] if data else []
-
-        return {"rules": rules, "count": len(rules)}
-
-
-def fetch_dynamiek_detail(token, host, regel_id):
-    with httpx.Client() as client:
-        response = client.get(
-            f"{host}/beheer/api/v1/administratie/assurantie/regels/dynamiekregels/{regel_id}",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-                "Tenant-CustomerId": "30439",
-                "BedrijfId": "1",
-            },
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        return response.json()
-
-
-def create_dynamiek(token, host, payload):
-    with httpx.Client() as client:
-        response = client.put(
-            f"{host}/beheer/api/v1/administratie/assurantie/regels/dynamiekregels/invoeren",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-                "Tenant-CustomerId": "30439",
-                "BedrijfId": "1",
-            },
-            json=payload,
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        if response.content:
-            return response.json()
-        return {"status": "created"}
-
-
-def update_dynamiek(token, host, payload):
-    with httpx.Client() as client:
-        response = client.put(
-            f"{host}/beheer/api/v1/administratie/assurantie/regels/dynamiekregels/wijzigen",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-                "Tenant-CustomerId": "30439",
-                "BedrijfId": "1",
-            },
-            json=payload,
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        if response.content:
-            return response.json()
-        return {"status": "updated"}
-
-
-def delete_dynamiek(token, host, regel_id):
-    with httpx.Client() as client:
-        response = client.delete(
-            f"{host}/beheer/api/v1/administratie/assurantie/regels/dynamiekregels/{regel_id}",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-                "Tenant-CustomerId": "30439",
-                "BedrijfId": "1",
-            },
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        if response.content:
-            return response.json()
-        return {"status": "deleted"}
-
-
+from _http import send_json
+from _kinetic import (
+    create_dynamiek,
+    delete_dynamiek,
+    fetch_dynamiek_detail,
+    invalidate_dynamieken,
+    load_dynamieken,
+    record_detail,
+    update_dynamiek,
+)
+from _lazy import lazy_import
+from _metrics import instrument
+from _search import record_id
+from _tokens import get_bearer_token
+from _upstream import get_env_config
+
+httpx = lazy_import("httpx")
+# Only batch requests need asyncio.
+_batch = lazy_import("_batch")
+
+
+@instrument("dynamieken")
 class handler(BaseHTTPRequestHandler):
-    def _send_json(self, payload, status_code=200):
-        body = json.dumps(payload).encode()
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Content-Length", str(len(body)))
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(body)
+    def _send_json(self, payload, status_code=200, cache_key=None, source=None, conditional=False):
+        headers = {"Access-Control-Allow-Origin": "*"}
+        send_json(self, payload, status_code, headers, cache_key, source, conditional)
 
     def do_GET(self):
         try:
@@ -200,8 +46,16 @@ class handler(BaseHTTPRequestHandler):
             query_params = parse_qs(parsed.query or "")
             env_param = query_params.get("env", ["production"])[0]
             env_key = "acceptance" if env_param == "acceptance" else "production"
-            config = get_env_config(env_key)
-            token = get_bearer_token(env_key)
+
+            # /api/dynamieken?regelIds=a,b,c fetches several details concurrently.
+            if "regelIds" in query_params:
+                try:
+                    ids = _batch.parse_ids(",".join(query_params["regelIds"]))
+                except ValueError as exc:
+                    self._send_json({"error": str(exc)}, status_code=400)
+                    return
+                _batch.send_batch(self, env_key, "dynamieken", ids, _batch.wants_stream(self.headers, query_params))
+                return
 
             # Check if requesting specific dynamiek: /api/dynamieken/{id}
             regel_id = None
@@ -209,11 +63,14 @@ class handler(BaseHTTPRequestHandler):
                 regel_id = parts[2] if len(parts) >= 3 else None
 
             if regel_id:
+                config = get_env_config(env_key)
+                token = get_bearer_token(env_key)
                 data = fetch_dynamiek_detail(token, config["host"], regel_id)
+                record_detail(env_key, "dynamieken", data, doc_id=regel_id)
+                self._send_json(data, status_code=200, conditional=True)
             else:
-                data = fetch_dynamieken(token, config["host"])
-
-            self._send_json(data, status_code=200)
+                data = load_dynamieken(env_key)
+                self._send_json(data, 200, cache_key=(env_key, "dynamieken"), conditional=True)
         except httpx.HTTPStatusError as exc:
             detail = {
                 "error": "Upstream request failed",
@@ -234,6 +91,20 @@ class handler(BaseHTTPRequestHandler):
             raw_body = self.rfile.read(content_length).decode() if content_length else ""
             body = json.loads(raw_body) if raw_body else {}
 
+            # POST { "regelIds": [...] } fetches several details instead of creating one.
+            if "regelIds" in body:
+                parsed = urlparse(self.path)
+                query_params = parse_qs(parsed.query or "")
+                env_param = query_params.get("env", ["production"])[0]
+                env_key = "acceptance" if env_param == "acceptance" else "production"
+                try:
+                    ids = _batch.parse_ids(body.get("regelIds"))
+                except ValueError as exc:
+                    self._send_json({"error": str(exc)}, status_code=400)
+                    return
+                _batch.send_batch(self, env_key, "dynamieken", ids, _batch.wants_stream(self.headers, query_params))
+                return
+
             # Validate required fields
             if not body.get("ResourceId"):
                 self._send_json({"error": "ResourceId is required"}, status_code=400)
@@ -253,6 +124,7 @@ class handler(BaseHTTPRequestHandler):
             token = get_bearer_token(env_key)
 
             data = create_dynamiek(token, config["host"], body)
+            invalidate_dynamieken(env_key)
             self._send_json(data, status_code=200)
         except httpx.HTTPStatusError as exc:
             detail = {
@@ -284,6 +156,7 @@ class handler(BaseHTTPRequestHandler):
             token = get_bearer_token(env_key)
 
             data = update_dynamiek(token, config["host"], body)
+            invalidate_dynamieken(env_key, record_id(body))
             self._send_json(data, status_code=200)
         except httpx.HTTPStatusError as exc:
             detail = {
@@ -316,6 +189,7 @@ class handler(BaseHTTPRequestHandler):
                 return
 
             data = delete_dynamiek(token, config["host"], regel_id)
+            invalidate_dynamieken(env_key, regel_id)
             self._send_json(data, status_code=200)
         except httpx.HTTPStatusError as exc:
             detail = {
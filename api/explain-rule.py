@@ -1,25 +1,60 @@
 from http.server import BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
-import httpx
+import hashlib
 import json
 import os
 import re
 import sys
+import threading
+from collections import OrderedDict
 
 current_dir = os.path.dirname(__file__)
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 from _auth import is_authorized, send_unauthorized
-from products import fetch_product_detail, get_bearer_token, get_env_config
-
+from _cache import TTLCache
+from _explanations import explanation_cache, explanation_key
+from _http import dumps, send_json
+from _kinetic import fetch_product_detail
+from _lazy import lazy_import
+from _metrics import instrument
+from _rubrieken import extract_rubriek_codes
+from _timing import phase
+from _tokens import get_bearer_token
+from _upstream import get_client, get_env_config
+
+httpx = lazy_import("httpx")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5.2")
 OPENAI_MAX_OUTPUT_TOKENS = int(os.getenv("OPENAI_MAX_OUTPUT_TOKENS", "350"))
-
-RUBRIEK_PATTERN = re.compile(r"[A-Za-z]{1,10}_[A-Za-z0-9]+")
+# Streamed answers: seconds without any data from OpenAI before giving up
+# (the whole answer may take longer).
+OPENAI_STREAM_READ_TIMEOUT = float(os.getenv("OPENAI_STREAM_READ_TIMEOUT", "8"))
+# Part of the explanation cache key: bump it whenever build_prompt or the
+# post-processing below changes, so cached answers are not reused.
+PROMPT_VERSION = "1"
+# Label lookups per (env, productId); a reload after the TTL rebuilds them
+# only when the product payload changed.
+LABEL_CACHE_TTL_SECONDS = float(os.getenv("LABEL_CACHE_TTL_SECONDS", "300"))
+LABEL_CACHE_STALE_SECONDS = float(os.getenv("LABEL_CACHE_STALE_SECONDS", "3600"))
+LABEL_CACHE_MAX_PRODUCTS = int(os.getenv("LABEL_CACHE_MAX_PRODUCTS", "64"))
+# A product that failed to load (404, upstream down) is not retried for this
+# long; its rules are explained without labels meanwhile.
+LABEL_CACHE_ERROR_SECONDS = float(os.getenv("LABEL_CACHE_ERROR_SECONDS", "30"))
+# Compiled label/value substitutions kept per product (by set of codes)
+SUBSTITUTIONS_PER_PRODUCT = int(os.getenv("LABEL_SUBSTITUTIONS_PER_PRODUCT", "256"))
+
+label_cache = TTLCache(
+    maxsize=LABEL_CACHE_MAX_PRODUCTS,
+    ttl=LABEL_CACHE_TTL_SECONDS,
+    stale_ttl=LABEL_CACHE_STALE_SECONDS,
+    name="labels",
+    error_ttl=LABEL_CACHE_ERROR_SECONDS,
+)
+_substitutions_lock = threading.Lock()
 
 
 def build_prompt(expression, rubriek_labels):
@@ -65,97 +100,123 @@ def build_prompt(expression, rubriek_labels):
     )
 
 
-def extract_rubriek_codes(expression):
-    seen = set()
-    ordered = []
-    for match in RUBRIEK_PATTERN.finditer(expression or ""):
-        code = match.group(0)
-        if code in seen:
-            continue
-        seen.add(code)
-        ordered.append(code)
-    return ordered
-
-
-def get_ci_value(node, key):
-    if not isinstance(node, dict):
-        return None
-    target = key.lower()
-    for k, v in node.items():
-        if str(k).lower() == target:
-            return v
-    return None
-
-
-def has_ci_key(node, key):
-    if not isinstance(node, dict):
-        return False
-    target = key.lower()
-    return any(str(k).lower() == target for k in node.keys())
+# Lower-cased keys read from label records and their enum values. Matching
+# is case-insensitive and the first matching key of a dict wins.
+LABEL_FIELDS = frozenset(("labelnaam", "rubriekid", "afdlabel", "waardes", "code", "omschrijving"))
+RUBRIEK_SUFFIX = re.compile(r"_(\d+)$")
+# Payloads are decoded JSON, so containers are exactly dict or list.
+CONTAINER_TYPES = frozenset((dict, list))
 
 
 def collect_label_records(payload):
+    # Iterative pre-order walk over the payload that scans each dict's keys
+    # once. Returns the label fields ({"labelnaam": ..., "rubriekid": ...})
+    # of every dict with a Labelnaam and a RubriekId or AFDlabel, in document
+    # order, and the fields found per dict (by id) for reading enum values.
     records = []
-
-    def walk(node):
-        if isinstance(node, dict):
-            if get_ci_value(node, "Labelnaam") and (
-                has_ci_key(node, "RubriekId") or has_ci_key(node, "AFDlabel")
-            ):
-                records.append(node)
-            for value in node.values():
-                walk(value)
-        elif isinstance(node, list):
-            for item in node:
-                walk(item)
-
-    walk(payload)
-    return records
+    fields_by_node = {}
+    # Key -> field name ("" for other keys); payloads repeat a small set of
+    # keys, so each is lower-cased once per call.
+    field_names = {}
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        node_type = type(node)
+        if node_type is dict:
+            found = {}
+            children = []
+            for key, value in node.items():
+                name = field_names.get(key)
+                if name is None:
+                    name = str(key).lower()
+                    name = field_names[key] = name if name in LABEL_FIELDS else ""
+                if name and name not in found:
+                    found[name] = value
+                if type(value) in CONTAINER_TYPES:
+                    children.append(value)
+            if found:
+                fields_by_node[id(node)] = found
+                if found.get("labelnaam") and ("rubriekid" in found or "afdlabel" in found):
+                    records.append(found)
+            children.reverse()
+            stack.extend(children)
+        elif node_type is list:
+            stack.extend(reversed(node))
+    return records, fields_by_node
+
+
+def _label_values(raw_values, fields_by_node):
+    values = []
+    if not isinstance(raw_values, list):
+        return values
+    for item in raw_values:
+        if not isinstance(item, dict):
+            continue
+        found = fields_by_node.get(id(item), {})
+        code = found.get("code")
+        omschrijving = found.get("omschrijving")
+        if code is None and omschrijving is None:
+            continue
+        values.append(
+            {
+                "code": "" if code is None else str(code),
+                "omschrijving": "" if omschrijving is None else str(omschrijving),
+            }
+        )
+    return values
 
 
 def build_label_lookups(payload):
     custom_by_id = {}
     default_by_afdlabel = {}
-    for record in collect_label_records(payload):
-        label = get_ci_value(record, "Labelnaam")
-        if not label:
-            continue
-        values = []
-        raw_values = get_ci_value(record, "Waardes")
-        if isinstance(raw_values, list):
-            for item in raw_values:
-                if not isinstance(item, dict):
-                    continue
-                code = get_ci_value(item, "Code")
-                omschrijving = get_ci_value(item, "Omschrijving")
-                if code is None and omschrijving is None:
-                    continue
-                values.append(
-                    {
-                        "code": "" if code is None else str(code),
-                        "omschrijving": "" if omschrijving is None else str(omschrijving),
-                    }
-                )
-        rubriek_id = get_ci_value(record, "RubriekId")
+    records, fields_by_node = collect_label_records(payload)
+    for record in records:
+        info = {"label": record["labelnaam"], "values": _label_values(record.get("waardes"), fields_by_node)}
+        rubriek_id = record.get("rubriekid")
         if rubriek_id is not None:
             rubriek_id_str = str(rubriek_id)
-            custom_by_id[rubriek_id_str] = {"label": label, "values": values}
-            match = re.search(r"_(\d+)$", rubriek_id_str)
+            custom_by_id[rubriek_id_str] = info
+            match = RUBRIEK_SUFFIX.search(rubriek_id_str)
             if match:
-                custom_by_id.setdefault(
-                    match.group(1), {"label": label, "values": values}
-                )
-        afd_label = get_ci_value(record, "AFDlabel")
+                custom_by_id.setdefault(match.group(1), info)
+        afd_label = record.get("afdlabel")
         if afd_label:
-            afd_label_str = str(afd_label)
-            default_by_afdlabel[afd_label_str] = {"label": label, "values": values}
+            default_by_afdlabel[str(afd_label)] = info
     return custom_by_id, default_by_afdlabel
 
 
-def resolve_rubriek_labels(expression, product_payload):
-    if not product_payload:
-        return []
-    custom_by_id, default_by_afdlabel = build_label_lookups(product_payload)
+def payload_signature(payload):
+    raw = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+def get_label_lookups(env_key, product_id):
+    # Shared by every rule of the product: {"signature", "custom_by_id",
+    # "default_by_afdlabel", "substitutions"}.
+    key = (env_key, str(product_id))
+
+    def loader():
+        config = get_env_config(env_key)
+        payload = fetch_product_detail(get_bearer_token(env_key), config["host"], product_id)
+        with phase("normalize"):
+            signature = payload_signature(payload)
+            previous = label_cache.peek(key)
+            if previous is not None and previous["signature"] == signature:
+                return previous
+            custom_by_id, default_by_afdlabel = build_label_lookups(payload)
+        return {
+            "signature": signature,
+            "custom_by_id": custom_by_id,
+            "default_by_afdlabel": default_by_afdlabel,
+            "substitutions": OrderedDict(),
+        }
+
+    return label_cache.get_or_load(key, loader)
+
+
+def resolve_rubriek_labels(expression, lookups):
+    custom_by_id = lookups["custom_by_id"]
+    default_by_afdlabel = lookups["default_by_afdlabel"]
     labels = []
     for code in extract_rubriek_codes(expression):
         parts = code.split("_", 1)
@@ -177,68 +238,274 @@ def resolve_rubriek_labels(expression, product_payload):
     return labels
 
 
-def apply_label_overrides(text, rubriek_labels):
-    if not text or not rubriek_labels:
+# The two comparisons a value override follows; as before, "gelijk is aan"
+# is applied before "=".
+VALUE_OPERATORS = (r"\bgelijk\s+(?:is|zijn)\s+aan\s+", r"\b=+\s*")
+
+
+class Substitutions:
+    # Label and value overrides for one set of rubriek labels, compiled once:
+    # - rubriek codes (whole words, longest first) become their label, in one
+    #   pass over an alternation of the codes
+    # - "<label> ... gelijk is/zijn aan <code>" and "<label> ... = <code>"
+    #   become the value's omschrijving. These are applied one (label, value,
+    #   operator) at a time in rubriek/value order: each pass can translate a
+    #   comparison that an earlier one moved past ("A gelijk is aan 1 of
+    #   gelijk is aan 2"). Passes whose label or code is not in the text are
+    #   skipped.
+    def __init__(self, rubriek_labels):
+        self.labels = {}
+        self.label_pattern = None
+        self.label_steps = None
+        items = sorted(
+            (item for item in rubriek_labels or [] if item.get("code") and item.get("label")),
+            key=lambda item: len(item["code"]),
+            reverse=True,
+        )
+        for item in items:
+            self.labels.setdefault(item["code"], str(item["label"]))
+        if self.labels:
+            codes = "|".join(re.escape(code) for code in self.labels)
+            self.label_pattern = re.compile(rf"\b(?:{codes})\b")
+            # A label that contains a code would be rewritten again by the
+            # per-code passes; keep those passes for such label sets.
+            if any(self.label_pattern.search(label) for label in self.labels.values()):
+                self.label_steps = [
+                    (re.compile(rf"\b{re.escape(item['code'])}\b"), str(item["label"])) for item in items
+                ]
+
+        self.value_steps = []
+        for item in rubriek_labels or []:
+            label = item.get("label")
+            if not label or not item.get("values"):
+                continue
+            for value in item["values"]:
+                code_value = str(value.get("code") or "").strip()
+                omschrijving = str(value.get("omschrijving") or "").strip()
+                if not code_value or not omschrijving or code_value == omschrijving:
+                    continue
+                for operator in VALUE_OPERATORS:
+                    pattern = re.compile(
+                        rf"({re.escape(label)}[^.\n]*?{operator})['\"]?{re.escape(code_value)}['\"]?"
+                    )
+                    self.value_steps.append((label, code_value, pattern, omschrijving))
+
+    def _label(self, match):
+        return self.labels[match.group(0)]
+
+    def apply_labels(self, text):
+        if not text or self.label_pattern is None:
+            return text
+        if self.label_steps is not None:
+            for pattern, label in self.label_steps:
+                text = pattern.sub(lambda match: label, text)
+            return text
+        return self.label_pattern.sub(self._label, text)
+
+    def apply_values(self, text):
+        if not text:
+            return text
+        for label, code_value, pattern, omschrijving in self.value_steps:
+            if label in text and code_value in text:
+                text = pattern.sub(lambda match: match.group(1) + omschrijving, text)
         return text
-    items = sorted(
-        (
-            (item.get("code"), item.get("label"))
-            for item in rubriek_labels
-            if item.get("code") and item.get("label")
-        ),
-        key=lambda pair: len(pair[0]),
-        reverse=True,
-    )
-    updated = text
-    for code, label in items:
-        updated = re.sub(rf"\b{re.escape(code)}\b", str(label), updated)
-    return updated
-
 
-def apply_value_overrides(text, rubriek_labels):
-    if not text or not rubriek_labels:
+    def apply(self, text):
+        return self.apply_values(self.apply_labels(text))
+
+
+def get_substitutions(lookups, rubriek_labels):
+    # Kept with the product's label lookups (see get_label_lookups), one per
+    # set of resolved codes; rebuilt lookups start with an empty set.
+    if not rubriek_labels or lookups is None:
+        return Substitutions(rubriek_labels)
+    key = tuple(item.get("code") for item in rubriek_labels)
+    with _substitutions_lock:
+        compiled = lookups["substitutions"].get(key)
+        if compiled is not None:
+            lookups["substitutions"].move_to_end(key)
+            return compiled
+    compiled = Substitutions(rubriek_labels)
+    with _substitutions_lock:
+        lookups["substitutions"][key] = compiled
+        while len(lookups["substitutions"]) > SUBSTITUTIONS_PER_PRODUCT:
+            lookups["substitutions"].popitem(last=False)
+    return compiled
+
+
+# Where a streamed answer may be cut: after a "." followed by whitespace, or
+# at a newline.
+SENTENCE_END = re.compile(r"\.\s|\n")
+
+
+class SentenceStream:
+    # Applies Substitutions to a streamed answer one sentence at a time. The
+    # value overrides never look past a "." or a newline and rubriek codes
+    # contain neither, so per-sentence output matches apply() on the whole
+    # answer. A label can contain a sentence end ("Max. verzekerd bedrag"):
+    # text is not cut inside one, and while the text so far could still be
+    # such a label, the cut waits for more. `answer` is apply() on the whole
+    # raw text, which is what gets cached.
+    def __init__(self, substitutions):
+        self.substitutions = substitutions
+        self.pending = ""
+        self.parts = []
+        self.raw_parts = []
+        # (head, tail) of every label around each place it could be cut
+        labels = set(substitutions.labels.values())
+        labels.update(step[0] for step in substitutions.value_steps)
+        self.split_labels = [
+            (label[: match.end()], label[match.end() :])
+            for label in labels
+            for match in SENTENCE_END.finditer(label)
+        ]
+
+    def _can_cut(self, end):
+        before, after = self.pending[:end], self.pending[end:]
+        for head, tail in self.split_labels:
+            if before.endswith(head) and (tail.startswith(after) or after.startswith(tail)):
+                return False
+        return True
+
+    def feed(self, delta):
+        # Returns the completed sentences, substituted ("" while incomplete).
+        self.pending += delta
+        cuts = [match.end() for match in SENTENCE_END.finditer(self.pending)]
+        end = next((cut for cut in reversed(cuts) if self._can_cut(cut)), 0)
+        if not end:
+            return ""
+        ready, self.pending = self.pending[:end], self.pending[end:]
+        return self._emit(ready)
+
+    def finish(self):
+        ready, self.pending = self.pending, ""
+        return self._emit(ready) if ready else ""
+
+    def _emit(self, text):
+        self.raw_parts.append(text)
+        text = self.substitutions.apply(text)
+        self.parts.append(text)
         return text
-    updated = text
-    for item in rubriek_labels:
-        label = item.get("label")
-        values = item.get("values") or []
-        if not label or not values:
-            continue
-        for value in values:
-            code_value = str(value.get("code") or "").strip()
-            omschrijving = str(value.get("omschrijving") or "").strip()
-            if not code_value or not omschrijving or code_value == omschrijving:
-                continue
-            patterns = [
-                rf"({re.escape(label)}[^.\n]*?\bgelijk\s+(?:is|zijn)\s+aan\s+)['\"]?{re.escape(code_value)}['\"]?",
-                rf"({re.escape(label)}[^.\n]*?\b=+\s*)['\"]?{re.escape(code_value)}['\"]?",
-            ]
-            for pattern in patterns:
-                updated = re.sub(pattern, rf"\1{omschrijving}", updated)
-    return updated
 
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    @property
+    def answer(self):
+        return self.substitutions.apply("".join(self.raw_parts))
 
+
+def wants_event_stream(headers, query_params):
+    if query_params.get("stream", ["0"])[0] == "1":
+        return True
+    return "text/event-stream" in (headers.get("Accept") or "")
+
+
+def iter_output_deltas(response):
+    # Text deltas of a streamed Responses API call (server-sent events); a
+    # failed response or an error event raises.
+    for line in response.iter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if not data or data == "[DONE]":
+            continue
+        event = json.loads(data)
+        kind = event.get("type")
+        if kind == "response.output_text.delta":
+            yield event.get("delta") or ""
+        elif kind in ("response.failed", "error"):
+            error = (event.get("response") or {}).get("error") or event
+            raise RuntimeError(error.get("message") or "OpenAI response failed")
+
+
+def extract_output_text(data):
+    text = None
+    for item in data.get("output", []):
+        if item.get("type") == "message":
+            for part in item.get("content", []):
+                if part.get("type") == "output_text":
+                    text = part.get("text")
+                    break
+        if text:
+            break
+    if not text:
+        text = data.get("output_text")
+    return text
+
+
+@instrument("explain-rule")
 class handler(BaseHTTPRequestHandler):
-    def _send_json(self, payload, status_code=200):
-        body = json.dumps(payload).encode()
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Content-Length", str(len(body)))
+    def _send_json(self, payload, status_code=200, cache_key=None, source=None):
+        send_json(self, payload, status_code, {"Cache-Control": "no-store", "Access-Control-Allow-Origin": "*"}, cache_key, source)
+
+    def _start_events(self):
+        # Without Content-Length the response ends when the connection closes.
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
         self.send_header("Cache-Control", "no-store")
         self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("X-Accel-Buffering", "no")
+        self.send_header("Connection", "close")
         self.end_headers()
-        self.wfile.write(body)
+        self.close_connection = True
+
+    def _send_event(self, event, payload):
+        self.wfile.write(f"event: {event}\ndata: ".encode() + dumps(payload) + b"\n\n")
+        self.wfile.flush()
+
+    def _send_final_event(self, event, payload):
+        # After the SSE headers a failed write cannot become a JSON error
+        # response; a browser that left before the last event is ignored.
+        try:
+            self._send_event(event, payload)
+        except OSError:
+            pass
+
+    def _stream_explanation(self, request, rubriek_labels, lookups, cache_key):
+        # "delta" events carry the substituted text per sentence as OpenAI
+        # produces it, "done" the whole explanation (as the JSON response
+        # does) and "error" a failure after the stream started. Errors before
+        # the first byte still get the regular JSON error response.
+        client = get_client(OPENAI_BASE_URL)
+        timeout = httpx.Timeout(OPENAI_STREAM_READ_TIMEOUT, connect=8.0)
+        with client.stream("POST", **request, timeout=timeout) as response:
+            if response.is_error:
+                response.read()
+                response.raise_for_status()
+            self._start_events()
+            sentences = SentenceStream(get_substitutions(lookups, rubriek_labels))
+            try:
+                for delta in iter_output_deltas(response):
+                    with phase("normalize"):
+                        text = sentences.feed(delta)
+                    if text:
+                        self._send_event("delta", {"text": text})
+                with phase("normalize"):
+                    text = sentences.finish()
+                if text:
+                    self._send_event("delta", {"text": text})
+            except OSError:
+                # The browser went away; leaving the block stops the upstream stream.
+                return
+            except Exception as exc:
+                self._send_final_event("error", {"error": "Upstream request failed", "message": str(exc)})
+                return
+        answer = sentences.answer
+        explanation_cache.set(cache_key, answer)
+        self._send_final_event("done", {"explanation": answer, "rubriekLabels": rubriek_labels})
 
     def _fetch_rubriek_labels(self, expression, product_id, env_key):
+        # (labels, product label lookups); ([], None) without a product.
         if not expression or not product_id:
-            return []
+            return [], None
         try:
-            config = get_env_config(env_key)
-            token = get_bearer_token(env_key)
-            product_payload = fetch_product_detail(token, config["host"], product_id)
-            return resolve_rubriek_labels(expression, product_payload)
+            lookups = get_label_lookups(env_key, product_id)
+            with phase("normalize"):
+                return resolve_rubriek_labels(expression, lookups), lookups
         except Exception:
-            return []
+            return [], None
 
     def do_GET(self):
         if not is_authorized(self.headers):
@@ -255,7 +522,7 @@ class handler(BaseHTTPRequestHandler):
             self._send_json({"status": "ok"}, status_code=200)
             return
 
-        rubriek_labels = self._fetch_rubriek_labels(expression, product_id, env_key)
+        rubriek_labels, _ = self._fetch_rubriek_labels(expression, product_id, env_key)
         self._send_json({"explanation": "", "rubriekLabels": rubriek_labels}, status_code=200)
 
     def do_POST(self):
@@ -282,7 +549,7 @@ class handler(BaseHTTPRequestHandler):
             query_params = parse_qs(parsed.query or "")
             env_param = query_params.get("env", ["production"])[0]
             env_key = "acceptance" if env_param == "acceptance" else "production"
-            rubriek_labels = self._fetch_rubriek_labels(expression, product_id, env_key)
+            rubriek_labels, lookups = self._fetch_rubriek_labels(expression, product_id, env_key)
 
             if labels_only:
                 self._send_json(
@@ -291,6 +558,19 @@ class handler(BaseHTTPRequestHandler):
                 )
                 return
 
+            cache_key = explanation_key(
+                expression, rubriek_labels, f"{OPENAI_MODEL}:{OPENAI_MAX_OUTPUT_TOKENS}", PROMPT_VERSION
+            )
+            stream = wants_event_stream(self.headers, query_params)
+            cached = explanation_cache.get(cache_key)
+            if cached is not None:
+                if stream:
+                    self._start_events()
+                    self._send_final_event("done", {"explanation": cached, "rubriekLabels": rubriek_labels})
+                    return
+                self._send_json({"explanation": cached, "rubriekLabels": rubriek_labels}, status_code=200)
+                return
+
             prompt = build_prompt(expression, rubriek_labels)
             payload = {
                 "model": OPENAI_MODEL,
@@ -301,32 +581,30 @@ class handler(BaseHTTPRequestHandler):
                 "Authorization": f"Bearer {OPENAI_API_KEY}",
                 "Content-Type": "application/json",
             }
-            with httpx.Client() as client:
-                response = client.post(
-                    f"{OPENAI_BASE_URL}/responses",
-                    headers=headers,
-                    json=payload,
-                    timeout=8.0,
-                )
-                response.raise_for_status()
-                data = response.json()
-                text = None
-                for item in data.get("output", []):
-                    if item.get("type") == "message":
-                        for part in item.get("content", []):
-                            if part.get("type") == "output_text":
-                                text = part.get("text")
-                                break
-                    if text:
-                        break
-                if not text:
-                    text = data.get("output_text")
-                final_text = apply_label_overrides(text or "", rubriek_labels)
-                final_text = apply_value_overrides(final_text, rubriek_labels)
-                self._send_json(
-                    {"explanation": final_text or "", "rubriekLabels": rubriek_labels},
-                    status_code=200,
-                )
+            if stream:
+                request = {
+                    "url": f"{OPENAI_BASE_URL}/responses",
+                    "headers": {**headers, "Accept": "text/event-stream"},
+                    "json": {**payload, "stream": True},
+                }
+                self._stream_explanation(request, rubriek_labels, lookups, cache_key)
+                return
+            client = get_client(OPENAI_BASE_URL)
+            response = client.post(
+                f"{OPENAI_BASE_URL}/responses",
+                headers=headers,
+                json=payload,
+                timeout=8.0,
+            )
+            response.raise_for_status()
+            with phase("normalize"):
+                text = extract_output_text(response.json())
+                final_text = get_substitutions(lookups, rubriek_labels).apply(text or "")
+            explanation_cache.set(cache_key, final_text)
+            self._send_json(
+                {"explanation": final_text or "", "rubriekLabels": rubriek_labels},
+                status_code=200,
+            )
         except httpx.HTTPStatusError as exc:
             detail = {
                 "error": "Upstream request failed",
@@ -0,0 +1,62 @@
+from http.server import BaseHTTPRequestHandler
+import os
+import sys
+
+current_dir = os.path.dirname(__file__)
+project_dir = os.path.dirname(current_dir)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+if project_dir not in sys.path:
+    sys.path.append(project_dir)
+
+from _auth import is_authorized, send_unauthorized
+from _metrics import RUN_DURATION_BUCKETS, Gauge, Histogram, instrument, render
+from test_runner.metrics import run_metrics
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def test_run_metrics():
+    # Built per scrape from run storage; not part of the process registry.
+    data = run_metrics()
+    runs = Gauge("test_runs", "Stored test runs by suite and status.", ("suite", "status"), register=False)
+    for (suite, status), count in data["counts"].items():
+        runs.set(suite, status, value=count)
+    durations = Histogram(
+        "test_run_duration_seconds",
+        "Duration of stored test runs from start to finish.",
+        ("suite", "status"),
+        buckets=RUN_DURATION_BUCKETS,
+        register=False,
+    )
+    for suite, status, seconds in data["durations"]:
+        durations.observe(seconds, suite, status)
+    queue_waits = Histogram(
+        "test_run_queue_wait_seconds",
+        "Time stored test runs spent queued before starting.",
+        ("suite",),
+        register=False,
+    )
+    for suite, seconds in data["queue_waits"]:
+        queue_waits.observe(seconds, suite)
+    return [runs, durations, queue_waits]
+
+
+@instrument("metrics")
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if not is_authorized(self.headers):
+            send_unauthorized(self)
+            return
+        try:
+            extra = test_run_metrics()
+        except Exception:
+            # Run storage problems must not hide the process metrics.
+            extra = []
+        body = render(extra).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,164 @@
+from http.server import BaseHTTPRequestHandler
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from _auth import is_authorized, send_unauthorized
+from _http import send_json
+from _kinetic import (
+    fetch_dynamiek_detail,
+    fetch_rule_detail,
+    load_dynamieken,
+    load_rules,
+    record_detail,
+)
+from _lazy import lazy_import
+from _metrics import instrument
+from _rubrieken import get_rubriek_index
+from _search import collect_text, flatten_records, record_id
+from _tokens import get_bearer_token
+from _upstream import get_env_config
+
+httpx = lazy_import("httpx")
+futures = lazy_import("concurrent.futures")
+
+REFRESH_SECONDS = float(os.getenv("RUBRIEK_INDEX_REFRESH_SECONDS", "300"))
+DETAIL_WORKERS = int(os.getenv("RUBRIEK_INDEX_WORKERS", "4"))
+MAX_WAIT_SECONDS = 8.0
+
+INDEX_SOURCES = (
+    ("acceptance-rules", load_rules, fetch_rule_detail),
+    ("dynamieken", load_dynamieken, fetch_dynamiek_detail),
+)
+
+_builds = {}
+_builds_lock = threading.Lock()
+
+
+def _record_signature(record):
+    raw = json.dumps(record, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+def build_index(env_key):
+    index = get_rubriek_index(env_key)
+    index.set_status(
+        state="building", started_at=time.time(), indexed=0, errors=0, message=None
+    )
+    try:
+        # Only records that are new or changed since the last build are
+        # (re)indexed; list entries without an expression need their detail.
+        pending = []
+        for kind, load, fetch_detail in INDEX_SOURCES:
+            seen = set()
+            for record in flatten_records(load(env_key).get("rules") or []):
+                doc_id = record_id(record)
+                if doc_id is None:
+                    continue
+                seen.add(doc_id)
+                signature = _record_signature(record)
+                if index.signature(kind, doc_id) == signature:
+                    continue
+                if collect_text(record).get("expressie"):
+                    record_detail(env_key, kind, record, doc_id=doc_id, signature=signature)
+                else:
+                    pending.append((kind, fetch_detail, doc_id, signature))
+            for stale_kind, stale_id in index.doc_keys(kind):
+                if stale_id not in seen:
+                    index.remove(stale_kind, stale_id)
+
+        index.set_status(total=len(index) + len(pending), indexed=len(index))
+        if pending:
+            host = get_env_config(env_key)["host"]
+            with futures.ThreadPoolExecutor(max_workers=DETAIL_WORKERS) as pool:
+                submitted = {
+                    pool.submit(fetch_detail, get_bearer_token(env_key), host, doc_id): (
+                        kind,
+                        doc_id,
+                        signature,
+                    )
+                    for kind, fetch_detail, doc_id, signature in pending
+                }
+                for future in futures.as_completed(submitted):
+                    kind, doc_id, signature = submitted[future]
+                    try:
+                        record_detail(
+                            env_key, kind, future.result(), doc_id=doc_id, signature=signature
+                        )
+                        index.set_status(indexed=index.status["indexed"] + 1)
+                    except Exception:
+                        index.set_status(errors=index.status["errors"] + 1)
+        index.set_status(state="ready")
+    except Exception as exc:
+        # No finished_at, so the next request retries the build.
+        index.set_status(state="failed", message=str(exc), finished_at=None)
+
+
+def ensure_index(env_key):
+    # Starts a background (re)build when the index is missing or older than
+    # REFRESH_SECONDS; returns the running build thread, if any.
+    index = get_rubriek_index(env_key)
+    with _builds_lock:
+        thread = _builds.get(env_key)
+        if thread is not None and thread.is_alive():
+            return thread
+        finished_at = index.status.get("finished_at")
+        if finished_at and time.time() - finished_at < REFRESH_SECONDS:
+            return None
+        thread = threading.Thread(target=build_index, args=(env_key,), daemon=True)
+        _builds[env_key] = thread
+        thread.start()
+        return thread
+
+
+@instrument("rubrieken")
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status_code=200, cache_key=None, source=None):
+        send_json(self, payload, status_code, {"Cache-Control": "no-store", "Access-Control-Allow-Origin": "*"}, cache_key, source)
+
+    def do_GET(self):
+        try:
+            if not is_authorized(self.headers):
+                send_unauthorized(self)
+                return
+            parsed = urlparse(self.path)
+            query_params = parse_qs(parsed.query or "")
+            env_param = query_params.get("env", ["production"])[0]
+            env_key = "acceptance" if env_param == "acceptance" else "production"
+
+            thread = ensure_index(env_key)
+            # Scripts can wait for the build; the UI polls index.state instead.
+            if thread is not None and query_params.get("wait", ["0"])[0] == "1":
+                thread.join(MAX_WAIT_SECONDS)
+
+            index = get_rubriek_index(env_key)
+            code = (query_params.get("code", [""])[0] or "").strip()
+            if code:
+                usage = index.lookup(code)
+                data = {
+                    "code": code,
+                    "usage": {kind: usage.get(kind, []) for kind, _, _ in INDEX_SOURCES},
+                    "count": sum(len(ids) for ids in usage.values()),
+                }
+            else:
+                codes = index.codes()
+                data = {"codes": codes, "count": len(codes)}
+            data["index"] = dict(index.status)
+            self._send_json(data, status_code=200)
+        except httpx.HTTPStatusError as exc:
+            detail = {
+                "error": "Upstream request failed",
+                "status_code": exc.response.status_code,
+                "message": exc.response.text,
+            }
+            self._send_json(detail, status_code=exc.response.status_code)
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
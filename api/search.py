@@ -0,0 +1,84 @@
+from http.server import BaseHTTPRequestHandler
+import os
+import sys
+from urllib.parse import parse_qs, urlparse
+
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from _auth import is_authorized, send_unauthorized
+from _http import send_json
+from _kinetic import load_dynamieken, load_rules
+from _lazy import lazy_import
+from _metrics import instrument
+from _search import get_index
+from _timing import phase
+
+httpx = lazy_import("httpx")
+
+SEARCH_KINDS = ("acceptance-rules", "dynamieken")
+
+
+def search(env_key, query, kinds=None, limit=50):
+    index = get_index(env_key)
+    lists = {}
+    if not kinds or "acceptance-rules" in kinds:
+        lists["acceptance-rules"] = load_rules(env_key).get("rules") or []
+    if not kinds or "dynamieken" in kinds:
+        lists["dynamieken"] = load_dynamieken(env_key).get("rules") or []
+    with phase("normalize"):
+        # Bring the index up to date with the cached lists; unchanged lists are skipped.
+        for kind, records in lists.items():
+            index.sync_list(kind, records)
+        return index.search(query, kinds=kinds, limit=limit)
+
+
+@instrument("search")
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status_code=200, cache_key=None, source=None):
+        send_json(self, payload, status_code, {"Cache-Control": "no-store", "Access-Control-Allow-Origin": "*"}, cache_key, source)
+
+    def do_GET(self):
+        try:
+            if not is_authorized(self.headers):
+                send_unauthorized(self)
+                return
+            parsed = urlparse(self.path)
+            query_params = parse_qs(parsed.query or "")
+            env_param = query_params.get("env", ["production"])[0]
+            env_key = "acceptance" if env_param == "acceptance" else "production"
+
+            query = (query_params.get("q", [""])[0] or "").strip()
+            if not query:
+                self._send_json({"error": "q is required"}, status_code=400)
+                return
+
+            kind = query_params.get("kind", [None])[0]
+            if kind and kind not in SEARCH_KINDS:
+                supported = ", ".join(SEARCH_KINDS)
+                self._send_json(
+                    {"error": f"Unsupported kind '{kind}'. Supported kinds: {supported}"},
+                    status_code=400,
+                )
+                return
+
+            limit_raw = query_params.get("limit", ["50"])[0]
+            try:
+                limit = max(1, min(500, int(limit_raw)))
+            except Exception:
+                limit = 50
+
+            data = search(env_key, query, kinds=(kind,) if kind else None, limit=limit)
+            data["query"] = query
+            data["count"] = len(data["results"])
+            self._send_json(data, status_code=200)
+        except httpx.HTTPStatusError as exc:
+            detail = {
+                "error": "Upstream request failed",
+                "status_code": exc.response.status_code,
+                "message": exc.response.text,
+            }
+            self._send_json(detail, status_code=exc.response.status_code)
+        except Exception as exc:
+            self._send_json({"error": str(exc)}, status_code=500)
@@ -15,6 +15,7 @@ if project_dir not in sys.path:
     sys.path.append(project_dir)
 
 from _auth import is_authorized, send_unauthorized
+from _metrics import TEST_RUNS_STARTED, instrument
 from test_runner.constants import SUPPORTED_SUITES
 from test_runner.storage import (
     artifact_content_type,
@@ -55,6 +56,7 @@ def _start_background_run(run_id: str, suite: str, base_url: str | None) -> None
     subprocess.Popen(command, **kwargs)
 
 
+@instrument("test-runs")
 class handler(BaseHTTPRequestHandler):
     def _send_json(self, payload, status_code=200):
         body = json.dumps(payload).encode("utf-8")
@@ -129,6 +131,7 @@ class handler(BaseHTTPRequestHandler):
             run_id = str(uuid.uuid4())
             create_run(run_id=run_id, suite=suite, base_url=base_url)
             _start_background_run(run_id, suite, base_url)
+            TEST_RUNS_STARTED.inc(suite)
 
             self._send_json({"run_id": run_id, "status": "queued"}, status_code=200)
         except json.JSONDecodeError:
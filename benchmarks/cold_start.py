@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+API_DIR = ROOT / "api"
+
+# Vercel entry points: every api/*.py that is not a shared `_` module.
+ENTRY_POINTS = sorted(path.stem for path in API_DIR.glob("*.py") if not path.stem.startswith("_"))
+
+# Maximum import time per function, asserted by test_api_cold_start.py. The
+# default leaves room for slow CI machines; eager httpx alone costs ~150 ms.
+DEFAULT_BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", "120"))
+BUDGETS_MS = {
+    "health": 60.0,
+}
+
+# Deferred until a request needs them (see api/_lazy.py).
+DEFERRED_MODULES = ("httpx", "asyncio", "concurrent.futures")
+
+
+def budget_ms(module):
+    return BUDGETS_MS.get(module, DEFAULT_BUDGET_MS)
+
+
+# Runs in a fresh interpreter: times the import itself and marks where the
+# entry point's imports start in the -X importtime output (after site).
+CHILD = """
+import importlib, json, sys, time
+sys.stderr.write("cold-start-marker\\n")
+sys.stderr.flush()
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+
+def profile_import(module, runs=3):
+    # Fastest of `runs` imports in fresh interpreters: total_ms is the wall
+    # time of the import, modules the -X importtime breakdown of what it loaded.
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD, module],
+            cwd=API_DIR,
+            capture_output=True,
+            text=True,
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+            check=True,
+        )
+        total_ms = json.loads(result.stdout.strip().splitlines()[-1])["seconds"] * 1000
+        if best is None or total_ms < best["total_ms"]:
+            _, _, imports = result.stderr.partition("cold-start-marker\n")
+            best = {"module": module, "total_ms": total_ms, "modules": parse_importtime(imports)}
+    return best
+
+
+def parse_importtime(stderr):
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue
+        modules.append(
+            {
+                "name": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    return modules
+
+
+def top_level_imports(profile, limit=8):
+    # Modules imported directly by the entry point, heaviest first.
+    children = [module for module in profile["modules"] if module["depth"] == 0]
+    return sorted(children, key=lambda module: module["cumulative_ms"], reverse=True)[:limit]
+
+
+def main():
+    modules = sys.argv[1:] or ENTRY_POINTS
+    as_json = "--json" in modules
+    modules = [module for module in modules if module != "--json"] or ENTRY_POINTS
+
+    profiles = [profile_import(module) for module in modules]
+    if as_json:
+        print(json.dumps([{**profile, "modules": top_level_imports(profile)} for profile in profiles], indent=2))
+        return 0
+
+    for profile in profiles:
+        print(f"{profile['module']:<20} {profile['total_ms']:8.1f} ms  (budget {budget_ms(profile['module']):.0f} ms)")
+        for module in top_level_imports(profile):
+            print(f"    {module['name']:<28} {module['cumulative_ms']:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,290 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+RULES_PATH = "/beheer/api/v1/administratie/assurantie/regels/acceptatieregels"
+DYNAMIEKEN_PATH = "/beheer/api/v1/administratie/assurantie/regels/dynamiekregels"
+PRODUCTS_PATH = "/contract/api/v1/contracten/verzekeringen/productdefinities"
+
+# (method, pattern, endpoint name used in the call counters)
+ROUTES = [
+    ("POST", re.compile(r"^/token$"), "token"),
+    ("GET", re.compile(rf"^{RULES_PATH}$"), "acceptatieregels"),
+    ("PUT", re.compile(rf"^{RULES_PATH}/(invoeren|wijzigen)$"), "acceptatieregels.write"),
+    ("GET", re.compile(rf"^{RULES_PATH}/([^/]+)$"), "acceptatieregels.detail"),
+    ("DELETE", re.compile(rf"^{RULES_PATH}/([^/]+)$"), "acceptatieregels.delete"),
+    ("GET", re.compile(rf"^{DYNAMIEKEN_PATH}$"), "dynamiekregels"),
+    ("PUT", re.compile(rf"^{DYNAMIEKEN_PATH}/(invoeren|wijzigen)$"), "dynamiekregels.write"),
+    ("GET", re.compile(rf"^{DYNAMIEKEN_PATH}/([^/]+)$"), "dynamiekregels.detail"),
+    ("DELETE", re.compile(rf"^{DYNAMIEKEN_PATH}/([^/]+)$"), "dynamiekregels.delete"),
+    ("GET", re.compile(rf"^{PRODUCTS_PATH}$"), "productdefinities"),
+    ("GET", re.compile(rf"^{PRODUCTS_PATH}/([^/]+)$"), "productdefinities.detail"),
+    ("POST", re.compile(r"^/v1/responses$"), "openai.responses"),
+]
+
+DEFAULT_CONFIG = {
+    "latency_ms": 20.0,
+    "jitter_ms": 5.0,
+    "error_rate": 0.0,
+    "records": 500,
+    "padding": 0,
+    "seed": 1,
+}
+
+WORDS = ["leeftijd", "postcode", "bouwjaar", "dekking", "premie", "schade", "risico", "voertuig", "woning"]
+
+
+def make_dataset(records, padding=0, seed=1):
+    # Deterministic Kinetic-shaped payloads; padding adds bytes per record.
+    rng = random.Random(seed)
+    filler = "x" * padding
+    rules = []
+    dynamieken = []
+    for index in range(1, records + 1):
+        codes = [f"PDA_{rng.randint(1, 400)}" for _ in range(rng.randint(1, 4))]
+        expression = " and ".join(f"{code} > {rng.randint(0, 99)}" for code in codes)
+        description = " ".join(rng.choice(WORDS) for _ in range(4))
+        rules.append(
+            {
+                "RegelId": index,
+                "ExternNummer": f"EXT-{index:05d}",
+                "Omschrijving": f"Regel {index} {description}",
+                "Expressie": expression,
+                "AfdBrancheCodeId": rng.randint(1, 12),
+                "ResourceId": f"00000000-0000-0000-0000-{index:012d}",
+                "Toelichting": filler,
+            }
+        )
+        dynamieken.append(
+            {
+                "RegelId": index,
+                "Omschrijving": f"Dynamiek {index} {description}",
+                "Rekenregels": [{"Omschrijving": f"Stap {step}", "Expressie": expression} for step in range(2)],
+                "Toelichting": filler,
+            }
+        )
+    products = [
+        {"ProductId": index, "Omschrijving": f"Product {index}", "Toelichting": filler}
+        for index in range(1, max(records // 20, 1) + 1)
+    ]
+    labels = [
+        {
+            "Labelnaam": f"Rubriek {code}",
+            "RubriekId": f"PDA_{code}",
+            "AFDlabel": f"PDA_{code}",
+            "Waardes": [{"Code": str(value), "Omschrijving": f"Waarde {value}"} for value in range(3)],
+        }
+        for code in range(1, 401)
+    ]
+    return {"rules": rules, "dynamieken": dynamieken, "products": products, "labels": labels}
+
+
+class StubState:
+    def __init__(self, **config):
+        self.lock = threading.Lock()
+        self.config = {**DEFAULT_CONFIG}
+        self.calls = {}
+        self.errors = {}
+        self.data = None
+        self.by_id = {}
+        self.bodies = {}
+        self.configure(**config)
+
+    def configure(self, **config):
+        with self.lock:
+            rebuild = any(
+                key in config and config[key] != self.config[key] for key in ("records", "padding", "seed")
+            )
+            self.config.update({key: value for key, value in config.items() if key in DEFAULT_CONFIG})
+            if rebuild or self.data is None:
+                self.data = make_dataset(self.config["records"], self.config["padding"], self.config["seed"])
+                self.by_id = {
+                    "rules": {str(record["RegelId"]): record for record in self.data["rules"]},
+                    "dynamieken": {str(record["RegelId"]): record for record in self.data["dynamieken"]},
+                    "products": {str(record["ProductId"]): record for record in self.data["products"]},
+                }
+                self.bodies = {}
+
+    def count(self, endpoint, failed):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            if failed:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "calls": dict(self.calls),
+                "errors": dict(self.errors),
+                "total": sum(self.calls.values()),
+                "config": dict(self.config),
+            }
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+            self.errors.clear()
+
+    def cached_body(self, key, build):
+        # List payloads are large; encode each once per dataset.
+        body = self.bodies.get(key)
+        if body is None:
+            body = json.dumps(build()).encode("utf-8")
+            self.bodies[key] = body
+        return body
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Set per server by start_stub()
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode("utf-8"))
+
+    def _send_events(self, events):
+        # Server-sent events as the Responses API streams them, ending with response.completed.
+        events = [*events, {"type": "response.completed"}]
+        body = "".join(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        return json.loads(raw) if raw else {}
+
+    def _admin(self, path):
+        if path == "/__stats":
+            self._send_json(200, self.state.stats())
+        elif path == "/__reset":
+            self.state.reset()
+            self._send_json(200, self.state.stats())
+        elif path == "/__config":
+            self.state.configure(**self._read_body())
+            self._send_json(200, self.state.stats())
+        else:
+            return False
+        return True
+
+    def _dispatch(self):
+        path = urlparse(self.path).path
+        if path.startswith("/__") and self._admin(path):
+            return
+        for method, pattern, endpoint in ROUTES:
+            match = pattern.match(path)
+            if method == self.command and match:
+                break
+        else:
+            self._send_json(404, {"error": "Not found", "path": path})
+            return
+
+        config = self.state.config
+        delay = max(config["latency_ms"] + random.uniform(-1, 1) * config["jitter_ms"], 0) / 1000
+        if delay:
+            time.sleep(delay)
+        failed = endpoint != "token" and random.random() < config["error_rate"]
+        self.state.count(endpoint, failed)
+        if failed:
+            self._send_json(503, {"error": "Injected failure"})
+            return
+        self._respond(endpoint, match)
+
+    def _respond(self, endpoint, match):
+        data = self.state.data
+        if endpoint == "token":
+            self._send_json(200, {"access_token": f"stub-{time.time_ns()}", "expires_in": 3600})
+        elif endpoint == "acceptatieregels":
+            self._send(200, self.state.cached_body(endpoint, lambda: data["rules"]))
+        elif endpoint == "dynamiekregels":
+            self._send(200, self.state.cached_body(endpoint, lambda: data["dynamieken"]))
+        elif endpoint == "productdefinities":
+            self._send(200, self.state.cached_body(endpoint, lambda: data["products"]))
+        elif endpoint in ("acceptatieregels.detail", "dynamiekregels.detail"):
+            kind = "rules" if endpoint.startswith("acceptatieregels") else "dynamieken"
+            record = self.state.by_id[kind].get(match.group(1))
+            self._send_json(200 if record else 404, record or {"error": "Not found"})
+        elif endpoint == "productdefinities.detail":
+            product = self.state.by_id["products"].get(match.group(1))
+            if product is None:
+                self._send_json(404, {"error": "Not found"})
+            else:
+                self._send_json(200, {**product, "Rubrieken": data["labels"]})
+        elif endpoint.endswith(".write"):
+            self._send_json(200, self._read_body())
+        elif endpoint.endswith(".delete"):
+            self._send_json(200, {"status": "deleted"})
+        elif endpoint == "openai.responses":
+            text = "Deze acceptatieregel gaat af als PDA_1 groter is dan 10."
+            if self._read_body().get("stream"):
+                words = re.findall(r"\S+\s*", text)
+                self._send_events([{"type": "response.output_text.delta", "delta": word} for word in words])
+            else:
+                self._send_json(200, {"output": [{"type": "message", "content": [{"type": "output_text", "text": text}]}]})
+
+    do_GET = _dispatch
+    do_POST = _dispatch
+    do_PUT = _dispatch
+    do_DELETE = _dispatch
+
+
+def start_stub(host="127.0.0.1", port=0, **config):
+    # Starts the stub in a daemon thread; server.state holds config and counters.
+    state = StubState(**config)
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Kinetic (and OpenAI responses) stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_CONFIG["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_CONFIG["jitter_ms"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_CONFIG["error_rate"])
+    parser.add_argument("--records", type=int, default=DEFAULT_CONFIG["records"])
+    parser.add_argument("--padding", type=int, default=DEFAULT_CONFIG["padding"])
+    args = parser.parse_args()
+
+    server = start_stub(
+        args.host,
+        args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        records=args.records,
+        padding=args.padding,
+    )
+    print(f"Kinetic stub listening on {server.url} (stats: {server.url}/__stats)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
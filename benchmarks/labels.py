@@ -0,0 +1,294 @@
+import argparse
+import importlib
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+API_DIR = ROOT / "api"
+if str(API_DIR) not in sys.path:
+    sys.path.insert(0, str(API_DIR))
+
+
+# The recursive extractor and the override loops explain-rule used before;
+# kept as the baseline and as the reference the new results must equal.
+def reference_get_ci_value(node, key):
+    if not isinstance(node, dict):
+        return None
+    target = key.lower()
+    for k, v in node.items():
+        if str(k).lower() == target:
+            return v
+    return None
+
+
+def reference_has_ci_key(node, key):
+    if not isinstance(node, dict):
+        return False
+    target = key.lower()
+    return any(str(k).lower() == target for k in node.keys())
+
+
+def reference_collect_label_records(payload):
+    records = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if reference_get_ci_value(node, "Labelnaam") and (
+                reference_has_ci_key(node, "RubriekId") or reference_has_ci_key(node, "AFDlabel")
+            ):
+                records.append(node)
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(payload)
+    return records
+
+
+def reference_build_label_lookups(payload):
+    custom_by_id = {}
+    default_by_afdlabel = {}
+    for record in reference_collect_label_records(payload):
+        label = reference_get_ci_value(record, "Labelnaam")
+        if not label:
+            continue
+        values = []
+        raw_values = reference_get_ci_value(record, "Waardes")
+        if isinstance(raw_values, list):
+            for item in raw_values:
+                if not isinstance(item, dict):
+                    continue
+                code = reference_get_ci_value(item, "Code")
+                omschrijving = reference_get_ci_value(item, "Omschrijving")
+                if code is None and omschrijving is None:
+                    continue
+                values.append(
+                    {
+                        "code": "" if code is None else str(code),
+                        "omschrijving": "" if omschrijving is None else str(omschrijving),
+                    }
+                )
+        rubriek_id = reference_get_ci_value(record, "RubriekId")
+        if rubriek_id is not None:
+            rubriek_id_str = str(rubriek_id)
+            custom_by_id[rubriek_id_str] = {"label": label, "values": values}
+            match = re.search(r"_(\d+)$", rubriek_id_str)
+            if match:
+                custom_by_id.setdefault(match.group(1), {"label": label, "values": values})
+        afd_label = reference_get_ci_value(record, "AFDlabel")
+        if afd_label:
+            default_by_afdlabel[str(afd_label)] = {"label": label, "values": values}
+    return custom_by_id, default_by_afdlabel
+
+
+# The per-code / per-value re.sub loops explain-rule used before Substitutions.
+def reference_apply_label_overrides(text, rubriek_labels):
+    if not text or not rubriek_labels:
+        return text
+    items = sorted(
+        (
+            (item.get("code"), item.get("label"))
+            for item in rubriek_labels
+            if item.get("code") and item.get("label")
+        ),
+        key=lambda pair: len(pair[0]),
+        reverse=True,
+    )
+    updated = text
+    for code, label in items:
+        updated = re.sub(rf"\b{re.escape(code)}\b", str(label), updated)
+    return updated
+
+
+def reference_apply_value_overrides(text, rubriek_labels):
+    if not text or not rubriek_labels:
+        return text
+    updated = text
+    for item in rubriek_labels:
+        label = item.get("label")
+        values = item.get("values") or []
+        if not label or not values:
+            continue
+        for value in values:
+            code_value = str(value.get("code") or "").strip()
+            omschrijving = str(value.get("omschrijving") or "").strip()
+            if not code_value or not omschrijving or code_value == omschrijving:
+                continue
+            patterns = [
+                rf"({re.escape(label)}[^.\n]*?\bgelijk\s+(?:is|zijn)\s+aan\s+)['\"]?{re.escape(code_value)}['\"]?",
+                rf"({re.escape(label)}[^.\n]*?\b=+\s*)['\"]?{re.escape(code_value)}['\"]?",
+            ]
+            for pattern in patterns:
+                updated = re.sub(pattern, rf"\1{omschrijving}", updated)
+    return updated
+
+
+def make_product(rubrieken=1500, values=8, seed=1):
+    # Product definition shaped like Kinetic's (onderdelen -> vragen ->
+    # rubriek). Rubrieken come with enum values, validations and metadata
+    # padding, key casing varies as between Kinetic endpoints, and some nodes
+    # only look like a label (no id) or have no label at all.
+    rng = random.Random(seed)
+    label_keys = ("Labelnaam", "LabelNaam", "labelnaam")
+    onderdelen = []
+    per_onderdeel = max(rubrieken // 15, 1)
+    for onderdeel_index in range(0, rubrieken, per_onderdeel):
+        vragen = []
+        for number in range(onderdeel_index, min(onderdeel_index + per_onderdeel, rubrieken)):
+            rubriek = {
+                rng.choice(label_keys): f"Rubriek {number}",
+                "Omschrijving": f"Vraag over rubriek {number}",
+                "Datatype": rng.choice(("Tekst", "Numeriek", "Datum", "Enum")),
+                "Metadata": {"Bron": "AFD", "Versie": rng.randint(1, 9), "Tags": ["afd", "rubriek"]},
+            }
+            kind = rng.random()
+            if kind < 0.6:
+                rubriek["RubriekId"] = f"{onderdeel_index}_{number}"
+            elif kind < 0.9:
+                rubriek["AFDlabel"] = f"PDA_{rng.choice(('AA', 'BB', 'CC'))}{number}"
+            else:
+                rubriek["Kenmerk"] = number
+            if rng.random() < 0.7:
+                rubriek["Waardes"] = [
+                    {rng.choice(("Code", "code")): str(value), "Omschrijving": f"Waarde {value}", "Volgorde": value}
+                    for value in range(rng.randint(1, values))
+                ]
+            vragen.append(
+                {
+                    "VraagId": number,
+                    "Rubriek": rubriek,
+                    "Validaties": [
+                        {"Expressie": f"PDA_{number} > {rng.randint(0, 99)}", "Melding": "Ongeldige waarde"}
+                        for _ in range(rng.randint(0, 3))
+                    ],
+                }
+            )
+        onderdelen.append({"Naam": f"Onderdeel {onderdeel_index}", "Vragen": vragen})
+    return {"ProductId": seed, "Omschrijving": "Benchmarkproduct", "Productonderdelen": onderdelen}
+
+
+def count_nodes(payload):
+    stack, nodes = [payload], 0
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return nodes
+
+
+def best_of(func, payload, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(payload)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(rubrieken=1500, repeat=5, seed=1):
+    build_label_lookups = importlib.import_module("explain-rule").build_label_lookups
+    payload = make_product(rubrieken=rubrieken, seed=seed)
+    reference = reference_build_label_lookups(payload)
+    current = build_label_lookups(payload)
+    if current != reference:
+        raise AssertionError("build_label_lookups differs from the reference extractor")
+    reference_s = best_of(reference_build_label_lookups, payload, repeat)
+    current_s = best_of(build_label_lookups, payload, repeat)
+    return {
+        "rubrieken": rubrieken,
+        "nodes": count_nodes(payload),
+        "payload_kb": round(len(json.dumps(payload)) / 1024, 1),
+        "labels": len(current[0]) + len(current[1]),
+        "reference_ms": round(reference_s * 1000, 2),
+        "current_ms": round(current_s * 1000, 2),
+        "speedup": round(reference_s / current_s, 2) if current_s else None,
+    }
+
+
+def make_explanation(rubriek_labels, sentences=40, seed=1):
+    # LLM-style explanation mentioning the codes, labels and enum values.
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(sentences):
+        item = rng.choice(rubriek_labels)
+        value = rng.choice(item["values"] or [{"code": "1"}])["code"]
+        lines.append(
+            rng.choice(
+                (
+                    f"- De regel gaat af als {item['code']} gelijk is aan '{value}'.",
+                    f"- {item['label']} is gelijk aan {value} voor dit product.",
+                    f"- Als {item['label']}={value} en {item['code']} gevuld is.",
+                    f"- {item['code']} moet groter zijn dan {rng.randint(0, 99)}.",
+                )
+            )
+        )
+    lines.append("Samenvatting: de regel controleert de ingevulde rubrieken.")
+    return "\n".join(lines)
+
+
+def run_substitutions(labels=40, repeat=20, seed=1):
+    module = importlib.import_module("explain-rule")
+    lookups = {"signature": None, "substitutions": {}}
+    lookups["custom_by_id"], lookups["default_by_afdlabel"] = module.build_label_lookups(
+        make_product(rubrieken=max(labels * 2, 20), values=12, seed=seed)
+    )
+    expression = " and ".join(f"PDA_{number} > 1" for number in range(labels))
+    rubriek_labels = module.resolve_rubriek_labels(expression, lookups)
+    text = make_explanation(rubriek_labels, seed=seed)
+
+    def reference(text):
+        return reference_apply_value_overrides(reference_apply_label_overrides(text, rubriek_labels), rubriek_labels)
+
+    substitutions = module.Substitutions(rubriek_labels)
+    if substitutions.apply(text) != reference(text):
+        raise AssertionError("Substitutions differs from the reference overrides")
+    reference_s = best_of(reference, text, repeat)
+    current_s = best_of(substitutions.apply, text, repeat)
+    return {
+        "labels": len(rubriek_labels),
+        "values": sum(len(item["values"]) for item in rubriek_labels),
+        "text_chars": len(text),
+        "reference_ms": round(reference_s * 1000, 3),
+        "current_ms": round(current_s * 1000, 3),
+        "build_ms": round(best_of(module.Substitutions, rubriek_labels, repeat) * 1000, 3),
+        "speedup": round(reference_s / current_s, 2) if current_s else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Label extraction and substitution benchmark (explain-rule)")
+    parser.add_argument("--rubrieken", default="200,1500,5000", help="comma-separated product sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = [run(int(size), args.repeat) for size in args.rubrieken.split(",")]
+    substitutions = run_substitutions(repeat=args.repeat)
+    if args.json:
+        print(json.dumps({"extraction": results, "substitutions": substitutions}, indent=2))
+        return 0
+    for result in results:
+        print(
+            f"{result['rubrieken']:>6} rubrieken  {result['nodes']:>7} nodes  {result['payload_kb']:>8.1f} KB  "
+            f"reference {result['reference_ms']:8.2f} ms  current {result['current_ms']:8.2f} ms  "
+            f"x{result['speedup']}"
+        )
+    print(
+        f"substitutions  {substitutions['labels']} labels  {substitutions['values']} values  "
+        f"reference {substitutions['reference_ms']:.3f} ms  current {substitutions['current_ms']:.3f} ms  "
+        f"x{substitutions['speedup']}  (compile {substitutions['build_ms']:.3f} ms, once per label set)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
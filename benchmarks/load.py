@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from .kinetic_stub import start_stub
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Every /api/* route with a representative request. Writes and POST
+# /api/test-runs are left out: they mutate upstream state or start browser runs.
+ROUTES = {
+    "health": {"method": "GET", "path": "/api/health"},
+    "acceptance-rules": {"method": "GET", "path": "/api/acceptance-rules"},
+    "acceptance-rules.page": {"method": "GET", "path": "/api/acceptance-rules?page=2&pageSize=25&sort=-regelId"},
+    "acceptance-rules.detail": {"method": "GET", "path": "/api/acceptance-rules?regelId=7"},
+    "acceptance-rules.batch": {"method": "GET", "path": "/api/acceptance-rules?regelIds=1,2,3,4,5,6,7,8"},
+    "dynamieken": {"method": "GET", "path": "/api/dynamieken"},
+    "dynamieken.detail": {"method": "GET", "path": "/api/dynamieken/7"},
+    "products": {"method": "GET", "path": "/api/products"},
+    "products.detail": {"method": "GET", "path": "/api/products?productId=3"},
+    "search": {"method": "GET", "path": "/api/search?q=leeftijd+pda"},
+    "rubrieken": {"method": "GET", "path": "/api/rubrieken?code=PDA_12"},
+    "explain-rule": {
+        "method": "POST",
+        "path": "/api/explain-rule",
+        "json": {"expression": "PDA_1 > 10 and PDA_2 = 1", "productId": 3},
+    },
+    "test-runs": {"method": "GET", "path": "/api/test-runs?limit=10"},
+}
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile on an already sorted list.
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies_ms, statuses, elapsed):
+    ordered = sorted(latencies_ms)
+    errors = sum(1 for status in statuses if status == 0 or status >= 400)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50), 2),
+        "p95_ms": round(percentile(ordered, 0.95), 2),
+        "p99_ms": round(percentile(ordered, 0.99), 2),
+        "mean_ms": round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+        "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+        "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0,
+        "statuses": {str(status): statuses.count(status) for status in sorted(set(statuses))},
+    }
+
+
+async def drive_route(client, route, requests, concurrency):
+    latencies = []
+    statuses = []
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await client.request(route["method"], route["path"], json=route.get("json"))
+                await response.aread()
+                statuses.append(response.status_code)
+            except httpx.HTTPError:
+                statuses.append(0)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, requests)))))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+def _upstream_delta(before, after):
+    calls = {
+        endpoint: count - before["calls"].get(endpoint, 0)
+        for endpoint, count in after["calls"].items()
+        if count - before["calls"].get(endpoint, 0)
+    }
+    return {"total": sum(calls.values()), "calls": calls}
+
+
+async def run_benchmark(target, routes, requests, concurrency, stub_url=None, warmup=1):
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=60.0) as client:
+        stub = httpx.AsyncClient(base_url=stub_url, timeout=10.0) if stub_url else None
+        try:
+            for name in routes:
+                route = ROUTES[name]
+                for _ in range(warmup):
+                    await client.request(route["method"], route["path"], json=route.get("json"))
+                before = (await stub.get("/__stats")).json() if stub else None
+                result = await drive_route(client, route, requests, concurrency)
+                if stub:
+                    result["upstream"] = _upstream_delta(before, (await stub.get("/__stats")).json())
+                results[name] = result
+        finally:
+            if stub:
+                await stub.aclose()
+    return results
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def stub_env(stub_url):
+    return {
+        "KINETIC_HOST": stub_url,
+        "KINETIC_HOST_ACCEPTANCE": stub_url,
+        "KINETIC_CLIENT_ID": "benchmark",
+        "KINETIC_CLIENT_SECRET": "benchmark",
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "OPENAI_API_KEY": "benchmark",
+    }
+
+
+def replay_env(cassette, latency):
+    # Hosts stay as configured; replay falls back to path-only matching, so a
+    # stub recording replays against the default Kinetic hosts.
+    return {
+        "UPSTREAM_CASSETTE_MODE": "replay",
+        "UPSTREAM_CASSETTE_PATH": str(Path(cassette).resolve()),
+        "UPSTREAM_CASSETTE_REPLAY_LATENCY": "1" if latency else "0",
+        "KINETIC_CLIENT_ID": os.getenv("KINETIC_CLIENT_ID") or "replay",
+        "KINETIC_CLIENT_SECRET": os.getenv("KINETIC_CLIENT_SECRET") or "replay",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "replay",
+    }
+
+
+def start_backend(port, token_dir, overrides):
+    # The ASGI app serves every route from one process (see api/_asgi.py).
+    env = {
+        **os.environ,
+        "TOKEN_CACHE_DIR": token_dir,
+        "TEST_RUNS_DIR": os.path.join(token_dir, "runs"),
+        **overrides,
+    }
+    env.pop("BASIC_AUTH_USER", None)
+    env.pop("BASIC_AUTH_PASS", None)
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "_asgi:app",
+            "--app-dir", str(ROOT / "api"),
+            "--port", str(port),
+            "--log-level", "warning",
+            "--no-access-log",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Backend exited during startup")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1.0)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Backend did not start within 20s")
+
+
+def _git_revision():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    lines = []
+    for name, result in current["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if not previous:
+            continue
+        p95_delta = result["p95_ms"] - previous["p95_ms"]
+        rps_delta = result["throughput_rps"] - previous["throughput_rps"]
+        lines.append(
+            f"{name:<26} p95 {previous['p95_ms']:8.2f} -> {result['p95_ms']:8.2f} ms ({p95_delta:+.2f})"
+            f"   rps {previous['throughput_rps']:8.2f} -> {result['throughput_rps']:8.2f} ({rps_delta:+.2f})"
+        )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for the /api/* routes")
+    parser.add_argument("--target", help="Existing backend URL; by default the ASGI app is started against the stub")
+    parser.add_argument("--stub-url", help="Kinetic stub URL for upstream call counts when --target is used")
+    parser.add_argument("--routes", default=",".join(ROUTES), help="Comma-separated route names")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured requests per route")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stub latency per upstream call")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls failing with 503")
+    parser.add_argument("--records", type=int, default=500, help="Rules and dynamieken served by the stub")
+    parser.add_argument("--padding", type=int, default=0, help="Extra bytes per stub record")
+    parser.add_argument("--cassette", help="Replay upstream traffic from this cassette instead of the stub")
+    parser.add_argument("--replay-latency", action="store_true", help="Sleep for recorded upstream durations")
+    parser.add_argument("--record", help="Record the stub traffic of this run to a cassette")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>-<rev>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    routes = [name.strip() for name in args.routes.split(",") if name.strip()]
+    unknown = [name for name in routes if name not in ROUTES]
+    if unknown:
+        parser.error(f"Unknown routes: {', '.join(unknown)} (known: {', '.join(ROUTES)})")
+
+    stub = None
+    backend = None
+    stub_url = args.stub_url
+    target = args.target
+    stub_config = None
+    with tempfile.TemporaryDirectory(prefix="acceptatiebeheer-bench-") as token_dir:
+        try:
+            if not target and args.cassette:
+                port = _free_port()
+                backend = start_backend(port, token_dir, replay_env(args.cassette, args.replay_latency))
+                target = f"http://127.0.0.1:{port}"
+            elif not target:
+                stub = start_stub(
+                    latency_ms=args.latency_ms,
+                    jitter_ms=args.jitter_ms,
+                    error_rate=args.error_rate,
+                    records=args.records,
+                    padding=args.padding,
+                )
+                stub_url = stub.url
+                stub_config = stub.state.stats()["config"]
+                overrides = stub_env(stub_url)
+                if args.record:
+                    overrides["UPSTREAM_CASSETTE_MODE"] = "record"
+                    overrides["UPSTREAM_CASSETTE_PATH"] = str(Path(args.record).resolve())
+                port = _free_port()
+                backend = start_backend(port, token_dir, overrides)
+                target = f"http://127.0.0.1:{port}"
+            results = asyncio.run(
+                run_benchmark(target, routes, args.requests, args.concurrency, stub_url, args.warmup)
+            )
+        finally:
+            if backend:
+                backend.terminate()
+                backend.wait(timeout=10)
+            if stub:
+                stub.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+            "revision": _git_revision(),
+            "target": args.target or "asgi",
+            "upstream": "cassette" if args.cassette and not args.target else ("stub" if stub_config else None),
+            "cassette": args.cassette,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "stub": stub_config,
+            "python": sys.version.split()[0],
+        },
+        "routes": results,
+    }
+
+    print(f"{'route':<26} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>9} {'errors':>7} {'upstream':>9}")
+    for name, result in results.items():
+        upstream = result.get("upstream", {}).get("total", "-")
+        print(
+            f"{name:<26} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['p99_ms']:8.2f}"
+            f" {result['throughput_rps']:9.2f} {result['errors']:7d} {upstream:>9}"
+        )
+
+    output = Path(args.output) if args.output else None
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = RESULTS_DIR / f"{stamp}-{report['meta']['revision'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Saved {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        for line in compare(report, baseline):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,6 +7,8 @@ import { getAuthHeader } from './apiAuth';
 
 const App = () => {
   const [rules, setRules] = useState([]);
+  const [totalRules, setTotalRules] = useState(0);
+  const [reloadKey, setReloadKey] = useState(0);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [currentPage, setCurrentPage] = useState(1);
@@ -88,12 +90,17 @@ const App = () => {
     return flatten(Array.isArray(incoming) ? incoming : [incoming]);
   };
 
-  const fetchRules = async () => {
+  const fetchRules = async (page, term) => {
     setLoading(true);
     setError(null);
 
     try {
-      const response = await fetch(withApiEnv('/api/acceptance-rules'), {
+      // Paging and the regelId filter are evaluated server-side
+      const params = new URLSearchParams({ page: String(page), pageSize: String(rulesPerPage) });
+      if (term.trim()) {
+        params.set('regelId', term.trim());
+      }
+      const response = await fetch(withApiEnv(`/api/acceptance-rules?${params.toString()}`), {
         headers: { ...getAuthHeader() },
       });
 
@@ -105,10 +112,11 @@ const App = () => {
       // Support multiple shapes: {rules: [...]}, {data: [...]}, or direct array/object
       const normalized = normalizeRules(data.rules || data.data || data);
       setRules(normalized);
+      setTotalRules(Number.isFinite(data.total) ? data.total : normalized.length);
     } catch (err) {
       setError(err.message);
       // Demo data for illustration when API fails
-      setRules([
+      const demoRules = [
         { regelId: 'R001', externNummer: 'EXT-2024-001', omschrijving: 'Leeftijdsgrens voor standaard verzekering' },
         { regelId: 'R002', externNummer: 'EXT-2024-002', omschrijving: 'Medische keuring vereist boven drempelwaarde' },
         { regelId: 'R003', externNummer: 'EXT-2024-003', omschrijving: 'Geografische beperking voor bepaalde gebieden' },
@@ -124,17 +132,18 @@ const App = () => {
         { regelId: 'R013', externNummer: 'EXT-2024-013', omschrijving: 'Acceptatie criteria voor gevaarlijke hobby\'s' },
         { regelId: 'R014', externNummer: 'EXT-2024-014', omschrijving: 'Polisvoorwaarden voor meerdere verzekeringen' },
         { regelId: 'R015', externNummer: 'EXT-2024-015', omschrijving: 'Annuleringsrecht binnen koelingsperiode' },
-      ]);
+      ].filter((rule) => rule.regelId.toLowerCase().includes(term.trim().toLowerCase()));
+      setRules(demoRules.slice((page - 1) * rulesPerPage, page * rulesPerPage));
+      setTotalRules(demoRules.length);
     } finally {
       setLoading(false);
     }
   };
 
   useEffect(() => {
-    fetchRules();
     const handleEnvChange = () => {
       setCurrentPage(1);
-      fetchRules();
+      setReloadKey((prev) => prev + 1);
     };
     window.addEventListener('apiEnvChange', handleEnvChange);
     return () => window.removeEventListener('apiEnvChange', handleEnvChange);
@@ -154,15 +163,18 @@ const App = () => {
     }
   }, [location.state]);
 
-  const filteredRules = rules.filter((rule) =>
-    rule.regelId?.toString().toLowerCase().includes(searchTerm.trim().toLowerCase())
-  );
+  useEffect(() => {
+    // Debounce typing in the search field; page changes fetch immediately
+    const timer = window.setTimeout(() => fetchRules(currentPage, searchTerm), searchTerm ? 250 : 0);
+    return () => window.clearTimeout(timer);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [currentPage, searchTerm, reloadKey]);
 
-  const totalPages = Math.max(1, Math.ceil(filteredRules.length / rulesPerPage));
+  const totalPages = Math.max(1, Math.ceil(totalRules / rulesPerPage));
   const safePage = Math.min(currentPage, totalPages);
   const indexOfLastRule = safePage * rulesPerPage;
   const indexOfFirstRule = indexOfLastRule - rulesPerPage;
-  const currentRules = filteredRules.slice(indexOfFirstRule, indexOfLastRule);
+  const currentRules = rules;
 
   const handlePageChange = (pageNumber) => {
     setCurrentPage(pageNumber);
@@ -170,7 +182,7 @@ const App = () => {
 
   const handleRefresh = () => {
     setCurrentPage(1);
-    fetchRules();
+    setReloadKey((prev) => prev + 1);
   };
 
   const handleDelete = async (regelId) => {
@@ -196,6 +208,7 @@ const App = () => {
         throw new Error(message);
       }
       setRules((prev) => prev.filter((rule) => rule.regelId !== regelId));
+      setTotalRules((prev) => Math.max(0, prev - 1));
       setShowDeleteSuccess(true);
     } catch (err) {
       setError(err.message);
@@ -429,7 +442,7 @@ const App = () => {
       setEditRuleId(null);
       setEditOmschrijving('');
       setEditExpressie('');
-      fetchRules();
+      setReloadKey((prev) => prev + 1);
     } catch (err) {
       setEditError(err.message);
     } finally {
@@ -496,7 +509,7 @@ const App = () => {
       setXpathBuilder({ records: [createEmptyRecord()] });
       setBuilderError(null);
       setCurrentPage(1);
-      fetchRules();
+      setReloadKey((prev) => prev + 1);
     } catch (err) {
       setCreateError(err.message);
     } finally {
@@ -637,10 +650,10 @@ const App = () => {
             )}
           </div>
 
-          {rules.length > 0 && (
+          {totalRules > 0 && (
             <div className="px-6 py-4 border-t border-gray-200 flex items-center justify-between dark:border-slate-700">
               <div className="text-sm text-gray-700 dark:text-slate-200">
-                Toont {filteredRules.length === 0 ? 0 : indexOfFirstRule + 1} tot {Math.min(indexOfLastRule, filteredRules.length)} van {filteredRules.length} regels
+                Toont {totalRules === 0 ? 0 : indexOfFirstRule + 1} tot {Math.min(indexOfLastRule, totalRules)} van {totalRules} regels
               </div>
               <div className="flex gap-2">
                 <button
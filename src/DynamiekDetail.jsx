@@ -22,8 +22,8 @@ const DynamiekDetail = () => {
     setError(null);
     try {
       const res = await fetch(withApiEnv(`/api/dynamieken/${regelId}`), {
-        cache: 'no-store',
-        headers: { 'Cache-Control': 'no-store', ...getAuthHeader() },
+        cache: 'no-cache',
+        headers: { ...getAuthHeader() },
       });
       if (!res.ok) {
         throw new Error(`Failed to fetch details (status ${res.status})`);
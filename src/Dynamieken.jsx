@@ -53,8 +53,8 @@ const Dynamieken = () => {
 
     try {
       const res = await fetch(withApiEnv('/api/dynamieken'), {
-        cache: 'no-store',
-        headers: { 'Cache-Control': 'no-store', ...getAuthHeader() },
+        cache: 'no-cache',
+        headers: { ...getAuthHeader() },
       });
       if (!res.ok) {
         throw new Error(`Failed to fetch dynamiekregels (status ${res.status})`);
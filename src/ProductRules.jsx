@@ -26,8 +26,8 @@ const ProductRules = () => {
     setError(null);
     try {
       const res = await fetch(withApiEnv(`/api/products?productId=${encodeURIComponent(productId)}`), {
-        cache: 'no-store',
-        headers: { 'Cache-Control': 'no-store', ...getAuthHeader() },
+        cache: 'no-cache',
+        headers: { ...getAuthHeader() },
       });
       if (!res.ok) {
         throw new Error(`Failed to fetch product rules (status ${res.status})`);
@@ -70,7 +70,7 @@ const ProductRules = () => {
         withApiEnv(`/api/acceptance-rules?regelId=${encodeURIComponent(regelId)}`),
         {
           method: 'DELETE',
-          headers: { 'Cache-Control': 'no-store', ...getAuthHeader() },
+          headers: { ...getAuthHeader() },
         }
       );
       if (!response.ok) {
@@ -44,8 +44,8 @@ const Products = () => {
 
     try {
       const res = await fetch(withApiEnv('/api/products'), {
-        cache: 'no-store',
-        headers: { 'Cache-Control': 'no-store', ...getAuthHeader() },
+        cache: 'no-cache',
+        headers: { ...getAuthHeader() },
       });
       if (!res.ok) {
         throw new Error(`Failed to fetch productdefinitions (status ${res.status})`);
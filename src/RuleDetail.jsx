@@ -5,6 +5,50 @@ import TopNav from './TopNav';
 import { withApiEnv } from './apiEnv';
 import { getAuthHeader } from './apiAuth';
 
+const parseExplanation = (raw) => {
+  const lines = (raw || '').trim().split(/\r?\n/).map((line) => line.trim()).filter(Boolean);
+  const bullets = lines.filter((line) => line.startsWith('- ')).map((line) => line.slice(2));
+  const summaryLine = lines.find((line) => line.toLowerCase().startsWith('samenvatting:'));
+  const summary = summaryLine ? summaryLine.replace(/^samenvatting:\s*/i, '') : '';
+  return { bullets, summary };
+};
+
+// Reads the explain-rule event stream: calls onText with the text so far per
+// "delta" event and resolves with the "done" payload ({ explanation, rubriekLabels }).
+const readExplanationStream = async (response, onText) => {
+  if (!response.body || !(response.headers.get('Content-Type') || '').includes('text/event-stream')) {
+    return response.json();
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+      const event = (frame.match(/^event: (.*)$/m) || [])[1];
+      const data = (frame.match(/^data: (.*)$/m) || [])[1];
+      if (!data) continue;
+      const payload = JSON.parse(data);
+      if (event === 'delta') {
+        text += payload.text || '';
+        onText(text);
+      } else if (event === 'done') {
+        return payload;
+      } else if (event === 'error') {
+        throw new Error(payload.message || payload.error || 'Failed to explain rule');
+      }
+    }
+  }
+  throw new Error('Explanation stream ended unexpectedly');
+};
+
 const RuleDetail = () => {
   const { regelId } = useParams();
   const navigate = useNavigate();
@@ -26,8 +70,8 @@ const RuleDetail = () => {
       setError(null);
       try {
         const res = await fetch(withApiEnv(`/api/acceptance-rules?regelId=${encodeURIComponent(regelId)}`), {
-          cache: 'no-store',
-          headers: { 'Cache-Control': 'no-store', ...getAuthHeader() },
+          cache: 'no-cache',
+          headers: { ...getAuthHeader() },
         });
         if (!res.ok) {
           throw new Error(`Failed to fetch details (status ${res.status})`);
@@ -116,6 +160,7 @@ const RuleDetail = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          Accept: 'text/event-stream',
           ...getAuthHeader(),
         },
         body: JSON.stringify({ expression, productId }),
@@ -130,13 +175,8 @@ const RuleDetail = () => {
         }
         throw new Error(message);
       }
-      const data = await response.json();
-      const raw = (data.explanation || '').trim();
-      const lines = raw.split(/\r?\n/).map((line) => line.trim()).filter(Boolean);
-      const bullets = lines.filter((line) => line.startsWith('- ')).map((line) => line.slice(2));
-      const summaryLine = lines.find((line) => line.toLowerCase().startsWith('samenvatting:'));
-      const summary = summaryLine ? summaryLine.replace(/^samenvatting:\s*/i, '') : '';
-      setExplanation({ bullets, summary });
+      const data = await readExplanationStream(response, (text) => setExplanation(parseExplanation(text)));
+      setExplanation(parseExplanation(data.explanation));
       if (Array.isArray(data.rubriekLabels) && data.rubriekLabels.length > 0) {
         setRubriekLabels(data.rubriekLabels);
       }
@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Any
+
+from .storage import read_status, runs_root
+
+
+def _parse_iso(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _seconds_between(start: str | None, end: str | None) -> float | None:
+    started = _parse_iso(start)
+    finished = _parse_iso(end)
+    if started is None or finished is None:
+        return None
+    try:
+        return max((finished - started).total_seconds(), 0.0)
+    except TypeError:  # naive and aware timestamps mixed
+        return None
+
+
+def run_metrics() -> dict[str, Any]:
+    # Runs execute in their own process (test_runner.local_runner / the rq
+    # worker), so their numbers are read back from run storage at scrape time.
+    counts: dict[tuple[str, str], int] = {}
+    durations: list[tuple[str, str, float]] = []
+    queue_waits: list[tuple[str, float]] = []
+    for directory in runs_root().iterdir():
+        if not (directory / "status.json").is_file():
+            continue
+        status = read_status(directory.name)
+        suite = status.get("suite") or "unknown"
+        state = status.get("status") or "queued"
+        counts[(suite, state)] = counts.get((suite, state), 0) + 1
+
+        waited = _seconds_between(status.get("queued_at"), status.get("started_at"))
+        if waited is not None:
+            queue_waits.append((suite, waited))
+        duration = _seconds_between(status.get("started_at"), status.get("finished_at"))
+        if duration is not None:
+            durations.append((suite, state, duration))
+    return {"counts": counts, "durations": durations, "queue_waits": queue_waits}
@@ -4,3 +4,8 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+# api/ modules import their siblings directly (e.g. `from _auth import ...`).
+API_DIR = ROOT / "api"
+if str(API_DIR) not in sys.path:
+    sys.path.insert(0, str(API_DIR))
@@ -0,0 +1,66 @@
+import importlib
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import _asgi
+import _batch
+
+acceptance_rules = importlib.import_module("acceptance-rules")
+
+
+def test_routes_are_served_by_the_vercel_handlers(monkeypatch):
+    rules = {"rules": [{"RegelId": 1, "Omschrijving": "Leeftijdsgrens " * 200}]}
+    monkeypatch.setattr(acceptance_rules, "load_rules", lambda env_key: rules)
+
+    with TestClient(_asgi.app) as client:
+        response = client.get("/api/acceptance-rules", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.json() == rules
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["access-control-allow-origin"] == "*"
+
+        revalidated = client.get("/api/acceptance-rules", headers={"If-None-Match": response.headers["etag"]})
+        assert revalidated.status_code == 304
+
+        assert client.get("/api/health").json()["status"] == "healthy"
+        assert client.get("/api/unknown").status_code == 404
+        assert client.put("/api/health").status_code == 501
+
+
+def test_ndjson_batches_are_streamed(monkeypatch):
+    def fake_fetch_details(env_key, kind, ids, on_result=None):
+        results = []
+        for doc_id in ids:
+            result = {"regelId": doc_id, "status": 200, "data": {"RegelId": doc_id}}
+            on_result(result)
+            results.append(result)
+        return results
+
+    monkeypatch.setattr(_batch, "get_bearer_token", lambda env_key: "token")
+    monkeypatch.setattr(_batch, "fetch_details", fake_fetch_details)
+
+    with TestClient(_asgi.app) as client:
+        response = client.get("/api/acceptance-rules?regelIds=1,2&stream=1")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [line.get("regelId") for line in lines[:2]] == ["1", "2"]
+    assert lines[-1]["done"] is True
+
+
+def test_errors_after_streaming_started_are_raised(monkeypatch):
+    class BrokenStream(_asgi.load_handler("health")):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            self.wfile.write(b'{"regelId": "1"}\n')
+            time.sleep(0.05)
+            raise RuntimeError("upstream went away mid-stream")
+
+    monkeypatch.setitem(_asgi._handlers, "health", BrokenStream)
+    with TestClient(_asgi.app) as client:
+        with pytest.raises(RuntimeError, match="mid-stream"):
+            client.get("/api/health")
@@ -0,0 +1,65 @@
+import asyncio
+import importlib
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import _asgi
+import _batch
+
+
+def test_parse_ids_accepts_strings_and_lists():
+    assert _batch.parse_ids("3, 1,3,,2") == ["3", "1", "2"]
+    assert _batch.parse_ids([5, "6"]) == ["5", "6"]
+    with pytest.raises(ValueError):
+        _batch.parse_ids("")
+
+
+def test_fetch_details_reports_errors_per_item_and_bounds_concurrency(monkeypatch):
+    active = {"now": 0, "max": 0}
+    streamed = []
+
+    async def fake_fetch(client, token, host, regel_id):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01 if regel_id != "1" else 0.05)
+        active["now"] -= 1
+        if regel_id == "2":
+            raise RuntimeError("boom")
+        return {"RegelId": regel_id}
+
+    monkeypatch.setitem(_batch.DETAIL_FETCHERS, "acceptance-rules", fake_fetch)
+    monkeypatch.setattr(_batch, "get_bearer_token", lambda env_key: "token")
+    monkeypatch.setattr(_batch, "record_detail", lambda *args, **kwargs: None)
+    monkeypatch.setattr(_batch, "BATCH_CONCURRENCY", 2)
+
+    results = _batch.fetch_details(
+        "production", "acceptance-rules", ["1", "2", "3", "4"], on_result=streamed.append
+    )
+
+    assert [result["regelId"] for result in results] == ["1", "2", "3", "4"]
+    assert results[1] == {"regelId": "2", "status": 500, "error": "boom"}
+    assert results[0]["data"] == {"RegelId": "1"}
+    assert streamed[-1]["regelId"] == "1"
+    assert active["max"] == 2
+
+
+def test_only_invalid_ids_are_client_errors(monkeypatch):
+    dynamieken = importlib.import_module("dynamieken")
+
+    def broken_upstream(token, host, regel_id):
+        raise json.JSONDecodeError("Expecting value", "<html>", 0)
+
+    monkeypatch.setattr(dynamieken, "get_env_config", lambda env_key: {"host": "kinetic.test"})
+    monkeypatch.setattr(dynamieken, "get_bearer_token", lambda env_key: "token")
+    monkeypatch.setattr(dynamieken, "fetch_dynamiek_detail", broken_upstream)
+
+    with TestClient(_asgi.app) as api:
+        invalid = api.get("/api/acceptance-rules", params={"regelIds": ","})
+        invalid_body = api.post("/api/dynamieken", json={"regelIds": []})
+        broken = api.get("/api/dynamieken/5")
+
+    assert invalid.status_code == invalid_body.status_code == 400
+    assert invalid.json() == {"error": "regelIds is required"}
+    assert broken.status_code == 500
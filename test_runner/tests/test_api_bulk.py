@@ -0,0 +1,65 @@
+import httpx
+
+import _bulk
+
+
+def test_validate_operations_collects_all_errors():
+    operations, errors = _bulk.validate_operations(
+        [
+            {"op": "create", "AfdBrancheCodeId": 1, "Omschrijving": "a", "Expressie": "x", "ResourceId": "r1"},
+            {"op": "update", "Omschrijving": "b", "Expressie": "y"},
+            {"op": "delete"},
+            {"op": "create", "AfdBrancheCodeId": 1, "Omschrijving": "c", "Expressie": "z", "ResourceId": "r1"},
+            {"op": "rename"},
+        ]
+    )
+
+    assert [operation["index"] for operation in operations] == [0]
+    assert [error["index"] for error in errors] == [1, 2, 3, 4]
+
+
+def test_dry_run_does_not_call_upstream(monkeypatch):
+    monkeypatch.setattr(_bulk, "create_rule", lambda *args: (_ for _ in ()).throw(AssertionError("called")))
+    operations, _ = _bulk.validate_operations(
+        [{"AfdBrancheCodeId": 1, "Omschrijving": "a", "Expressie": "x"}]
+    )
+
+    report = _bulk.run_bulk("production", operations, dry_run=True)
+
+    assert report["dryRun"] is True
+    assert report["results"][0]["status"] == "validated"
+    assert report["results"][0]["resourceId"]
+
+
+def test_run_bulk_retries_transient_errors_with_same_resource_id(monkeypatch):
+    calls = []
+
+    def update_rule(token, host, payload):
+        calls.append(payload["ResourceId"])
+        if len(calls) == 1:
+            request = httpx.Request("PUT", "https://kinetic.test")
+            raise httpx.HTTPStatusError("busy", request=request, response=httpx.Response(503, request=request))
+        return {"status": "updated"}
+
+    def delete_rule(token, host, regel_id):
+        request = httpx.Request("DELETE", "https://kinetic.test")
+        raise httpx.HTTPStatusError("bad", request=request, response=httpx.Response(400, request=request))
+
+    monkeypatch.setattr(_bulk, "update_rule", update_rule)
+    monkeypatch.setattr(_bulk, "delete_rule", delete_rule)
+    monkeypatch.setattr(_bulk, "get_bearer_token", lambda env_key: "token")
+    monkeypatch.setattr(_bulk, "BULK_BACKOFF_SECONDS", 0)
+    operations, _ = _bulk.validate_operations(
+        [
+            {"RegelId": 5, "Omschrijving": "a", "Expressie": "x", "ResourceId": "r5"},
+            {"op": "delete", "RegelId": 6},
+        ]
+    )
+
+    report = _bulk.run_bulk("test-env", operations)
+
+    assert calls == ["r5", "r5"]
+    assert report["succeeded"] == 1
+    assert report["results"][0]["attempts"] == 2
+    assert report["results"][1]["status"] == "failed"
+    assert report["results"][1]["attempts"] == 1
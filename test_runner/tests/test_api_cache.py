@@ -0,0 +1,80 @@
+import threading
+import time
+
+from _cache import TTLCache
+
+
+def test_get_or_load_caches_until_ttl():
+    cache = TTLCache(maxsize=4, ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"count": len(calls)}
+
+    assert cache.get_or_load("rules", loader) == {"count": 1}
+    assert cache.get_or_load("rules", loader) == {"count": 1}
+    assert len(calls) == 1
+
+
+def test_lru_eviction_drops_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_stale_entry_is_served_while_revalidating():
+    cache = TTLCache(maxsize=4, ttl=0.01, stale_ttl=60)
+    cache.set("rules", "old")
+    time.sleep(0.02)
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return "new"
+
+    assert cache.get_or_load("rules", loader) == "old"
+    assert refreshed.wait(1)
+    deadline = time.monotonic() + 1
+    while cache.get("rules") != "new" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get("rules") == "new"
+
+
+def test_invalidate_discards_load_started_before_write():
+    cache = TTLCache(maxsize=4, ttl=60)
+
+    def loader():
+        cache.invalidate("rules")
+        return "outdated"
+
+    assert cache.get_or_load("rules", loader) == "outdated"
+    assert cache.get("rules") is None
+
+
+def test_failed_load_is_remembered_for_error_ttl():
+    cache = TTLCache(maxsize=4, ttl=60, error_ttl=0.05)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        if len(calls) == 1:
+            raise LookupError("product 7 not found")
+        return "loaded"
+
+    for _ in range(3):
+        try:
+            cache.get_or_load("product", loader)
+        except LookupError as exc:
+            assert str(exc) == "product 7 not found"
+    assert len(calls) == 1
+
+    time.sleep(0.06)
+    assert cache.get_or_load("product", loader) == "loaded"
+    assert len(calls) == 2
@@ -0,0 +1,57 @@
+import gzip
+import json
+
+import httpx
+import pytest
+
+import _cassette
+
+
+def _upstream(request):
+    if request.url.path == "/token":
+        return httpx.Response(200, json={"access_token": "secret-token", "expires_in": 3600})
+    return httpx.Response(200, json={"RegelId": request.url.path.rsplit("/", 1)[-1]})
+
+
+def test_request_key_redacts_secrets_and_hashes_bodies():
+    key = _cassette.request_key("get", "https://kinetic/rules?client_secret=abc&b=2&a=1")
+    assert key == "GET https://kinetic/rules?a=1&b=2&client_secret=REDACTED"
+    assert _cassette.request_key("POST", "https://kinetic/token", b"x") != _cassette.request_key(
+        "POST", "https://kinetic/token", b"y"
+    )
+
+
+def test_record_then_replay_round_trip(tmp_path):
+    path = tmp_path / "upstream.jsonl.gz"
+    recorder = _cassette.RecordingTransport(httpx.MockTransport(_upstream), _cassette.Cassette(str(path)))
+    with httpx.Client(transport=recorder) as client:
+        client.post("https://kinetic/token", data={"client_secret": "s3cret"})
+        client.get("https://kinetic/rules/7")
+        client.get("https://kinetic/rules/7")
+
+    raw = gzip.open(path, "rt").read()
+    assert "s3cret" not in raw and "secret-token" not in raw
+    # Identical bodies are stored once.
+    assert sum(1 for line in raw.splitlines() if '"data"' in line) == 2
+
+    replay = _cassette.ReplayTransport(_cassette.Cassette(str(path)).load())
+    with httpx.Client(transport=replay) as client:
+        assert client.get("https://kinetic/rules/7").json() == {"RegelId": "7"}
+        # A different host replays by path.
+        assert client.get("http://127.0.0.1:8100/rules/7").json() == {"RegelId": "7"}
+        token = client.post("https://kinetic/token", data={"client_secret": "s3cret"}).json()
+        assert token["access_token"] == "REDACTED"
+        with pytest.raises(_cassette.CassetteMiss):
+            client.get("https://kinetic/rules/8")
+
+
+def test_replay_cycles_in_recorded_order(tmp_path):
+    path = tmp_path / "upstream.jsonl.gz"
+    cassette = _cassette.Cassette(str(path))
+    for status in (503, 200):
+        cassette.record("GET", "https://kinetic/rules", b"", httpx.Response(status, json={"status": status}), 5.0)
+
+    replayed = _cassette.Cassette(str(path)).load()
+    statuses = [replayed.replay("GET", "https://kinetic/rules", b"").status_code for _ in range(3)]
+    assert statuses == [503, 200, 503]
+    assert json.loads(replayed.replay("GET", "https://kinetic/rules", b"").content) == {"status": 200}
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import httpx
+import pytest
+
+import _coalesce
+import _kinetic
+import _metrics
+
+
+def test_concurrent_identical_reads_share_one_upstream_call(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        started.set()
+        release.wait(5)
+        return httpx.Response(200, json=[{"RegelId": 1, "Omschrijving": "a"}])
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(_kinetic, "get_client", lambda host: client)
+    before = _metrics.UPSTREAM_COALESCED.value("fetch_rules")
+    results = []
+
+    def call():
+        results.append(_kinetic.fetch_rules("token", "https://kinetic.test"))
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    # Give the other callers time to join the flight before it lands.
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert _metrics.UPSTREAM_COALESCED.value("fetch_rules") == before + 3
+    assert all(result == {"rules": [{"RegelId": 1, "Omschrijving": "a"}], "count": 1} for result in results)
+    results[0]["rules"][0]["Omschrijving"] = "changed"
+    assert {result["rules"][0]["Omschrijving"] for result in results[1:]} == {"a"}
+
+
+def test_failed_flight_is_not_reused():
+    flights = _coalesce.SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.do(("production", "GET", "demo", 1), fail)
+    assert flights.do(("production", "GET", "demo", 1), lambda: "ok") == ("ok", False)
+    assert flights._calls == {}
@@ -0,0 +1,12 @@
+import pytest
+
+from benchmarks.cold_start import DEFERRED_MODULES, ENTRY_POINTS, budget_ms, profile_import
+
+
+@pytest.mark.parametrize("module", ENTRY_POINTS)
+def test_entry_point_import_stays_within_budget(module):
+    profile = profile_import(module, runs=2)
+    imported = {entry["name"] for entry in profile["modules"]}
+
+    assert profile["total_ms"] <= budget_ms(module), profile["total_ms"]
+    assert not imported.intersection(DEFERRED_MODULES)
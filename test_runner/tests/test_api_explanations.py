@@ -0,0 +1,359 @@
+import importlib
+import json
+import time
+import types
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import _asgi
+import _cache
+from _explanations import ExplanationCache, explanation_key, normalize_expression
+from _metrics import CACHE_REQUESTS
+from benchmarks.labels import (
+    make_product,
+    reference_apply_label_overrides,
+    reference_apply_value_overrides,
+    reference_build_label_lookups,
+)
+
+explain_rule = importlib.import_module("explain-rule")
+
+
+def test_key_ignores_layout_but_not_literals_labels_or_model():
+    labels = [{"code": "PDA_1", "label": "Bouwjaar", "values": []}]
+    key = explanation_key("PDA_1  >\n 1990", labels, "model-a", "1")
+
+    assert normalize_expression("  PDA_1 = 'a  b'\n") == "PDA_1 = 'a  b'"
+    assert explanation_key("PDA_1 > 1990", labels, "model-a", "1") == key
+    assert explanation_key("PDA_1 > 1991", labels, "model-a", "1") != key
+    assert explanation_key("PDA_1 > 1990", [], "model-a", "1") != key
+    assert explanation_key("PDA_1 > 1990", labels, "model-b", "1") != key
+    assert explanation_key("PDA_1 > 1990", labels, "model-a", "2") != key
+
+
+def test_disk_tier_survives_restart_and_evicts(tmp_path):
+    path = str(tmp_path / "explanations.sqlite3")
+    cache = ExplanationCache(path=path, ttl=60, memory_entries=1, max_entries=2)
+    for name in ("a", "b", "c"):
+        cache.set(name, f"text {name}")
+        time.sleep(0.001)
+
+    restarted = ExplanationCache(path=path, ttl=60, memory_entries=1, max_entries=2)
+    assert restarted.get("a") is None
+    assert restarted.get("b") == "text b"
+
+    disk, hit = (CACHE_REQUESTS.value("explanations", result) for result in ("disk", "hit"))
+    assert restarted.get("c") == "text c"
+    # Promoted to the memory tier: the second read does not touch SQLite.
+    restarted._connection = lambda: pytest.fail("memory hit went to SQLite")
+    assert restarted.get("c") == "text c"
+    assert CACHE_REQUESTS.value("explanations", "disk") == disk + 1
+    assert CACHE_REQUESTS.value("explanations", "hit") == hit + 1
+
+    assert ExplanationCache(path=path, ttl=0.0).get("c") is None
+
+
+def test_explain_rule_answers_repeat_questions_from_cache(monkeypatch, tmp_path):
+    calls = []
+
+    def openai(request):
+        calls.append(request)
+        return httpx.Response(200, json={"output_text": "- PDA_1 is groter dan 1990.\nSamenvatting: ok."})
+
+    client = httpx.Client(transport=httpx.MockTransport(openai))
+    monkeypatch.setattr(explain_rule, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(explain_rule, "get_client", lambda base_url: client)
+    monkeypatch.setattr(explain_rule, "explanation_cache", ExplanationCache(path=str(tmp_path / "e.sqlite3")))
+
+    with TestClient(_asgi.app) as api:
+        first = api.post("/api/explain-rule", json={"expression": "PDA_1 > 1990"})
+        second = api.post("/api/explain-rule", json={"expression": " PDA_1 >  1990 "})
+
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert len(calls) == 1
+
+
+def test_label_lookups_are_built_once_per_product_version(monkeypatch):
+    product = {"Rubrieken": [{"RubriekId": "X_12", "Labelnaam": "Bouwjaar"}]}
+    fetches = []
+    builds = []
+    build_label_lookups = explain_rule.build_label_lookups
+
+    def fetch_product_detail(token, host, product_id):
+        fetches.append(product_id)
+        return product
+
+    def counting_build(payload):
+        builds.append(payload)
+        return build_label_lookups(payload)
+
+    monkeypatch.setattr(explain_rule, "fetch_product_detail", fetch_product_detail)
+    monkeypatch.setattr(explain_rule, "get_bearer_token", lambda env_key: "token")
+    monkeypatch.setattr(explain_rule, "build_label_lookups", counting_build)
+    monkeypatch.setattr(explain_rule, "label_cache", explain_rule.TTLCache(ttl=60, name="demo-labels"))
+
+    with TestClient(_asgi.app) as api:
+        first = api.get("/api/explain-rule", params={"expression": "PDA_12 > 1", "productId": 7})
+        second = api.get("/api/explain-rule", params={"expression": "BST_12 = 'J'", "productId": 7})
+    assert first.json()["rubriekLabels"][0]["label"] == "Bouwjaar"
+    assert second.json()["rubriekLabels"][0]["code"] == "BST_12"
+    assert (fetches, len(builds)) == (["7"], 1)
+
+    # Past the TTL: refetched, but only rebuilt once the payload changes.
+    clock = {"now": time.monotonic() + 120}
+    monkeypatch.setattr(_cache, "time", types.SimpleNamespace(monotonic=lambda: clock["now"]))
+    explain_rule.get_label_lookups("production", 7)
+    assert (len(fetches), len(builds)) == (2, 1)
+    product["Rubrieken"][0]["Labelnaam"] = "Bouwjaar woning"
+    clock["now"] += 120
+    assert explain_rule.get_label_lookups("production", 7)["custom_by_id"]["12"]["label"] == "Bouwjaar woning"
+    assert len(builds) == 2
+
+
+def test_missing_product_is_not_refetched_for_every_explanation(monkeypatch):
+    fetches = []
+
+    def fetch_product_detail(token, host, product_id):
+        fetches.append(product_id)
+        request = httpx.Request("GET", f"https://kinetic.test/productdefinities/{product_id}")
+        raise httpx.HTTPStatusError("Not found", request=request, response=httpx.Response(404, request=request))
+
+    monkeypatch.setattr(explain_rule, "fetch_product_detail", fetch_product_detail)
+    monkeypatch.setattr(explain_rule, "get_bearer_token", lambda env_key: "token")
+    monkeypatch.setattr(explain_rule, "label_cache", explain_rule.TTLCache(ttl=60, name="demo-labels", error_ttl=30))
+
+    params = {"expression": "PDA_12 > 1", "productId": 404}
+    with TestClient(_asgi.app) as api:
+        responses = [api.get("/api/explain-rule", params=params) for _ in range(5)]
+    assert [response.json()["rubriekLabels"] for response in responses] == [[]] * 5
+    assert fetches == ["404"]
+
+
+def test_label_extraction_matches_the_reference_extractor():
+    edge_cases = {
+        "a": [
+            {"LABELNAAM": "Eerste", "labelnaam": "Tweede", "rubriekid": None, "Waardes": "geen lijst"},
+            {"Labelnaam": "", "AFDlabel": "PDA_X"},
+            {"Labelnaam": "Zonder id"},
+            {"labelNaam": "Dubbel", "RubriekId": "P_7", "AfdLabel": "PDA_D", "waardes": [
+                1, {"CODE": 0, "code": "x"}, {"Omschrijving": None}, {"Code": "J", "omschrijving": "Ja"},
+            ]},
+            {"Labelnaam": "Later", "RubriekId": "Q_7", "Nested": {"Labelnaam": "Binnen", "AFDlabel": "PDA_D"}},
+        ],
+        "b": [[{"Labelnaam": "Diep", "RubriekId": 12}]],
+    }
+    for payload in (edge_cases, make_product(rubrieken=300, seed=3), [], None):
+        assert explain_rule.build_label_lookups(payload) == reference_build_label_lookups(payload)
+
+
+def test_substitutions_match_the_reference_overrides_and_are_cached():
+    dekking = [{"code": "1", "omschrijving": "WA"}, {"code": "10", "omschrijving": "Casco"}]
+    woning = [{"code": "V", "omschrijving": "Vrijstaand"}, {"code": "X", "omschrijving": "X"}]
+    labels = [
+        {"code": "PDA_1", "label": "Dekking", "values": dekking},
+        {"code": "PDA_12", "label": "Bouwjaar", "values": []},
+        {"code": "BST_3", "label": "Soort woning", "values": woning},
+    ]
+    text = (
+        "- Als PDA_1 gelijk is aan '10' en PDA_12 groter is dan 1990.\n"
+        "- Soort woning = \"V\", of BST_3 gelijk zijn aan V.\n"
+        "- PDA_123 en xPDA_1 blijven staan; Dekking=1.\n"
+        "Samenvatting: PDA_1 is gelijk aan 1."
+    )
+    expected = reference_apply_value_overrides(reference_apply_label_overrides(text, labels), labels)
+    assert explain_rule.Substitutions(labels).apply(text) == expected
+    assert "Soort woning gelijk zijn aan Vrijstaand" in expected and "Dekking=WA." in expected
+
+    lookups = {"substitutions": explain_rule.OrderedDict()}
+    assert explain_rule.get_substitutions(lookups, labels) is explain_rule.get_substitutions(lookups, list(labels))
+    assert explain_rule.get_substitutions(None, []).apply(text) == text
+
+
+def test_substitutions_translate_every_comparison_like_the_reference():
+    leeftijd = [{"code": "A", "omschrijving": "Alpha"}, {"code": "B", "omschrijving": "Beta"}]
+    labels = [
+        {"code": "PDA_1", "label": "Leeftijd", "values": leeftijd},
+        {"code": "PDA_2", "label": "Bouwjaar", "values": [{"code": "J", "omschrijving": "Ja"}]},
+        {"code": "PDA_3", "label": "Kopie van PDA_1", "values": []},
+    ]
+    texts = [
+        "- Als Leeftijd gelijk is aan A of gelijk is aan B.",
+        "- Als Leeftijd gelijk is aan B of gelijk is aan A.",
+        "- Leeftijd gelijk is aan B en niet gelijk is aan A.",
+        "- Leeftijd en Bouwjaar gelijk zijn aan J en gelijk is aan A.",
+        "- PDA_1 = A of = 'B', PDA_3 en PDA_1 gelijk is aan A of == B.\n- PDA_2=J en Leeftijd=A=B",
+    ]
+    substitutions = explain_rule.Substitutions(labels)
+    for text in texts:
+        expected = reference_apply_value_overrides(reference_apply_label_overrides(text, labels), labels)
+        assert substitutions.apply(text) == expected
+    assert substitutions.apply(texts[0]) == "- Als Leeftijd gelijk is aan Alpha of gelijk is aan Beta."
+    assert substitutions.apply(texts[3]) == "- Leeftijd en Bouwjaar gelijk zijn aan Ja en gelijk is aan Alpha."
+
+
+def _sse(*events):
+    return "".join(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events).encode()
+
+
+def _events(body):
+    frames = [frame.split("\n") for frame in body.strip().split("\n\n")]
+    return [(lines[0][len("event: "):], json.loads(lines[1][len("data: "):])) for lines in frames]
+
+
+def test_sentence_stream_matches_the_reference_on_the_whole_answer():
+    dekking = [{"code": "10", "omschrijving": "Casco"}, {"code": "1", "omschrijving": "WA"}]
+    labels = [
+        {"code": "PDA_1", "label": "Dekking", "values": dekking},
+        {"code": "PDA_2", "label": "Bouwjaar", "values": [{"code": "J", "omschrijving": "Ja"}]},
+    ]
+    substitutions = explain_rule.Substitutions(labels)
+    text = (
+        "- Als PDA_1 gelijk is aan '10' of gelijk is aan 1. Dekking = 10 en = 1 en PDA_12.\n"
+        "- PDA_1 en PDA_2 gelijk zijn aan J en gelijk is aan 10\nSamenvatting: Dekking = 1.5."
+    )
+    expected = reference_apply_value_overrides(reference_apply_label_overrides(text, labels), labels)
+    assert "gelijk is aan Casco of gelijk is aan WA." in expected
+    for size in (1, 2, 3, 7, len(text)):
+        sentences = explain_rule.SentenceStream(substitutions)
+        emitted = [sentences.feed(text[start:start + size]) for start in range(0, len(text), size)]
+        emitted.append(sentences.finish())
+        assert "".join(emitted) == sentences.text == expected
+        assert all(part.endswith((". ", ".\n", "\n")) for part in emitted[:-1] if part)
+
+
+def test_explain_rule_streams_substituted_sentences_and_caches_the_answer(monkeypatch, tmp_path):
+    answer = (
+        "- Als PDA_1 gelijk is aan '10' of gelijk is aan 1 gaat de regel af.\n"
+        "- Dekking = 1 en PDA_2 gelijk zijn aan J of = 10.\nSamenvatting: PDA_1 telt."
+    )
+    deltas = [answer[start:start + 5] for start in range(0, len(answer), 5)]
+    requests = []
+
+    def openai(request):
+        requests.append(json.loads(request.content))
+        if not requests[-1].get("stream"):
+            return httpx.Response(200, json={"output_text": answer})
+        body = _sse(
+            {"type": "response.created"},
+            *({"type": "response.output_text.delta", "delta": delta} for delta in deltas),
+            {"type": "response.completed"},
+        )
+        return httpx.Response(200, content=body, headers={"Content-Type": "text/event-stream"})
+
+    dekking = [{"code": "10", "omschrijving": "Casco"}, {"code": "1", "omschrijving": "WA"}]
+    lookups = {
+        "custom_by_id": {
+            "1": {"label": "Dekking", "values": dekking},
+            "2": {"label": "Bouwjaar", "values": [{"code": "J", "omschrijving": "Ja"}]},
+        },
+        "default_by_afdlabel": {},
+        "substitutions": explain_rule.OrderedDict(),
+    }
+    client = httpx.Client(transport=httpx.MockTransport(openai))
+    cache = ExplanationCache(path=str(tmp_path / "e.sqlite3"))
+    monkeypatch.setattr(explain_rule, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(explain_rule, "get_client", lambda base_url: client)
+    monkeypatch.setattr(explain_rule, "get_label_lookups", lambda env_key, product_id: lookups)
+    monkeypatch.setattr(explain_rule, "explanation_cache", cache)
+
+    body = {"expression": "PDA_1 = '10' and PDA_2 = 'J'", "productId": 7}
+    with TestClient(_asgi.app) as api:
+        streamed = api.post("/api/explain-rule?stream=1", json=body)
+        cached = api.post("/api/explain-rule", json=body, headers={"Accept": "text/event-stream"})
+        cache.clear()
+        plain = api.post("/api/explain-rule", json=body)
+
+    assert streamed.headers["content-type"].startswith("text/event-stream")
+    events = _events(streamed.text)
+    assert [event for event, _ in events] == ["delta", "delta", "delta", "done"]
+    assert events[0][1]["text"] == "- Als Dekking gelijk is aan Casco of gelijk is aan WA gaat de regel af.\n"
+    done = events[-1][1]
+    assert done["explanation"] == "".join(data["text"] for _, data in events[:-1])
+    labels = done["rubriekLabels"]
+    expected = reference_apply_value_overrides(reference_apply_label_overrides(answer, labels), labels)
+    assert done["explanation"] == expected
+    assert [request.get("stream") for request in requests] == [True, None]
+    assert _events(cached.text) == [("done", done)]
+    assert plain.json() == done
+
+
+def test_explain_rule_stream_reports_upstream_failures(monkeypatch, tmp_path):
+    responses = [
+        httpx.Response(429, json={"error": {"message": "Rate limit"}}),
+        httpx.Response(
+            200,
+            content=_sse(
+                {"type": "response.output_text.delta", "delta": "- Eerste zin. Twee"},
+                {"type": "response.failed", "response": {"error": {"message": "Model overloaded"}}},
+            ),
+            headers={"Content-Type": "text/event-stream"},
+        ),
+    ]
+    client = httpx.Client(transport=httpx.MockTransport(lambda request: responses.pop(0)))
+    cache = ExplanationCache(path=str(tmp_path / "e.sqlite3"))
+    monkeypatch.setattr(explain_rule, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(explain_rule, "get_client", lambda base_url: client)
+    monkeypatch.setattr(explain_rule, "explanation_cache", cache)
+
+    with TestClient(_asgi.app) as api:
+        refused = api.post("/api/explain-rule?stream=1", json={"expression": "PDA_1 > 1"})
+        failed = api.post("/api/explain-rule?stream=1", json={"expression": "PDA_1 > 1"})
+
+    assert refused.status_code == 429
+    assert refused.json()["error"] == "Upstream request failed"
+    assert _events(failed.text) == [
+        ("delta", {"text": "- Eerste zin. "}),
+        ("error", {"error": "Upstream request failed", "message": "Model overloaded"}),
+    ]
+    key = explanation_key("PDA_1 > 1", [], f"{explain_rule.OPENAI_MODEL}:{explain_rule.OPENAI_MAX_OUTPUT_TOKENS}", "1")
+    assert cache.get(key) is None
+
+
+def test_sentence_stream_does_not_cut_inside_a_dotted_label():
+    labels = [{"code": "PDA_9", "label": "Max. verzekerd bedrag", "values": [{"code": "J", "omschrijving": "Ja"}]}]
+    substitutions = explain_rule.Substitutions(labels)
+    text = (
+        "- Als Max. verzekerd bedrag gelijk is aan J gaat de regel af.\n"
+        "- Max. bedrag en PDA_9 = J. Max. verzekerd bedrag = J\nSamenvatting: Max. verzekerd"
+    )
+    expected = reference_apply_value_overrides(reference_apply_label_overrides(text, labels), labels)
+    assert "Max. verzekerd bedrag gelijk is aan Ja gaat" in expected
+    for size in (1, 2, 3, 7, len(text)):
+        sentences = explain_rule.SentenceStream(substitutions)
+        emitted = [sentences.feed(text[start:start + size]) for start in range(0, len(text), size)]
+        emitted.append(sentences.finish())
+        assert "".join(emitted) == sentences.answer == expected
+        assert next(part for part in emitted if part).startswith("- Als Max. verzekerd bedrag gelijk is aan Ja")
+
+
+def test_stream_ignores_a_browser_that_leaves_before_done(monkeypatch, tmp_path):
+    def openai(request):
+        body = _sse({"type": "response.output_text.delta", "delta": "- Eerste zin.\n"}, {"type": "response.completed"})
+        return httpx.Response(200, content=body, headers={"Content-Type": "text/event-stream"})
+
+    send_event = explain_rule.handler._send_event
+
+    def leaving_browser(self, event, payload):
+        if event == "done":
+            raise BrokenPipeError("browser went away")
+        send_event(self, event, payload)
+
+    client = httpx.Client(transport=httpx.MockTransport(openai))
+    cache = ExplanationCache(path=str(tmp_path / "e.sqlite3"))
+    monkeypatch.setattr(explain_rule, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(explain_rule, "get_client", lambda base_url: client)
+    monkeypatch.setattr(explain_rule, "explanation_cache", cache)
+    monkeypatch.setattr(explain_rule.handler, "_send_event", leaving_browser)
+
+    with TestClient(_asgi.app) as api:
+        streamed = api.post("/api/explain-rule?stream=1", json={"expression": "PDA_1 > 1"})
+        cached = api.post("/api/explain-rule?stream=1", json={"expression": "PDA_1 > 1"})
+
+    assert streamed.status_code == 200
+    assert _events(streamed.text) == [("delta", {"text": "- Eerste zin.\n"})]
+    assert cached.text == ""
+    key = explanation_key("PDA_1 > 1", [], f"{explain_rule.OPENAI_MODEL}:{explain_rule.OPENAI_MAX_OUTPUT_TOKENS}", "1")
+    assert cache.get(key) == "- Eerste zin.\n"
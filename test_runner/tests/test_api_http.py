@@ -0,0 +1,104 @@
+import gzip
+import io
+import json
+
+import _http
+
+
+class FakeHandler:
+    def __init__(self, accept_encoding=None, if_none_match=None):
+        self.headers = {}
+        if accept_encoding:
+            self.headers["Accept-Encoding"] = accept_encoding
+        if if_none_match:
+            self.headers["If-None-Match"] = if_none_match
+        self.sent = {}
+        self.status = None
+        self.wfile = io.BytesIO()
+
+    def send_response(self, status_code):
+        self.status = status_code
+
+    def send_header(self, name, value):
+        self.sent[name] = value
+
+    def end_headers(self):
+        pass
+
+
+def test_negotiate_encoding_honours_q_values(monkeypatch):
+    monkeypatch.setattr(_http, "brotli", object())
+    assert _http.negotiate_encoding("gzip, deflate, br") == "br"
+    assert _http.negotiate_encoding("br;q=0, gzip;q=0.5") == "gzip"
+    assert _http.negotiate_encoding("identity") == "identity"
+    assert _http.negotiate_encoding(None) == "identity"
+    monkeypatch.setattr(_http, "brotli", None)
+    assert _http.negotiate_encoding("br, gzip") == "gzip"
+
+
+def test_send_json_compresses_large_bodies_only():
+    payload = {"rules": [{"RegelId": index, "Omschrijving": "regel"} for index in range(200)]}
+    handler = FakeHandler("gzip")
+    _http.send_json(handler, payload, headers={"Access-Control-Allow-Origin": "*"})
+    body = handler.wfile.getvalue()
+    assert handler.sent["Content-Encoding"] == "gzip"
+    assert handler.sent["Content-Length"] == str(len(body))
+    assert handler.sent["Vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(body)) == payload
+
+    small = FakeHandler("gzip")
+    _http.send_json(small, {"status": "ok"}, status_code=201)
+    assert small.status == 201
+    assert "Content-Encoding" not in small.sent
+    assert json.loads(small.wfile.getvalue()) == {"status": "ok"}
+
+
+def test_encoded_bodies_are_reused_until_the_source_changes(monkeypatch):
+    calls = []
+    real_dumps = _http.dumps
+    monkeypatch.setattr(_http, "dumps", lambda payload: calls.append(1) or real_dumps(payload))
+    source = {"rules": ["x" * 2000]}
+
+    first, _, _ = _http.encode_json(source, "gzip", cache_key=("test", "rules"))
+    assert _http.encode_json(source, "gzip", cache_key=("test", "rules"))[0] is first
+    _http.encode_json(source, "identity", cache_key=("test", "rules"))
+    assert len(calls) == 1
+
+    refreshed = {"rules": ["y" * 2000]}
+    body, _, _ = _http.encode_json(refreshed, "gzip", cache_key=("test", "rules"))
+    assert len(calls) == 2
+    assert json.loads(gzip.decompress(body)) == refreshed
+
+
+def test_conditional_get_returns_304_for_a_matching_etag():
+    source = [{"RegelId": index} for index in range(300)]
+    payload = {"products": source, "count": len(source)}
+    _http.prime_json(("test", "products"), payload, source=source)
+
+    first = FakeHandler("gzip")
+    _http.send_json(first, payload, cache_key=("test", "products"), source=source, conditional=True)
+    etag = first.sent["ETag"]
+    assert etag.endswith('-gzip"')
+    assert first.sent["Cache-Control"] == "private, no-cache"
+
+    # The hash part matches whatever coding the client cached.
+    for if_none_match in (etag, etag.replace("-gzip", ""), 'W/"other", ' + etag):
+        repeat = FakeHandler("br", if_none_match=if_none_match)
+        _http.send_json(repeat, payload, cache_key=("test", "products"), source=source, conditional=True)
+        assert repeat.status == 304
+        assert repeat.wfile.getvalue() == b""
+
+    source.append({"RegelId": "new"})
+    changed = FakeHandler("gzip", if_none_match=etag)
+    payload = {"products": list(source), "count": len(source)}
+    _http.send_json(changed, payload, cache_key=("test", "products"), source=payload["products"], conditional=True)
+    assert changed.status == 200
+    assert changed.sent["ETag"] != etag
+
+
+def test_etag_is_stable_for_identical_content():
+    _, _, first = _http.encode_json({"a": 1, "b": [1, 2]})
+    _, _, second = _http.encode_json({"a": 1, "b": [1, 2]})
+    assert first == second
+    assert not _http.etag_matches(None, first)
+    assert _http.etag_matches("*", first)
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import _limits
+import _metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters(monkeypatch):
+    monkeypatch.setattr(_limits, "_limiters", {})
+
+
+def test_waiting_callers_are_admitted_in_arrival_order():
+    limiter = _limits.Limiter("production", "write", concurrency=1, rate=0, burst=1)
+    limiter.acquire()
+    order = []
+
+    def call(number):
+        limiter.acquire()
+        order.append(number)
+        limiter.release()
+
+    threads = []
+    for number in range(5):
+        thread = threading.Thread(target=call, args=(number,))
+        thread.start()
+        threads.append(thread)
+        # Wait until it is queued, so arrival order is deterministic.
+        while len(limiter._queue) < number + 1:
+            time.sleep(0.001)
+    limiter.release()
+    for thread in threads:
+        thread.join()
+
+    assert order == [0, 1, 2, 3, 4]
+    assert limiter.active == 0
+
+
+def test_token_bucket_spaces_calls_after_the_burst():
+    limiter = _limits.Limiter("production", "read", concurrency=10, rate=50, burst=2)
+    started = time.monotonic()
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release()
+
+    # Two calls from the burst, then one token every 20 ms.
+    assert time.monotonic() - started >= 0.035
+
+
+def test_decorated_async_calls_share_the_environment_limit(monkeypatch):
+    monkeypatch.setenv("KINETIC_READ_CONCURRENCY", "9")
+    monkeypatch.setenv("KINETIC_READ_CONCURRENCY_ACCEPTANCE", "2")
+    monkeypatch.setenv("KINETIC_READ_RATE_ACCEPTANCE", "0")
+    monkeypatch.setattr(_limits, "ACCEPTANCE_KINETIC_HOST", "https://acc.test")
+    state = {"active": 0, "peak": 0}
+
+    @_limits.limited("read")
+    async def fetch_demo(client, token, host, doc_id):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return doc_id
+
+    async def run():
+        return await asyncio.gather(*(fetch_demo(None, "t", "https://acc.test", n) for n in range(6)))
+
+    before = _metrics.UPSTREAM_QUEUE_WAIT.count("acceptance", "read")
+    assert asyncio.run(run()) == list(range(6))
+    assert state["peak"] == 2
+    assert _metrics.UPSTREAM_QUEUE_WAIT.count("acceptance", "read") == before + 6
+    assert _metrics.UPSTREAM_QUEUED.value("acceptance", "read") == 0
+    assert _limits.get_limiter("https://other.test", "read").concurrency == 9
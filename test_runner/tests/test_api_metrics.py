@@ -0,0 +1,108 @@
+import importlib
+import io
+
+import httpx
+
+import _metrics
+from _transports import ObservedTransport
+from test_runner.metrics import run_metrics
+from test_runner.storage import create_run, update_status
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = _metrics.Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0), register=False)
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "rules")
+
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP demo_seconds Demo.", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{route="rules",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="rules",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{route="rules",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{route="rules"} 3' in lines
+
+
+def test_upstream_endpoint_names_have_no_ids():
+    base = "/beheer/api/v1/administratie/assurantie/regels/acceptatieregels"
+    assert _metrics.upstream_endpoint(base) == "acceptatieregels"
+    assert _metrics.upstream_endpoint(f"{base}/1234") == "acceptatieregels.detail"
+    assert _metrics.upstream_endpoint(f"{base}/invoeren") == "acceptatieregels.invoeren"
+    assert _metrics.upstream_endpoint("/token") == "token"
+
+
+def test_instrument_records_route_status_and_latency():
+    class Handler:
+        def send_response(self, code, message=None):
+            self.code = code
+
+        def send_header(self, name, value):
+            pass
+
+        def end_headers(self):
+            pass
+
+        def do_GET(self):
+            self.send_response(404)
+
+    _metrics.instrument("demo-route")(Handler)
+    before = _metrics.HTTP_REQUESTS.value("demo-route", "GET", 404)
+    Handler().do_GET()
+
+    assert _metrics.HTTP_REQUESTS.value("demo-route", "GET", 404) == before + 1
+    assert _metrics.HTTP_DURATION.count("demo-route", "GET") >= 1
+    assert _metrics.HTTP_IN_FLIGHT.value("demo-route") == 0
+
+
+def test_observed_transport_times_until_body_is_read():
+    transport = ObservedTransport(httpx.MockTransport(lambda request: httpx.Response(503, json={})))
+    before = _metrics.UPSTREAM_REQUESTS.value("demo.detail", "GET", 503)
+    with httpx.Client(transport=transport) as client:
+        client.get("https://kinetic/api/demo/42")
+
+    assert _metrics.UPSTREAM_REQUESTS.value("demo.detail", "GET", 503) == before + 1
+    assert _metrics.UPSTREAM_IN_FLIGHT.value("demo.detail") == 0
+
+
+def test_disabled_metrics_record_nothing_but_snapshots(monkeypatch):
+    monkeypatch.setattr(_metrics, "METRICS_ENABLED", False)
+    before = _metrics.CACHE_REQUESTS.value("list", "hit"), _metrics.UPSTREAM_QUEUE_WAIT.count("production", "read")
+    _metrics.CACHE_REQUESTS.inc("list", "hit")
+    _metrics.CIRCUIT_STATE.set("demo.test", value=1)
+    _metrics.UPSTREAM_QUEUE_WAIT.observe(0.01, "production", "read")
+
+    after = _metrics.CACHE_REQUESTS.value("list", "hit"), _metrics.UPSTREAM_QUEUE_WAIT.count("production", "read")
+    assert after == before
+    assert _metrics.CIRCUIT_STATE.value("demo.test") == 0
+    # Metrics built per scrape (run storage) are still filled in.
+    runs = _metrics.Gauge("demo_runs", "Demo.", ("suite",), register=False)
+    runs.set("avp_scenario", value=2)
+    assert runs.value("avp_scenario") == 2
+
+
+def test_metrics_endpoint_includes_test_runs(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEST_RUNS_DIR", str(tmp_path))
+    create_run("run-1", suite="avp_scenario", base_url=None)
+    update_status(
+        "run-1",
+        status="succeeded",
+        queued_at="2026-01-01T10:00:00+00:00",
+        started_at="2026-01-01T10:00:05+00:00",
+        finished_at="2026-01-01T10:02:05+00:00",
+    )
+    assert run_metrics()["durations"] == [("avp_scenario", "succeeded", 120.0)]
+
+    module = importlib.import_module("metrics")
+    handler = module.handler.__new__(module.handler)
+    handler.headers = {}
+    handler.wfile = io.BytesIO()
+    handler.request_version = "HTTP/1.1"
+    handler.requestline = "GET /api/metrics HTTP/1.1"
+    handler.command = "GET"
+    handler.client_address = ("127.0.0.1", 0)
+    handler.do_GET()
+
+    body = handler.wfile.getvalue().decode()
+    assert "200 OK" in body.split("\r\n", 1)[0]
+    assert 'test_runs{suite="avp_scenario",status="succeeded"} 1' in body
+    assert 'test_run_duration_seconds_bucket{suite="avp_scenario",status="succeeded",le="120"} 1' in body
+    assert "# TYPE http_request_duration_seconds histogram" in body
@@ -0,0 +1,53 @@
+import importlib
+import marshal
+import pstats
+
+from fastapi.testclient import TestClient
+
+import _asgi
+import _profiling
+
+acceptance_rules = importlib.import_module("acceptance-rules")
+
+
+def _busy(rules):
+    # Long enough for the sampler to see it at a 1 ms interval.
+    return sorted(str(rule) * 50 for rule in rules * 400)
+
+
+def _client(monkeypatch):
+    rules = {"rules": [{"RegelId": index} for index in range(50)]}
+
+    def load_rules(env_key):
+        _busy(rules["rules"])
+        return rules
+
+    monkeypatch.setattr(_profiling, "PROFILE_TOKEN", "s3cret")
+    monkeypatch.setattr(acceptance_rules, "load_rules", load_rules)
+    return TestClient(_asgi.app)
+
+
+def test_profile_flag_needs_the_profile_token(monkeypatch):
+    with _client(monkeypatch) as client:
+        plain = client.get("/api/acceptance-rules?profile=collapsed")
+        wrong = client.get("/api/acceptance-rules?profile=collapsed", headers={"X-Profile-Token": "nope"})
+    assert plain.json()["rules"][0] == {"RegelId": 0}
+    assert "x-profiled-status" not in wrong.headers
+
+
+def test_collapsed_stacks_and_pstats_dump(monkeypatch, tmp_path):
+    headers = {"X-Profile-Token": "s3cret"}
+    with _client(monkeypatch) as client:
+        collapsed = client.get("/api/acceptance-rules?profile=collapsed", headers=headers)
+        dump = client.get("/api/acceptance-rules?profile=pstats", headers=headers)
+
+    assert collapsed.headers["x-profiled-status"] == "200"
+    assert int(collapsed.headers["x-profile-samples"]) > 0
+    stack, _, count = collapsed.text.splitlines()[0].rpartition(" ")
+    assert "acceptance-rules:do_GET" in collapsed.text and int(count) > 0 and ";" in stack
+
+    path = tmp_path / "request.pstats"
+    path.write_bytes(dump.content)
+    stats = pstats.Stats(str(path))
+    assert any(name == "_busy" for _, _, name in stats.stats)
+    assert marshal.loads(dump.content)
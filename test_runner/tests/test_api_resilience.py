@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import _metrics
+import _resilience
+from _cache import TTLCache
+from _upstream import is_circuit_open, is_upstream_unavailable
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(_resilience, "_breakers", {})
+    monkeypatch.setattr(_resilience, "latencies", _resilience.LatencyTracker())
+    monkeypatch.setattr(_resilience, "RETRY_BACKOFF_SECONDS", 0.001)
+
+
+def _client(handler):
+    return httpx.Client(transport=_resilience.ResilientTransport(httpx.MockTransport(handler)))
+
+
+def test_gets_are_retried_but_writes_are_not():
+    calls = {"GET": 0, "POST": 0}
+
+    def handler(request):
+        calls[request.method] += 1
+        if request.method == "GET" and calls["GET"] == 1:
+            raise httpx.ConnectError("reset", request=request)
+        return httpx.Response(503 if request.method == "POST" else 200, json={"ok": True})
+
+    before = _metrics.UPSTREAM_RETRIES.value("retry.detail")
+    with _client(handler) as client:
+        assert client.get("https://kinetic.test/retry/42").json() == {"ok": True}
+        assert client.post("https://kinetic.test/retry/invoeren", json={}).status_code == 503
+
+    assert calls == {"GET": 2, "POST": 1}
+    assert _metrics.UPSTREAM_RETRIES.value("retry.detail") == before + 1
+
+
+def test_breaker_opens_fails_fast_and_recovers(monkeypatch):
+    monkeypatch.setattr(_resilience, "RETRY_ATTEMPTS", 1)
+    monkeypatch.setattr(_resilience, "BREAKER_FAILURES", 2)
+    monkeypatch.setattr(_resilience, "BREAKER_RESET_SECONDS", 0.05)
+    healthy = {"value": False}
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        ok = healthy["value"] or request.url.host == "up.test"
+        return httpx.Response(200 if ok else 502, json={})
+
+    with _client(handler) as client:
+        for _ in range(2):
+            client.get("https://down.test/rules")
+        rejected = client.get("https://down.test/rules")
+        other_host = client.get("https://up.test/rules")
+        with pytest.raises(httpx.HTTPStatusError) as excinfo:
+            rejected.raise_for_status()
+        time.sleep(0.06)
+        healthy["value"] = True
+        probe = client.get("https://down.test/rules")
+
+    assert rejected.status_code == 503 and is_circuit_open(excinfo.value)
+    assert calls == ["down.test", "down.test", "up.test", "down.test"]
+    assert other_host.status_code == 200 and probe.status_code == 200
+    assert _metrics.CIRCUIT_STATE.value("down.test") == 0
+
+
+def test_list_cache_serves_last_copy_when_upstream_is_down():
+    cache = TTLCache(ttl=0.0, name="demo-fallback", fallback_on=is_upstream_unavailable)
+    request = httpx.Request("GET", "https://kinetic.test/rules")
+
+    def down():
+        raise httpx.ConnectError("down", request=request)
+
+    def not_found():
+        response = httpx.Response(404, request=request)
+        raise httpx.HTTPStatusError("missing", request=request, response=response)
+
+    assert cache.get_or_load("rules", lambda: ["old"]) == ["old"]
+    assert cache.get_or_load("rules", down) == ["old"]
+    with pytest.raises(httpx.HTTPStatusError):
+        cache.get_or_load("rules", not_found)
+    cache.invalidate("rules")
+    with pytest.raises(httpx.ConnectError):
+        cache.get_or_load("rules", down)
+    assert _metrics.CACHE_REQUESTS.value("demo-fallback", "fallback") == 1
+
+
+def test_slow_detail_reads_are_hedged(monkeypatch):
+    monkeypatch.setattr(_resilience, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(_resilience, "HEDGE_MIN_SAMPLES", 5)
+    monkeypatch.setattr(_resilience, "HEDGE_MIN_DELAY_SECONDS", 0.01)
+    for _ in range(5):
+        _resilience.latencies.record("hedged.detail", 0.01)
+
+    async def handler(request):
+        handler.calls += 1
+        if handler.calls == 1:
+            await asyncio.sleep(1)
+        return httpx.Response(200, json={"call": handler.calls})
+
+    handler.calls = 0
+    transport = _resilience.AsyncResilientTransport(httpx.MockTransport(handler))
+
+    async def read():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://kinetic.test/hedged/1234")
+
+    started = time.monotonic()
+    response = asyncio.run(read())
+    assert response.json() == {"call": 2}
+    assert time.monotonic() - started < 0.5
+    assert _metrics.UPSTREAM_HEDGES.value("hedged.detail", "hedge") == 1
+
+
+def test_abandoned_half_open_probe_lets_the_next_call_probe(monkeypatch):
+    monkeypatch.setattr(_resilience, "RETRY_ATTEMPTS", 1)
+    monkeypatch.setattr(_resilience, "BREAKER_FAILURES", 1)
+    monkeypatch.setattr(_resilience, "BREAKER_RESET_SECONDS", 0.01)
+    mode = {"value": "fail"}
+
+    async def handler(request):
+        if mode["value"] == "hang":
+            await asyncio.sleep(10)
+        if mode["value"] == "crash":
+            raise RuntimeError("not a transport error")
+        return httpx.Response(502 if mode["value"] == "fail" else 200, json={})
+
+    async def scenario():
+        transport = _resilience.AsyncResilientTransport(httpx.MockTransport(handler))
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("https://probe.test/rules")
+            breaker = _resilience.get_breaker("probe.test")
+            assert breaker.state == "open"
+
+            # Half-open probe cancelled mid-flight (a batch task whose client went away).
+            await asyncio.sleep(0.02)
+            mode["value"] = "hang"
+            probe = asyncio.ensure_future(client.get("https://probe.test/rules"))
+            await asyncio.sleep(0.01)
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+
+            # A probe failing with a non-transport error is released as well.
+            mode["value"] = "crash"
+            with pytest.raises(RuntimeError):
+                await client.get("https://probe.test/rules")
+
+            mode["value"] = "ok"
+            response = await client.get("https://probe.test/rules")
+            assert not is_circuit_open(response)
+            assert breaker.state == "closed"
+
+    asyncio.run(scenario())
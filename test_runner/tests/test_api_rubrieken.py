@@ -0,0 +1,45 @@
+import rubrieken
+from _rubrieken import RubriekIndex, extract_rubriek_codes, get_rubriek_index
+
+
+def test_extract_rubriek_codes_keeps_first_occurrence_order():
+    assert extract_rubriek_codes("PDA_1 = 'J' and BST_2 > PDA_1") == ["PDA_1", "BST_2"]
+
+
+def test_index_updates_and_removes_usage():
+    index = RubriekIndex()
+    index.update("acceptance-rules", 1, ["PDA_1 = 'J' and BST_2 > 3"])
+    index.update("dynamieken", 7, ["pda_1 > 0"])
+
+    assert index.lookup("PDA_1") == {"acceptance-rules": ["1"], "dynamieken": ["7"]}
+
+    index.update("acceptance-rules", 1, ["BST_2 > 3"])
+    index.remove("dynamieken", 7)
+
+    assert index.lookup("PDA_1") == {}
+    assert index.codes() == [{"code": "BST_2", "count": 1}]
+
+
+def test_build_index_fetches_details_only_for_new_records(monkeypatch):
+    rules = {"rules": [{"RegelId": 1, "Omschrijving": "a"}, {"RegelId": 2, "Expressie": "BST_2 > 1"}]}
+    fetched = []
+
+    def fetch_rule_detail(token, host, regel_id):
+        fetched.append(regel_id)
+        return {"RegelId": regel_id, "Expressie": "PDA_1 = 'J'"}
+
+    monkeypatch.setattr(
+        rubrieken,
+        "INDEX_SOURCES",
+        (("acceptance-rules", lambda env_key: rules, fetch_rule_detail),),
+    )
+    monkeypatch.setattr(rubrieken, "get_bearer_token", lambda env_key: "token")
+
+    rubrieken.build_index("test-env")
+    rubrieken.build_index("test-env")
+
+    index = get_rubriek_index("test-env")
+    assert fetched == ["1"]
+    assert index.status["state"] == "ready"
+    assert index.lookup("PDA_1") == {"acceptance-rules": ["1"]}
+    assert index.lookup("BST_2") == {"acceptance-rules": ["2"]}
@@ -0,0 +1,48 @@
+import importlib
+
+acceptance_rules = importlib.import_module("acceptance-rules")
+
+RULES = [
+    {"RegelId": 10, "ExternNummer": "EXT-010", "Omschrijving": "Leeftijdsgrens", "AfdBrancheCodeId": 3},
+    {"Data": [
+        {"RegelId": 2, "ExternNummer": "EXT-002", "Omschrijving": "Medische keuring", "AfdBrancheCodeId": 7},
+        {"RegelId": 101, "ExternNummer": "EXT-101", "Omschrijving": "Eigen risico", "AfdBrancheCodeId": 3},
+    ]},
+]
+
+
+def _query(**params):
+    normalized = acceptance_rules.normalize_rules(RULES)
+    return acceptance_rules.query_rules(normalized, {k: [str(v)] for k, v in params.items()})
+
+
+def test_normalize_flattens_nested_data():
+    rows = acceptance_rules.normalize_rules(RULES)["rows"]
+    assert [row["regelId"] for row in rows] == [10, 2, 101]
+    assert rows[1] == {
+        "regelId": 2,
+        "externNummer": "EXT-002",
+        "omschrijving": "Medische keuring",
+        "AfdBrancheCodeId": 7,
+    }
+
+
+def test_query_pages_and_sorts_numerically():
+    result = _query(page=1, pageSize=2, sort="regelId")
+    assert [row["regelId"] for row in result["rules"]] == [2, 10]
+    assert result["total"] == 3
+    assert result["totalPages"] == 2
+
+    result = _query(page=2, pageSize=2, sort="-regelId")
+    assert [row["regelId"] for row in result["rules"]] == [2]
+
+
+def test_query_filters_and_searches():
+    assert [row["regelId"] for row in _query(page=1, regelId="10")["rules"]] == [10, 101]
+    assert [row["regelId"] for row in _query(page=1, AfdBrancheCodeId=3)["rules"]] == [10, 101]
+    assert [row["regelId"] for row in _query(page=1, q="keuring")["rules"]] == [2]
+
+
+def test_list_query_requires_paging_params():
+    assert not acceptance_rules.is_list_query({"regelId": ["10"]})
+    assert acceptance_rules.is_list_query({"page": ["1"], "regelId": ["10"]})
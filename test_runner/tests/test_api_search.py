@@ -0,0 +1,46 @@
+from _search import SearchIndex, tokenize
+
+
+def test_tokenize_splits_rubriek_codes():
+    assert tokenize("PDA_123 = 'J'") == {"pda_123", "pda", "123", "j"}
+
+
+def test_search_matches_tokens_and_prefixes():
+    index = SearchIndex()
+    index.sync_list(
+        "acceptance-rules",
+        [
+            {"RegelId": 1, "Omschrijving": "Leeftijdsgrens", "Expressie": "PDA_123 > 70"},
+            {"RegelId": 2, "Omschrijving": "Leeftijd bestuurder", "Expressie": "BST_9 < 18"},
+        ],
+    )
+    index.sync_list("dynamieken", [{"RegelId": 7, "Omschrijving": "Korting", "Rekenregels": [{"Expressie": "PDA_123"}]}])
+
+    exact = index.search("pda_123")
+    assert [(item["kind"], item["id"]) for item in exact["results"]] == [
+        ("acceptance-rules", "1"),
+        ("dynamieken", "7"),
+    ]
+    assert [item["id"] for item in index.search("leeftijd")["results"]] == ["2", "1"]
+    assert index.search("leeftijd bst")["total"] == 1
+    assert index.search("pda", kinds=("dynamieken",))["total"] == 1
+
+
+def test_sync_list_updates_changed_and_removed_records():
+    index = SearchIndex()
+    index.sync_list("acceptance-rules", [{"RegelId": 1, "Omschrijving": "oud"}, {"RegelId": 2, "Omschrijving": "blijft"}])
+    changed = index.sync_list("acceptance-rules", [{"RegelId": 1, "Omschrijving": "nieuw"}])
+
+    assert changed == 2
+    assert index.search("oud")["total"] == 0
+    assert index.search("nieuw")["total"] == 1
+    assert index.search("blijft")["total"] == 0
+
+
+def test_detail_source_is_kept_across_list_syncs():
+    index = SearchIndex()
+    index.sync_list("acceptance-rules", [{"RegelId": 1, "Omschrijving": "Leeftijd"}])
+    index.upsert("acceptance-rules", {"RegelId": 1, "Omschrijving": "Leeftijd", "Expressie": "PDA_5 > 1"}, source="detail")
+    index.sync_list("acceptance-rules", [{"RegelId": 1, "Omschrijving": "Leeftijd!"}])
+
+    assert index.search("pda_5")["total"] == 1
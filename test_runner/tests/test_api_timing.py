@@ -0,0 +1,74 @@
+import io
+
+import _timing
+from _http import send_json
+from _metrics import instrument
+
+
+class FakeHandler:
+    def __init__(self, path):
+        self.path = path
+        self.headers = {}
+        self.sent = {}
+        self.wfile = io.BytesIO()
+
+    def send_response(self, code, message=None):
+        self.status = code
+
+    def send_header(self, name, value):
+        self.sent[name] = value
+
+    def end_headers(self):
+        pass
+
+
+def test_inner_phases_count_towards_the_outermost_phase():
+    timer = _timing.start()
+    try:
+        with _timing.phase("token"):
+            with _timing.phase("upstream"):
+                pass
+        with _timing.phase("upstream"):
+            pass
+    finally:
+        _timing.stop()
+
+    assert timer.durations["token"] > 0
+    assert timer.durations["upstream"] > 0
+    assert timer.active is None
+    assert [part.split(";")[0] for part in timer.header().split(", ")] == [
+        "auth",
+        "token",
+        "upstream",
+        "normalize",
+        "serialize",
+        "total",
+    ]
+
+
+def test_phase_without_timer_is_a_no_op():
+    with _timing.phase("upstream"):
+        pass
+    assert _timing.current() is None
+
+
+def test_handlers_send_server_timing_and_debug_breakdown():
+    @instrument("timing-demo")
+    class Handler(FakeHandler):
+        def do_GET(self):
+            with _timing.phase("upstream"):
+                data = {"rules": []}
+            send_json(self, data, cache_key=("production", "timing-demo"), conditional=True)
+
+    plain = Handler("/api/timing-demo")
+    plain.do_GET()
+    assert "upstream;dur=" in plain.sent["Server-Timing"]
+    assert "serverTiming" not in plain.wfile.getvalue().decode()
+    assert "ETag" in plain.sent
+
+    debug = Handler("/api/timing-demo?env=production&debug=timing")
+    debug.do_GET()
+    body = debug.wfile.getvalue().decode()
+    assert '"serverTiming"' in body and '"upstream"' in body
+    assert "ETag" not in debug.sent
+    assert _timing.current() is None
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import time
+
+import httpx
+import pytest
+
+import _tokens
+
+
+@pytest.fixture
+def kinetic(monkeypatch, tmp_path):
+    # Token endpoint counting POST /token; every token is unique.
+    calls = []
+
+    def handler(request):
+        assert (request.method, request.url.path) == ("POST", "/token")
+        calls.append(time.time())
+        time.sleep(0.05)
+        return httpx.Response(200, json={"access_token": f"token-{len(calls)}", "expires_in": 3600})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setenv("TOKEN_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        _tokens,
+        "get_env_config",
+        lambda env_key: {"host": "https://kinetic.test", "client_id": "id", "client_secret": "secret"},
+    )
+    monkeypatch.setattr(_tokens, "get_client", lambda host: client)
+    monkeypatch.setitem(_tokens.token_cache, "production", {"token": None, "expires_at": None, "refresh_at": None})
+    yield calls
+    for timer in list(_tokens._refresh_timers.values()):
+        timer.cancel()
+    _tokens._refresh_timers.clear()
+
+
+def test_concurrent_callers_share_one_token_fetch(kinetic, monkeypatch, tmp_path):
+    barrier = threading.Barrier(8)
+    tokens = []
+
+    def call():
+        barrier.wait()
+        tokens.append(_tokens.get_bearer_token("production"))
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tokens == ["token-1"] * 8
+    assert len(kinetic) == 1
+    assert not (tmp_path / "production.lock").exists()
+    # The background refresh is due when the token enters the refresh-ahead window.
+    refresh_in = _tokens.token_cache["production"]["refresh_at"] - time.time()
+    assert _tokens._refresh_timers["production"].interval == pytest.approx(refresh_in, abs=1)
+
+    # Another worker process starts with an empty memory cache and reads the
+    # token file instead of fetching.
+    monkeypatch.setitem(_tokens.token_cache, "production", {"token": None, "expires_at": None, "refresh_at": None})
+    assert _tokens.get_bearer_token("production") == "token-1"
+    assert len(kinetic) == 1
+
+
+def test_stale_lock_is_recovered_and_a_live_lock_is_waited_for(kinetic, monkeypatch, tmp_path):
+    lock = tmp_path / "production.lock"
+    lock.write_text("12345")
+    old = time.time() - _tokens.LOCK_STALE_SECONDS - 5
+    os.utime(lock, (old, old))
+
+    assert _tokens.get_bearer_token("production") == "token-1"
+    assert not lock.exists()
+
+    # A live lock from another process: give up after the wait, unless that
+    # process stored a usable token meanwhile.
+    monkeypatch.setattr(_tokens, "LOCK_WAIT_SECONDS", 0.1)
+    (tmp_path / "production.json").unlink()
+    lock.write_text("12345")
+    with pytest.raises(RuntimeError, match="Timed out"):
+        _tokens._refresh("production")
+    # A holder whose token request is just past its timeout is still live.
+    recent = time.time() - _tokens.TOKEN_REQUEST_TIMEOUT_SECONDS - 1
+    os.utime(lock, (recent, recent))
+    with pytest.raises(RuntimeError, match="Timed out"):
+        _tokens._refresh("production")
+    assert lock.exists()
+    _tokens._write_store("production", {"token": "from-peer", "expires_at": time.time() + 600, "refresh_at": None})
+    assert _tokens._refresh("production")["token"] == "from-peer"
+    assert len(kinetic) == 1
+
+
+def test_token_in_refresh_window_is_served_while_refreshing_in_background(kinetic):
+    now = time.time()
+    _tokens.token_cache["production"].update(token="old", expires_at=now + 600, refresh_at=now - 1)
+    _tokens._write_store("production", dict(_tokens.token_cache["production"]))
+
+    assert _tokens.get_bearer_token("production") == "old"
+    deadline = time.time() + 5
+    while _tokens.token_cache["production"]["token"] == "old" and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert _tokens.token_cache["production"]["token"] == "token-1"
+    assert _tokens._read_store("production")["token"] == "token-1"
+    assert len(kinetic) == 1
+
+
+def test_token_store_defaults_to_the_temp_dir(monkeypatch, tmp_path):
+    monkeypatch.delenv("TOKEN_CACHE_DIR", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    assert _tokens.token_store_dir() == str(tmp_path / "acceptatiebeheer-tokens")
+    assert (tmp_path / "acceptatiebeheer-tokens").is_dir()
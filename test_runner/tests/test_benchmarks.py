@@ -0,0 +1,54 @@
+import httpx
+
+from benchmarks.kinetic_stub import RULES_PATH, start_stub
+from benchmarks.labels import run as run_label_benchmark
+from benchmarks.labels import run_substitutions
+from benchmarks.load import compare, percentile, summarize
+
+
+def test_stub_serves_kinetic_endpoints_and_counts_calls():
+    stub = start_stub(latency_ms=0, jitter_ms=0, records=30)
+    try:
+        with httpx.Client(base_url=stub.url) as client:
+            token = client.post("/token", params={"client_id": "a", "client_secret": "b"}).json()
+            assert token["access_token"] and token["expires_in"] == 3600
+            rules = client.get(RULES_PATH).json()
+            assert len(rules) == 30
+            assert client.get(f"{RULES_PATH}/7").json()["RegelId"] == 7
+            assert client.get(f"{RULES_PATH}/999").status_code == 404
+
+            stats = client.get("/__stats").json()
+            assert stats["calls"] == {"token": 1, "acceptatieregels": 1, "acceptatieregels.detail": 2}
+
+            client.post("/__config", json={"error_rate": 1.0})
+            assert client.get(RULES_PATH).status_code == 503
+            assert client.post("/token").status_code == 200
+            assert client.post("/__reset").json()["total"] == 0
+    finally:
+        stub.shutdown()
+
+
+def test_summarize_reports_percentiles_throughput_and_errors():
+    latencies = [float(value) for value in range(1, 101)]
+    statuses = [200] * 98 + [503, 0]
+    result = summarize(latencies, statuses, elapsed=2.0)
+    assert (result["p50_ms"], result["p95_ms"], result["p99_ms"]) == (50.0, 95.0, 99.0)
+    assert result["throughput_rps"] == 50.0
+    assert result["errors"] == 2
+    assert result["statuses"] == {"0": 1, "200": 98, "503": 1}
+    assert percentile([], 0.5) == 0.0
+
+
+def test_compare_lists_deltas_for_shared_routes():
+    baseline = {"routes": {"health": {"p95_ms": 10.0, "throughput_rps": 100.0}}}
+    current = {"routes": {"health": {"p95_ms": 12.5, "throughput_rps": 90.0}, "search": {}}}
+    lines = compare(current, baseline)
+    assert len(lines) == 1
+    assert "+2.50" in lines[0] and "-10.00" in lines[0]
+
+
+def test_label_benchmark_checks_results_against_the_reference():
+    result = run_label_benchmark(rubrieken=60, repeat=1)
+    assert result["labels"] > 0 and result["nodes"] > 60
+    assert result["reference_ms"] > 0 and result["current_ms"] > 0
+    assert run_substitutions(labels=10, repeat=1)["labels"] > 0